@@ -0,0 +1,212 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# Benchmark de un catálogo sintético de tamaño fijo. Se ejecuta en un proceso
+# propio por tamaño (lo lanza benchmarks/run_benchmarks.py) para que la base
+# de datos, la memoria pico y las cachés no se mezclen entre corridas.
+#   QUIET_STREAM_DB=/tmp/bench.db python -m benchmarks.catalog_bench --rows 100000 --output out.json
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import resource
+import sqlite3
+import sys
+import tempfile
+import time
+import tracemalloc
+import uuid
+
+SEED = 1234
+IMPORT_ROWS = 10000
+DELETE_FRACTION = 0.1
+SEARCH_QUERIES = ["r", "ra", "rad", "radio", "radio cl", "radio clasica", "noticias 9", "zzzz", "cancoin"]
+
+WORDS = ["radio", "música", "clásica", "noticias", "rock", "jazz", "lofi", "canción", "fútbol",
+         "deportes", "cumbia", "salsa", "metal", "pop", "andina", "electrónica", "podcast", "directo"]
+CATEGORIES = ["Música", "Noticias", "Deportes", "Rock, Metal", "Jazz", "Lofi, Estudio", "Podcast", "Cultura"]
+
+def synthetic_streams(start: int, count: int) -> list[dict]:
+    rng = random.Random(SEED + start)
+    return [
+        {
+            "nombre": f"{rng.choice(WORDS).capitalize()} {rng.choice(WORDS)} {i}",
+            "link": f"http://bench.invalid/stream/{i}",
+            "categorias": rng.choice(CATEGORIES),
+            "tipo": "Video" if rng.random() < 0.2 else "Stream",
+        }
+        for i in range(start, start + count)
+    ]
+
+def fill_database(db_path: str, start: int, count: int, batch: int = 50000) -> None:
+    # Inserción directa: generar un millón de filas con el ORM tomaría más que
+    # el propio benchmark.
+    from database.models import stream_content_hash
+
+    connection = sqlite3.connect(db_path)
+    try:
+        for offset in range(start, start + count, batch):
+            rows = synthetic_streams(offset, min(batch, start + count - offset))
+            connection.executemany(
+                "INSERT INTO stream (nombre, link, categorias, tipo, uid, content_hash) VALUES (?, ?, ?, ?, ?, ?)",
+                [
+                    (r["nombre"], r["link"], r["categorias"], r["tipo"], uuid.uuid4().hex,
+                     stream_content_hash(r["nombre"], r["link"], r["categorias"], r["tipo"], []))
+                    for r in rows
+                ]
+            )
+        connection.commit()
+    finally:
+        connection.close()
+
+def elapsed_ms(started: float) -> float:
+    return round((time.perf_counter() - started) * 1000, 3)
+
+async def measure_screens(results: dict) -> None:
+    from main import StreamPlayerApp
+
+    app = StreamPlayerApp()
+    async with app.run_test(size=(160, 50)) as pilot:
+        while not app.database_ready:
+            await pilot.pause(0.05)
+
+        for name in ("admin", "player"):
+            started = time.perf_counter()
+            app._show_screen(name)
+            screen = app.screen
+            # El montaje termina cuando la primera búsqueda (catálogo + índice)
+            # ya llenó la tabla.
+            while screen.catalog_search is None or screen.catalog_search.last_search is None:
+                await pilot.pause(0.01)
+            results[f"{name}_mount_ms"] = elapsed_ms(started)
+
+            table = screen.query_one("#stream_table")
+            started = time.perf_counter()
+            if name == "admin":
+                screen.filtered_rows = screen.filtered_rows
+            else:
+                screen.update_table_rows()
+            results[f"{name}_table_rebuild_ms"] = elapsed_ms(started)
+            results[f"{name}_table_rows"] = table.row_count
+            app.pop_screen()
+            await pilot.pause(0.05)
+
+async def measure_search(results: dict) -> None:
+    from database.catalog_store import load_catalog
+    from utils.search_index import SearchIndex
+
+    catalog = await load_catalog()
+    started = time.perf_counter()
+    index = SearchIndex.build([catalog.nombres, catalog.categorias, catalog.tipos], catalog.version)
+    results["search_index_build_ms"] = elapsed_ms(started)
+
+    latencies = {}
+    previous_query, previous_rows = None, None
+    for query in SEARCH_QUERIES:
+        within = previous_rows if previous_query and previous_query in query else None
+        started = time.perf_counter()
+        rows = index.search(query, within)
+        if not rows:
+            rows = index.fuzzy_search(query, 1000)
+        latencies[query] = {"ms": elapsed_ms(started), "results": len(rows), "narrowed": within is not None}
+        previous_query, previous_rows = query, rows
+    results["search"] = latencies
+
+def measure_import(results: dict, count: int) -> None:
+    from database.repository import import_stream_dicts
+    from utils.catalog_io import read_streams_file, write_streams_file
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "import.json")
+        write_streams_file(path, synthetic_streams(0, count))
+        started = time.perf_counter()
+        imported, skipped = import_stream_dicts(read_streams_file(path))
+        seconds = time.perf_counter() - started
+    results["import_rows"] = imported
+    results["import_skipped"] = skipped
+    results["import_rows_per_s"] = round(imported / seconds, 1) if seconds else None
+
+def measure_export(results: dict) -> None:
+    from database.repository import export_stream_dicts
+    from utils.catalog_io import write_streams_file
+
+    with tempfile.TemporaryDirectory() as directory:
+        started = time.perf_counter()
+        data = export_stream_dicts()
+        write_streams_file(os.path.join(directory, "export.json"), data)
+        seconds = time.perf_counter() - started
+    results["export_rows"] = len(data)
+    results["export_rows_per_s"] = round(len(data) / seconds, 1) if seconds else None
+
+def measure_bulk_delete(results: dict) -> None:
+    from database.repository import delete_streams, list_stream_ids
+
+    ids = list_stream_ids()
+    to_delete = ids[::max(1, int(1 / DELETE_FRACTION))]
+    started = time.perf_counter()
+    deleted = delete_streams(to_delete)
+    results["bulk_delete_rows"] = deleted
+    results["bulk_delete_ms"] = elapsed_ms(started)
+
+async def measure_catalog_memory(results: dict) -> None:
+    from database.catalog_store import CatalogStore, load_catalog_rows
+    from utils.search_index import SearchIndex
+
+    tracemalloc.start()
+    catalog = CatalogStore()
+    catalog.replace(load_catalog_rows(), 0)
+    results["catalog_store_bytes"] = tracemalloc.get_traced_memory()[0]
+    SearchIndex.build([catalog.nombres, catalog.categorias, catalog.tipos], 0)
+    results["catalog_peak_traced_bytes"] = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+def run(rows: int, import_rows: int = IMPORT_ROWS) -> dict:
+    from database.models import DB_PATH, create_db_and_tables
+
+    results = {"rows": rows}
+    create_db_and_tables()
+
+    import_rows = min(rows, import_rows)
+    measure_import(results, import_rows)
+
+    started = time.perf_counter()
+    fill_database(DB_PATH, import_rows, rows - import_rows)
+    results["generate_ms"] = elapsed_ms(started)
+
+    # Las filas generadas por SQL no pasan por el ORM: se marca el catálogo
+    # como modificado para que las pantallas lo carguen.
+    from database.models import bump_catalog_version
+    bump_catalog_version()
+
+    asyncio.run(measure_screens(results))
+    asyncio.run(measure_search(results))
+    measure_export(results)
+    asyncio.run(measure_catalog_memory(results))
+    measure_bulk_delete(results)
+
+    results["max_rss_kb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    from utils.metrics import metrics
+    results["metrics"] = metrics.snapshot()["histograms"]
+    return results
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark de un catálogo sintético")
+    parser.add_argument("--rows", type=int, required=True)
+    parser.add_argument("--output", required=True)
+    parser.add_argument("--import-rows", type=int, default=IMPORT_ROWS,
+                        help="Filas que entran por la importación JSON; el resto se genera por SQL")
+    args = parser.parse_args(argv)
+
+    if not os.environ.get("QUIET_STREAM_DB"):
+        print("QUIET_STREAM_DB debe apuntar a una base de datos temporal", file=sys.stderr)
+        return 2
+
+    results = run(args.rows, args.import_rows)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2, ensure_ascii=False)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,71 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# Ejecuta el benchmark de catálogo para varios tamaños y junta los resultados
+# en un único JSON comparable entre versiones y equipos.
+#   python -m benchmarks.run_benchmarks --sizes 1000,100000,1000000 --output bench_results.json
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_SIZES = "1000,100000,1000000"
+
+def git_revision() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=BASE_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run_size(rows: int, import_rows: int) -> dict:
+    with tempfile.TemporaryDirectory(prefix="quiet-stream-bench-") as directory:
+        output = os.path.join(directory, "result.json")
+        env = dict(os.environ, QUIET_STREAM_DB=os.path.join(directory, "streams.db"))
+        started = time.perf_counter()
+        completed = subprocess.run(
+            [sys.executable, "-m", "benchmarks.catalog_bench", "--rows", str(rows),
+             "--import-rows", str(import_rows), "--output", output],
+            cwd=BASE_DIR, env=env
+        )
+        if completed.returncode != 0:
+            return {"rows": rows, "error": f"El benchmark terminó con código {completed.returncode}"}
+        with open(output, encoding='utf-8') as f:
+            result = json.load(f)
+        result["wall_seconds"] = round(time.perf_counter() - started, 2)
+        return result
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmarks de Quiet Stream")
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help="Tamaños del catálogo separados por coma")
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--import-rows", type=int, default=10000,
+                        help="Filas importadas desde JSON en cada tamaño")
+    args = parser.parse_args(argv)
+
+    sizes = [int(size) for size in args.sizes.split(",") if size.strip()]
+    report = {
+        "generated_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "processor": platform.processor(),
+        "import_rows": args.import_rows,
+        "results": [],
+    }
+    for rows in sizes:
+        print(f"Catálogo de {rows} streams...", file=sys.stderr)
+        report["results"].append(run_size(rows, args.import_rows))
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"Resultados guardados en '{args.output}'", file=sys.stderr)
+    return 0 if all("error" not in result for result in report["results"]) else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,168 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# Quiet Stream 1.0 - Línea de comandos
+# Mantenimiento del catálogo sin interfaz, pensado para cron:
+#   python main.py validate --concurrency 16 --json [--delete]
+#   python main.py import streams.json
+#   python main.py export streams_backup.json
+#   python main.py sync --with /mnt/otra/streams.db
+#   python main.py sync --export-delta cambios.json --peer <id de réplica>
+#   python main.py sync --apply-delta cambios.json
+# Written by Ismael Heredia
+
+import argparse
+import asyncio
+import json
+import logging
+import sys
+
+from database.models import create_db_and_tables, engine
+from database.repository import delete_streams, export_stream_dicts, import_stream_dicts, list_stream_dicts
+from database.sync import SyncError, apply_delta, export_delta, open_database, reset_replica_id, sync_databases
+from utils.catalog_io import CatalogFileError, read_streams_file, read_sync_file, write_streams_file, write_sync_file
+from utils.config_manager import METRICS_DUMP_FILE, VALIDATION_CONCURRENCY, set_console_logging
+from utils.metrics import metrics
+from utils.stream_checker import validate_streams
+
+logger = logging.getLogger(__name__)
+
+EXIT_OK = 0
+EXIT_BROKEN_STREAMS = 1
+EXIT_USAGE = 2
+EXIT_FILE_ERROR = 3
+EXIT_DATABASE_ERROR = 4
+
+def _report(summary: dict, as_json: bool) -> None:
+    if as_json:
+        print(json.dumps(summary, ensure_ascii=False))
+        return
+    for key, value in summary.items():
+        if isinstance(value, list):
+            print(f"{key}: {len(value)}")
+            for item in value:
+                print(f"  - {item.get('id')}: {item.get('nombre')} ({item.get('link')})" if isinstance(item, dict) else f"  - {item}")
+        else:
+            print(f"{key}: {value}")
+
+def command_validate(args) -> int:
+    streams = list_stream_dicts()
+    broken_streams = asyncio.run(validate_streams(streams, args.concurrency))
+    broken_streams.sort(key=lambda stream_data: stream_data["id"])
+
+    summary = {
+        "command": "validate",
+        "total": len(streams),
+        "broken_count": len(broken_streams),
+        "broken": [{k: s[k] for k in ("id", "nombre", "link")} for s in broken_streams],
+    }
+    if args.delete and broken_streams:
+        summary["deleted"] = delete_streams([s["id"] for s in broken_streams])
+
+    _report(summary, args.json)
+    return EXIT_BROKEN_STREAMS if broken_streams and not args.delete else EXIT_OK
+
+def command_import(args) -> int:
+    data = read_streams_file(args.file)
+    imported_count, skipped_count = import_stream_dicts(data)
+    _report({
+        "command": "import",
+        "file": args.file,
+        "total": len(data),
+        "imported": imported_count,
+        "skipped": skipped_count,
+    }, args.json)
+    return EXIT_OK
+
+def command_export(args) -> int:
+    streams_data = export_stream_dicts()
+    write_streams_file(args.file, streams_data)
+    _report({"command": "export", "file": args.file, "exported": len(streams_data)}, args.json)
+    return EXIT_OK
+
+def command_sync(args) -> int:
+    if args.reset_replica:
+        _report({"command": "sync", "replica": reset_replica_id(engine)}, args.json)
+    elif args.with_db:
+        result = sync_databases(engine, open_database(args.with_db))
+        _report({"command": "sync", "with": args.with_db, **result}, args.json)
+    elif args.export_delta:
+        delta = export_delta(engine, args.peer)
+        write_sync_file(args.export_delta, delta)
+        _report({
+            "command": "sync",
+            "file": args.export_delta,
+            "replica": delta["replica"],
+            "since": delta["since"],
+            "streams": len(delta["streams"]),
+            "tombstones": len(delta["tombstones"]),
+        }, args.json)
+    else:
+        delta = read_sync_file(args.apply_delta)
+        _report({"command": "sync", "file": args.apply_delta, "from": delta.get("replica"), **apply_delta(engine, delta)}, args.json)
+    return EXIT_OK
+
+def command_daemon(args) -> int:
+    from daemon import run_daemon
+    return run_daemon(args.socket) if args.socket else run_daemon()
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="main.py", description="Quiet Stream: mantenimiento del catálogo sin interfaz")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    validate_parser = subparsers.add_parser("validate", help="Comprueba que los links de los streams respondan")
+    validate_parser.add_argument("--concurrency", type=int, default=VALIDATION_CONCURRENCY, help="Comprobaciones simultáneas")
+    validate_parser.add_argument("--delete", action="store_true", help="Elimina los streams no funcionales")
+    validate_parser.add_argument("--json", action="store_true", help="Salida en JSON")
+    validate_parser.set_defaults(handler=command_validate)
+
+    import_parser = subparsers.add_parser("import", help="Importa streams desde un archivo JSON")
+    import_parser.add_argument("file")
+    import_parser.add_argument("--json", action="store_true", help="Salida en JSON")
+    import_parser.set_defaults(handler=command_import)
+
+    export_parser = subparsers.add_parser("export", help="Exporta todos los streams a un archivo JSON")
+    export_parser.add_argument("file")
+    export_parser.add_argument("--json", action="store_true", help="Salida en JSON")
+    export_parser.set_defaults(handler=command_export)
+
+    sync_parser = subparsers.add_parser("sync", help="Intercambia solo los cambios con otro catálogo")
+    sync_mode = sync_parser.add_mutually_exclusive_group(required=True)
+    sync_mode.add_argument("--with", dest="with_db", metavar="DB", help="Sincroniza en ambos sentidos con otro streams.db")
+    sync_mode.add_argument("--export-delta", metavar="FILE", help="Guarda los cambios pendientes para otra réplica")
+    sync_mode.add_argument("--apply-delta", metavar="FILE", help="Aplica un archivo de cambios de otra réplica")
+    sync_mode.add_argument("--reset-replica", action="store_true", help="Asigna un id de réplica nuevo (tras copiar streams.db)")
+    sync_parser.add_argument("--peer", help="Id de réplica destino: exporta solo lo que aún no confirmó")
+    sync_parser.add_argument("--json", action="store_true", help="Salida en JSON")
+    sync_parser.set_defaults(handler=command_sync)
+
+    daemon_parser = subparsers.add_parser("daemon", help="Inicia el reproductor sin interfaz")
+    daemon_parser.add_argument("--socket", help="Ruta del socket Unix de control")
+    daemon_parser.set_defaults(handler=command_daemon)
+
+    return parser
+
+def main(argv: list[str] | None = None) -> int:
+    args = build_parser().parse_args(argv)
+    set_console_logging(True)
+    try:
+        create_db_and_tables()
+        return args.handler(args)
+    except SyncError as e:
+        _report({"command": args.command, "error": str(e)}, getattr(args, "json", False))
+        return EXIT_USAGE
+    except CatalogFileError as e:
+        _report({"command": args.command, "error": str(e)}, getattr(args, "json", False))
+        return EXIT_FILE_ERROR
+    except OSError as e:
+        _report({"command": args.command, "error": str(e)}, getattr(args, "json", False))
+        return EXIT_FILE_ERROR
+    except Exception as e:
+        logger.error(f"Error en el comando '{args.command}': {e}", exc_info=True)
+        _report({"command": args.command, "error": str(e)}, getattr(args, "json", False))
+        return EXIT_DATABASE_ERROR
+    finally:
+        if METRICS_DUMP_FILE:
+            metrics.dump(METRICS_DUMP_FILE)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,183 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# Quiet Stream 1.0 - Modo sin interfaz
+# Reproduce streams sin Textual y se controla por un socket Unix con JSON por líneas:
+#   {"cmd": "play", "id": 3}  {"cmd": "next"}  {"cmd": "prev"}  {"cmd": "stop"}
+#   {"cmd": "volume", "level": 60}  {"cmd": "status"}
+# Written by Ismael Heredia
+
+import json
+import logging
+import os
+import signal
+import socketserver
+import threading
+import time
+
+from database.models import create_db_and_tables
+from database.play_history import PlayHistoryRecorder, get_play_history_buffer
+from database.seed import seed_data
+from database.repository import get_playable_stream, list_stream_ids
+from playback.engine import PlaybackEngine
+from playback.remote import daemon_is_running
+from utils.config_manager import DAEMON_SOCKET_PATH, PLAY_HISTORY_ENABLED, PLAY_HISTORY_FLUSH_SECONDS, REWIND_SECONDS, set_console_logging
+
+logger = logging.getLogger(__name__)
+
+class PlaybackDaemon:
+    def __init__(self):
+        self.history = PlayHistoryRecorder() if PLAY_HISTORY_ENABLED else None
+        self.engine = PlaybackEngine(on_status=self._on_status,
+                                     on_event=self.history.on_playback_event if self.history else None)
+        self.current_stream: dict | None = None
+        self.status_text = "Seleccione un stream para reproducir"
+        self._lock = threading.Lock()
+
+    def _on_status(self, text: str) -> None:
+        logger.info(f"Daemon: {text}")
+        self.status_text = text
+
+    def handle(self, request: dict) -> dict:
+        command = request.get("cmd")
+        with self._lock:
+            if command == "play":
+                return self._play_id(request.get("id"))
+            elif command == "next":
+                return self._step(1)
+            elif command == "prev":
+                return self._step(-1)
+            elif command == "stop":
+                self.engine.stop()
+                if self.history:
+                    self.history.stopped()
+                self.current_stream = None
+                self.status_text = "Seleccione un stream para reproducir"
+            elif command == "volume":
+                if "level" in request:
+                    self.engine.set_volume(request["level"])
+                else:
+                    self.engine.toggle_volume()
+            elif command == "pause":
+                self.engine.toggle_pause()
+            elif command == "rewind":
+                self.engine.rewind(int(request.get("seconds", REWIND_SECONDS)))
+            elif command == "live":
+                self.engine.go_live()
+            elif command == "restart":
+                self.engine.restart()
+            elif command == "quality":
+                self.engine.set_quality(request.get("quality", ""))
+            elif command != "status":
+                return {"ok": False, "error": f"Comando desconocido: {command}"}
+            return self._status()
+
+    def _status(self) -> dict:
+        stream = self.current_stream
+        return {
+            "ok": True,
+            "status_text": self.status_text,
+            "stream": {k: stream[k] for k in ("id", "nombre", "tipo")} if stream else None,
+            "quality": self.engine.quality,
+            "volume": self.engine.volume(),
+            "bytes_transferred": self.engine.bytes_transferred(),
+            "telemetry": self.engine.telemetry(),
+        }
+
+    def _play_id(self, stream_id) -> dict:
+        try:
+            stream = get_playable_stream(int(stream_id))
+        except (TypeError, ValueError):
+            return {"ok": False, "error": f"ID de stream inválido: {stream_id}"}
+        if not stream:
+            return {"ok": False, "error": f"Stream {stream_id} no encontrado"}
+        self.current_stream = stream
+        self.status_text = f"Cargando: {stream['nombre']}..."
+        if self.history:
+            self.history.started(stream["id"])
+        self.engine.play(stream)
+        return self._status()
+
+    def _step(self, delta: int) -> dict:
+        stream_ids = list_stream_ids()
+        if not stream_ids:
+            return {"ok": False, "error": "No hay streams en la base de datos"}
+        if self.current_stream and self.current_stream["id"] in stream_ids:
+            index = (stream_ids.index(self.current_stream["id"]) + delta) % len(stream_ids)
+        else:
+            index = 0 if delta > 0 else len(stream_ids) - 1
+        return self._play_id(stream_ids[index])
+
+    def shutdown(self) -> None:
+        self.engine.shutdown()
+        if self.history:
+            self.history.stopped()
+            get_play_history_buffer().flush()
+
+
+class DaemonRequestHandler(socketserver.StreamRequestHandler):
+    def handle(self) -> None:
+        for line in self.rfile:
+            try:
+                request = json.loads(line)
+                response = self.server.playback_daemon.handle(request)
+            except json.JSONDecodeError:
+                response = {"ok": False, "error": "JSON inválido"}
+            except Exception as e:
+                logger.error(f"Daemon: Error al procesar la petición: {e}", exc_info=True)
+                response = {"ok": False, "error": str(e)}
+            self.wfile.write((json.dumps(response, ensure_ascii=False) + "\n").encode('utf-8'))
+
+
+class DaemonServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+    last_history_flush = time.monotonic()
+
+    def service_actions(self) -> None:
+        # serve_forever la llama en cada vuelta: el historial se escribe por
+        # lotes desde aquí, nunca desde la orden de reproducir.
+        if PLAY_HISTORY_ENABLED and time.monotonic() - self.last_history_flush >= PLAY_HISTORY_FLUSH_SECONDS:
+            self.last_history_flush = time.monotonic()
+            get_play_history_buffer().flush()
+
+
+def run_daemon(socket_path: str = DAEMON_SOCKET_PATH) -> int:
+    set_console_logging(True)
+    if os.path.exists(socket_path):
+        if daemon_is_running(socket_path):
+            logger.critical(f"Ya hay un daemon escuchando en '{socket_path}'")
+            return 1
+        os.unlink(socket_path)
+
+    create_db_and_tables()
+    seed_data()
+
+    playback_daemon = PlaybackDaemon()
+    # El socket nace ya con permisos 0600: con un chmod posterior quedaría
+    # un instante en que otro usuario podría conectarse.
+    previous_umask = os.umask(0o077)
+    try:
+        server = DaemonServer(socket_path, DaemonRequestHandler)
+    finally:
+        os.umask(previous_umask)
+    server.playback_daemon = playback_daemon
+
+    def request_shutdown(signum, frame):
+        logger.info(f"Daemon: señal {signum} recibida, deteniendo...")
+        threading.Thread(target=server.shutdown, daemon=True).start()
+
+    signal.signal(signal.SIGTERM, request_shutdown)
+    signal.signal(signal.SIGINT, request_shutdown)
+
+    logger.info(f"Daemon escuchando en '{socket_path}'")
+    try:
+        server.serve_forever()
+    finally:
+        playback_daemon.shutdown()
+        server.server_close()
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        logger.info("Daemon detenido")
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(run_daemon())
@@ -0,0 +1,40 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import asyncio
+import atexit
+import functools
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+# Un único hilo dedicado a la base de datos: SQLite admite un solo escritor,
+# así que serializar las escrituras evita bloqueos entre ellas y el bucle de
+# eventos de Textual nunca espera al disco. Las pantallas usan run_db; los
+# hilos de reproducción encargan sus escrituras con submit_db sin esperarlas.
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="quiet-stream-db")
+
+async def run_db(func, *args, **kwargs):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, functools.partial(func, *args, **kwargs))
+
+def submit_db(func, *args, **kwargs) -> None:
+    try:
+        future = _executor.submit(func, *args, **kwargs)
+    except RuntimeError:
+        # El ejecutor ya se cerró al salir: se escribe desde el hilo actual.
+        func(*args, **kwargs)
+        return
+    future.add_done_callback(_log_failure)
+
+def _log_failure(future) -> None:
+    if not future.cancelled() and future.exception() is not None:
+        logger.error(f"Error en una escritura en segundo plano: {future.exception()}", exc_info=future.exception())
+
+def shutdown_db_executor() -> None:
+    # Sin cancelar lo pendiente: las sesiones encargadas con submit_db al
+    # cerrar el reproductor deben llegar a guardarse.
+    _executor.shutdown(wait=True)
+
+atexit.register(shutdown_db_executor)
@@ -0,0 +1,192 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import json
+import logging
+import mmap
+import os
+import struct
+import tempfile
+import threading
+from array import array
+
+from utils.search_index import Postings, SearchIndex
+
+logger = logging.getLogger(__name__)
+
+# Instantánea binaria del catálogo y sus índices de búsqueda. Las secciones
+# se escriben alineadas a 8 bytes y al final va una cabecera JSON con su
+# ubicación; al abrirla se mapea el archivo y cada columna es una vista sobre
+# el mapa, sin copiar ni decodificar nada hasta que se accede a una fila.
+MAGIC = b"QSSNAP01"
+FORMAT_VERSION = 2
+_trailer = struct.Struct("<QQ")
+# Una escritura a la vez: una tarea cancelada no detiene el hilo que ya
+# estaba escribiendo.
+_write_lock = threading.Lock()
+
+class MappedStrings:
+    # Lista de textos de solo lectura: bytes UTF-8 concatenados y offsets.
+    __slots__ = ("_data", "_offsets")
+
+    def __init__(self, data: memoryview, offsets: memoryview):
+        self._data = data
+        self._offsets = offsets
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, index: int) -> str:
+        if index < 0:
+            index += len(self)
+        return str(self._data[self._offsets[index]:self._offsets[index + 1]], "utf-8")
+
+    def __iter__(self):
+        data, offsets = self._data, self._offsets
+        for index in range(len(offsets) - 1):
+            yield str(data[offsets[index]:offsets[index + 1]], "utf-8")
+
+class CodedColumn:
+    # Columna con pocos valores distintos (categorías, tipo): cada fila guarda
+    # el índice de su valor, y todas comparten el mismo objeto str.
+    __slots__ = ("_values", "_codes")
+
+    def __init__(self, values: list[str], codes):
+        self._values = values
+        self._codes = codes
+
+    def __len__(self) -> int:
+        return len(self._codes)
+
+    def __getitem__(self, index: int) -> str:
+        return self._values[self._codes[index]]
+
+    def __iter__(self):
+        values = self._values
+        for code in self._codes:
+            yield values[code]
+
+class CatalogSnapshot:
+    # indexes guarda, por conjunto de campos, los textos normalizados y las
+    # listas de trigramas y tokens con las que se arma cada SearchIndex.
+    def __init__(self, db_version: int, columns: dict, indexes: dict[tuple[str, ...], tuple], mapped: mmap.mmap):
+        self.db_version = db_version
+        self.columns = columns
+        self.indexes = indexes
+        self._mapped = mapped
+
+def snapshot_path(db_path: str) -> str:
+    return f"{db_path}.snapshot"
+
+def _encode_strings(values) -> tuple[bytes, array]:
+    offsets = array("q", [0])
+    chunks = []
+    total = 0
+    for value in values:
+        encoded = value.encode("utf-8")
+        chunks.append(encoded)
+        total += len(encoded)
+        offsets.append(total)
+    return b"".join(chunks), offsets
+
+def _encode_codes(values) -> tuple[list[str], array]:
+    table: dict[str, int] = {}
+    codes = array("i", (table.setdefault(value, len(table)) for value in values))
+    return list(table), codes
+
+def write_snapshot(path: str, db_version: int, source: dict, columns: dict, indexes: dict[tuple[str, ...], SearchIndex]) -> None:
+    # source identifica la base de datos (réplica e inodo del archivo): tras
+    # restaurar o recrear streams.db el contador de versión puede coincidir.
+    sections: list[tuple[str, bytes | array, str]] = []
+    header: dict = {"format": FORMAT_VERSION, "db_version": db_version, "source": source, "sections": {}, "coded": {}, "indexes": []}
+
+    def add_strings(name: str, values) -> None:
+        data, offsets = _encode_strings(values)
+        sections.append((f"{name}.data", data, "B"))
+        sections.append((f"{name}.offsets", offsets, "q"))
+
+    sections.append(("ids", columns["ids"] if isinstance(columns["ids"], array) else array("q", columns["ids"]), "q"))
+    for name in ("nombres", "links"):
+        add_strings(name, columns[name])
+    for name in ("categorias", "tipos"):
+        values, codes = _encode_codes(columns[name])
+        header["coded"][name] = values
+        sections.append((f"{name}.codes", codes, "i"))
+
+    for number, (fields, index) in enumerate(indexes.items()):
+        prefix = f"index{number}"
+        header["indexes"].append({"fields": list(fields), "prefix": prefix})
+        add_strings(f"{prefix}.texts", index.texts)
+        for kind, postings in (("ngrams", index.ngram_rows), ("tokens", index.token_rows)):
+            add_strings(f"{prefix}.{kind}.keys", postings.keys)
+            sections.append((f"{prefix}.{kind}.offsets", array("q", postings.offsets), "q"))
+            sections.append((f"{prefix}.{kind}.rows", array("i", postings.rows), "i"))
+
+    directory, file_name = os.path.split(os.path.abspath(path))
+    with _write_lock:
+        descriptor, temporary_path = tempfile.mkstemp(dir=directory, prefix=f"{file_name}.", suffix=".tmp")
+        try:
+            with os.fdopen(descriptor, "wb") as f:
+                f.write(MAGIC)
+                for name, payload, typecode in sections:
+                    f.write(b"\0" * (-f.tell() % 8))
+                    offset = f.tell()
+                    data = payload.tobytes() if isinstance(payload, array) else payload
+                    f.write(data)
+                    header["sections"][name] = [offset, len(data), typecode]
+                header_bytes = json.dumps(header, ensure_ascii=False).encode("utf-8")
+                header_offset = f.tell()
+                f.write(header_bytes)
+                f.write(_trailer.pack(header_offset, len(header_bytes)))
+            os.replace(temporary_path, path)
+        except BaseException:
+            os.unlink(temporary_path)
+            raise
+
+def read_snapshot(path: str, expected_db_version: int, expected_source: dict) -> CatalogSnapshot | None:
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "rb") as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(mapped)
+        if view[:len(MAGIC)] != MAGIC:
+            raise ValueError("firma inválida")
+        header_offset, header_length = _trailer.unpack(view[-_trailer.size:])
+        header = json.loads(str(view[header_offset:header_offset + header_length], "utf-8"))
+        if header.get("format") != FORMAT_VERSION:
+            raise ValueError(f"formato {header.get('format')} no soportado")
+        if header["source"] != expected_source:
+            logger.info(f"Instantánea del catálogo de otra base de datos ({header['source']}, actual {expected_source})")
+            return None
+        if header["db_version"] != expected_db_version:
+            logger.info(f"Instantánea del catálogo desactualizada (versión {header['db_version']}, base de datos {expected_db_version})")
+            return None
+
+        def section(name: str) -> memoryview:
+            offset, length, typecode = header["sections"][name]
+            return view[offset:offset + length].cast(typecode)
+
+        def strings(name: str) -> MappedStrings:
+            return MappedStrings(section(f"{name}.data"), section(f"{name}.offsets"))
+
+        columns = {
+            "ids": section("ids"),
+            "nombres": strings("nombres"),
+            "links": strings("links"),
+        }
+        for name, values in header["coded"].items():
+            columns[name] = CodedColumn(values, section(f"{name}.codes"))
+
+        indexes = {}
+        for entry in header["indexes"]:
+            prefix = entry["prefix"]
+            postings = [
+                Postings(strings(f"{prefix}.{kind}.keys"), section(f"{prefix}.{kind}.offsets"), section(f"{prefix}.{kind}.rows"))
+                for kind in ("ngrams", "tokens")
+            ]
+            indexes[tuple(entry["fields"])] = (strings(f"{prefix}.texts"), *postings)
+        return CatalogSnapshot(header["db_version"], columns, indexes, mapped)
+    except (OSError, ValueError, KeyError, struct.error) as e:
+        logger.warning(f"Instantánea del catálogo ilegible en '{path}', se reconstruirá: {e}")
+        return None
@@ -0,0 +1,224 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import asyncio
+import logging
+import sys
+from array import array
+from bisect import bisect_left
+
+from sqlmodel import select
+
+from database.async_db import run_db
+from database.catalog_snapshot import read_snapshot, snapshot_path, write_snapshot
+from database.models import DB_PATH, Stream, bump_catalog_version, get_catalog_version, get_db_catalog_version, get_db_source, get_session
+from utils.config_manager import CATALOG_SNAPSHOT_ENABLED, MAX_TABLE_ROWS, SEARCH_FUZZY
+from utils.metrics import metrics
+from utils.search_index import SearchIndex, fold_text
+
+logger = logging.getLogger(__name__)
+
+class CatalogStore:
+    # Catálogo en columnas: un array de ids y una lista por campo en lugar de
+    # un dict por stream. Categorías y tipo se repiten mucho y se internan,
+    # así que todas las filas comparten el mismo objeto str. Las vistas
+    # filtradas son arrays de índices de fila, nunca copias de los datos.
+    # Las columnas también pueden venir mapeadas desde la instantánea: solo
+    # se leen por posición, nunca se modifican en sitio.
+    __slots__ = ("ids", "nombres", "links", "categorias", "tipos", "version", "db_version")
+
+    def __init__(self):
+        self.ids = array("q")
+        self.nombres: list[str] = []
+        self.links: list[str] = []
+        self.categorias: list[str] = []
+        self.tipos: list[str] = []
+        self.version = -1
+        # Versión de SQLite con la que se cargó: la única que ven los cambios
+        # hechos por el daemon, la línea de comandos u otra interfaz.
+        self.db_version: int | None = None
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def replace(self, rows, version: int) -> None:
+        ids = array("q")
+        nombres, links, categorias, tipos = [], [], [], []
+        for stream_id, nombre, link, categoria, tipo in rows:
+            ids.append(stream_id)
+            nombres.append(nombre)
+            links.append(link)
+            categorias.append(sys.intern(categoria or ""))
+            tipos.append(sys.intern(tipo or ""))
+        self.ids, self.nombres, self.links, self.categorias, self.tipos = ids, nombres, links, categorias, tipos
+        self.version = version
+
+    def adopt(self, columns: dict, version: int) -> None:
+        self.ids = columns["ids"]
+        self.nombres = columns["nombres"]
+        self.links = columns["links"]
+        self.categorias = columns["categorias"]
+        self.tipos = columns["tipos"]
+        self.version = version
+
+    def columns(self) -> dict:
+        return {"ids": self.ids, "nombres": self.nombres, "links": self.links, "categorias": self.categorias, "tipos": self.tipos}
+
+    def all_rows(self) -> array:
+        return array("l", range(len(self.ids)))
+
+    def row_of(self, stream_id: int) -> int | None:
+        # Los ids se cargan ordenados, así que basta una búsqueda binaria.
+        row = bisect_left(self.ids, stream_id)
+        if row < len(self.ids) and self.ids[row] == stream_id:
+            return row
+        return None
+
+    def row_dict(self, row: int) -> dict:
+        return {
+            "id": self.ids[row],
+            "nombre": self.nombres[row],
+            "link": self.links[row],
+            "categorias": self.categorias[row],
+            "tipo": self.tipos[row],
+        }
+
+    def is_video(self, row: int) -> bool:
+        return self.tipos[row].lower() == "video"
+
+def load_catalog_rows() -> list[tuple]:
+    with get_session() as session:
+        return list(session.exec(
+            select(Stream.id, Stream.nombre, Stream.link, Stream.categorias, Stream.tipo).order_by(Stream.id)
+        ).all())
+
+# Una sola instancia compartida por el gestor y el reproductor.
+_catalog = CatalogStore()
+_load_lock: asyncio.Lock | None = None
+_index_lock: asyncio.Lock | None = None
+_search_indexes: dict[tuple[str, ...], SearchIndex] = {}
+_snapshot_task: asyncio.Task | None = None
+
+# Índices que se guardan en la instantánea: los del gestor y del reproductor.
+SNAPSHOT_INDEX_FIELDS = (("nombres", "categorias", "tipos"), ("nombres",))
+
+def get_catalog() -> CatalogStore:
+    return _catalog
+
+async def load_catalog(force: bool = False) -> CatalogStore:
+    global _load_lock
+    if _load_lock is None:
+        _load_lock = asyncio.Lock()
+    async with _load_lock:
+        db_version = await run_db(get_db_catalog_version)
+        if _catalog.version == get_catalog_version() and _catalog.db_version not in (None, db_version):
+            # Otro proceso cambió la base de datos: el contador en memoria
+            # avanza para que índices y pantallas también se invaliden.
+            bump_catalog_version()
+        version = get_catalog_version()
+        if force or _catalog.version != version:
+            with metrics.timer("catalog.load_ms"):
+                if not CATALOG_SNAPSHOT_ENABLED or not await _load_snapshot(db_version, version):
+                    rows = await run_db(load_catalog_rows)
+                    _catalog.replace(rows, version)
+                    if CATALOG_SNAPSHOT_ENABLED:
+                        _schedule_snapshot(db_version, version)
+                _catalog.db_version = db_version
+            metrics.set_gauge("catalog.streams", len(_catalog))
+            logger.debug(f"Catálogo cargado: {len(_catalog)} streams (versión {version}).")
+    return _catalog
+
+async def _load_snapshot(db_version: int, version: int) -> bool:
+    source = await run_db(get_db_source)
+    snapshot = await asyncio.to_thread(read_snapshot, snapshot_path(DB_PATH), db_version, source)
+    if snapshot is None:
+        return False
+    _catalog.adopt(snapshot.columns, version)
+    for fields, (texts, ngram_rows, token_rows) in snapshot.indexes.items():
+        _search_indexes[fields] = SearchIndex(texts, ngram_rows, token_rows, version)
+    metrics.increment("catalog.snapshot_hits")
+    logger.debug(f"Catálogo abierto desde la instantánea (versión de la base de datos {db_version}).")
+    return True
+
+async def catalog_is_stale(loaded_version: int) -> bool:
+    # Lo que cambió en este proceso se ve en el contador en memoria; lo que
+    # cambiaron otros, solo en la versión de SQLite.
+    if loaded_version != get_catalog_version():
+        return True
+    return await run_db(get_db_catalog_version) != _catalog.db_version
+
+def _schedule_snapshot(db_version: int, version: int) -> None:
+    global _snapshot_task
+    if _snapshot_task is not None and not _snapshot_task.done():
+        _snapshot_task.cancel()
+    _snapshot_task = asyncio.create_task(_save_snapshot(db_version, version))
+
+async def _save_snapshot(db_version: int, version: int) -> None:
+    # Se construyen los índices que faltan y se escribe la instantánea en
+    # segundo plano; si el catálogo cambió mientras tanto, ya no sirve.
+    try:
+        indexes = {fields: await load_search_index(fields) for fields in SNAPSHOT_INDEX_FIELDS}
+        if _catalog.version != version or any(index.version != version for index in indexes.values()):
+            return
+        source = await run_db(get_db_source)
+        with metrics.timer("catalog.snapshot_write_ms"):
+            await asyncio.to_thread(write_snapshot, snapshot_path(DB_PATH), db_version, source, _catalog.columns(), indexes)
+        logger.debug(f"Instantánea del catálogo guardada (versión de la base de datos {db_version}).")
+    except OSError as e:
+        logger.warning(f"No se pudo guardar la instantánea del catálogo: {e}")
+
+async def load_search_index(fields: tuple[str, ...]) -> SearchIndex:
+    # El índice se construye en un hilo aparte y se reutiliza mientras el
+    # catálogo no cambie de versión.
+    # El lock evita que la pantalla y la escritura de la instantánea
+    # construyan el mismo índice a la vez.
+    global _index_lock
+    if _index_lock is None:
+        _index_lock = asyncio.Lock()
+    catalog = await load_catalog()
+    async with _index_lock:
+        index = _search_indexes.get(fields)
+        if index is None or index.version != catalog.version:
+            columns = [getattr(catalog, field) for field in fields]
+            with metrics.timer("search.index_build_ms"):
+                index = await asyncio.to_thread(SearchIndex.build, columns, catalog.version)
+            _search_indexes[fields] = index
+            logger.debug(f"Índice de búsqueda {fields} construido: {len(index)} filas.")
+    return index
+
+class CatalogSearch:
+    # Búsqueda de una pantalla sobre uno de los índices del catálogo. Si la
+    # consulta extiende la anterior sobre el mismo catálogo, se filtra el
+    # resultado previo en lugar de todas las filas.
+    def __init__(self, fields: tuple[str, ...]):
+        self.fields = fields
+        self.last_search: tuple[str, int] | None = None
+
+    def reset(self) -> None:
+        self.last_search = None
+
+    async def run(self, search_value: str, previous_rows: array) -> tuple[array, bool, list[str]]:
+        index = await load_search_index(self.fields)
+        query = fold_text(search_value.strip())
+
+        within = None
+        if self.last_search and self.last_search[1] == index.version and self.last_search[0] and self.last_search[0] in query:
+            within = previous_rows
+
+        with metrics.timer("search.query_ms"):
+            rows = index.search(query, within)
+        fuzzy = False
+        if not rows and query and SEARCH_FUZZY:
+            with metrics.timer("search.fuzzy_ms"):
+                rows = await asyncio.to_thread(index.fuzzy_search, query, MAX_TABLE_ROWS)
+            fuzzy = bool(rows)
+
+        self.last_search = (query, index.version) if not fuzzy else None
+        return rows, fuzzy, search_status_parts(len(rows), fuzzy)
+
+def search_status_parts(total: int, fuzzy: bool) -> list[str]:
+    if fuzzy:
+        return [f"Sin coincidencias exactas: {total} resultados aproximados"]
+    if total > MAX_TABLE_ROWS:
+        return [f"Mostrando {MAX_TABLE_ROWS} de {total} streams: escribe para acotar"]
+    return []
@@ -0,0 +1,83 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import time
+import logging
+from sqlmodel import Session, select, delete
+
+from database.models import Stream, StreamMirror, get_session
+
+logger = logging.getLogger(__name__)
+
+def parse_mirror_links(text: str) -> list[str]:
+    links = []
+    for link in text.replace("\n", ",").split(","):
+        link = link.strip()
+        if link and link not in links:
+            links.append(link)
+    return links
+
+def get_mirrors(session: Session, stream_id: int) -> list[StreamMirror]:
+    return list(session.exec(
+        select(StreamMirror).where(StreamMirror.stream_id == stream_id).order_by(StreamMirror.position)
+    ).all())
+
+def get_alternative_links(session: Session, stream: Stream) -> list[str]:
+    return [m.link for m in get_mirrors(session, stream.id) if m.link != stream.link]
+
+def get_candidate_links(session: Session, stream: Stream) -> list[str]:
+    mirrors = get_mirrors(session, stream.id)
+    if not mirrors:
+        return [stream.link]
+
+    def sort_key(mirror: StreamMirror):
+        unmeasured = mirror.latency_ms is None
+        return (unmeasured, mirror.failures, mirror.latency_ms or 0, mirror.position)
+
+    links = [m.link for m in sorted(mirrors, key=sort_key)]
+    if stream.link not in links:
+        links.append(stream.link)
+    return links
+
+def save_mirrors(session: Session, stream: Stream, alternative_links: list[str]) -> None:
+    existing = {m.link: m for m in get_mirrors(session, stream.id)}
+    links = [stream.link] + [link for link in alternative_links if link != stream.link]
+
+    if len(links) == 1:
+        for mirror in existing.values():
+            session.delete(mirror)
+        return
+
+    for position, link in enumerate(links):
+        mirror = existing.pop(link, None)
+        if mirror is None:
+            mirror = StreamMirror(stream_id=stream.id, link=link)
+        mirror.position = position
+        session.add(mirror)
+    for mirror in existing.values():
+        session.delete(mirror)
+
+def delete_mirrors(session: Session, stream_ids: list[int]) -> None:
+    if stream_ids:
+        session.execute(delete(StreamMirror).where(StreamMirror.stream_id.in_(stream_ids)))
+
+def record_probe_results(stream_id: int, results: dict[str, float | None]) -> None:
+    now = time.time()
+    try:
+        with get_session() as session:
+            for mirror in get_mirrors(session, stream_id):
+                if mirror.link not in results:
+                    continue
+                latency = results[mirror.link]
+                if latency is None:
+                    mirror.failures += 1
+                else:
+                    mirror.latency_ms = latency
+                    mirror.failures = 0
+                mirror.last_checked = now
+                session.add(mirror)
+    except Exception as e:
+        logger.error(f"Error al guardar latencias de espejos del stream {stream_id}: {e}", exc_info=True)
+
+def record_mirror_failure(stream_id: int, link: str) -> None:
+    record_probe_results(stream_id, {link: None})
@@ -1,7 +1,11 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
+import hashlib
 import os
+import time
+import uuid
+from sqlalchemy import event, inspect, text
 from sqlmodel import Field, SQLModel, create_engine, Session, select
 from typing import Optional
 from contextlib import contextmanager
@@ -17,9 +21,101 @@ class Stream(SQLModel, table=True):
     link: str
     categorias: str
     tipo: str
+    # Seguimiento para sincronizar catálogos: uid identifica el stream entre
+    # bases de datos, updated_at y content_hash deciden los conflictos y
+    # change_seq (lo asigna SQLite) ordena los cambios locales. Los valores
+    # por defecto también van en el esquema para los INSERT que los omiten;
+    # el trigger de inserción reemplaza el uid vacío.
+    uid: str = Field(default_factory=lambda: uuid.uuid4().hex, index=True, sa_column_kwargs={"server_default": ""})
+    updated_at: float = Field(default=0, sa_column_kwargs={"server_default": "0"})
+    content_hash: str = Field(default="", sa_column_kwargs={"server_default": ""})
+    change_seq: int = Field(default=0, index=True, sa_column_kwargs={"server_default": "0"})
+
+class StreamMirror(SQLModel, table=True):
+    id: Optional[int] = Field(default=None, primary_key=True)
+    stream_id: int = Field(foreign_key="stream.id", index=True)
+    link: str
+    position: int = 0
+    latency_ms: Optional[float] = None
+    failures: int = 0
+    last_checked: Optional[float] = None
+
+class StreamTombstone(SQLModel, table=True):
+    uid: str = Field(primary_key=True)
+    deleted_at: float
+    change_seq: int = Field(default=0, index=True)
+
+class SyncPeer(SQLModel, table=True):
+    # Hasta dónde se intercambiaron cambios con otra réplica: sent_seq es el
+    # último change_seq local que la otra confirmó y received_seq el último
+    # suyo aplicado aquí.
+    peer_id: str = Field(primary_key=True)
+    sent_seq: int = 0
+    received_seq: int = 0
+    synced_at: Optional[float] = None
+
+def stream_content_hash(nombre: str, link: str, categorias: str, tipo: str, mirrors: list[str]) -> str:
+    content = "\x1f".join([nombre, link, categorias, tipo, *mirrors])
+    return hashlib.sha1(content.encode("utf-8")).hexdigest()
+
+class StreamStats(SQLModel, table=True):
+    stream_id: int = Field(primary_key=True, foreign_key="stream.id")
+    sessions: int = 0
+    rebuffer_events: int = 0
+    underruns: int = 0
+    clean_sessions: int = 0
+    network_caching_ms: Optional[int] = None
+    total_play_seconds: float = 0
+    total_read_bytes: int = 0
+    total_demux_bytes: int = 0
+    demux_corrupted: int = 0
+    demux_discontinuity: int = 0
+    updated_at: Optional[float] = None
+
+class PlayEvent(SQLModel, table=True):
+    id: Optional[int] = Field(default=None, primary_key=True)
+    stream_id: int = Field(foreign_key="stream.id", index=True)
+    started_at: float = Field(index=True)
+    duration_seconds: float = 0
+    startup_ms: Optional[float] = None
+    failed: bool = False
+
+# Resumen por stream de play_event, actualizado en cada lote: las vistas de
+# más reproducidos y recientes se leen de sus índices sin agregar eventos.
+class StreamPlayStats(SQLModel, table=True):
+    stream_id: int = Field(primary_key=True, foreign_key="stream.id")
+    play_count: int = Field(default=0, index=True)
+    failure_count: int = 0
+    total_seconds: float = 0
+    total_startup_ms: float = 0
+    startup_samples: int = 0
+    last_played_at: Optional[float] = Field(default=None, index=True)
+
+# Contador en memoria de cambios del catálogo: las pantallas guardan el valor
+# con el que cargaron sus datos y solo recargan cuando cambia.
+catalog_version = 0
+
+def get_catalog_version() -> int:
+    return catalog_version
+
+def bump_catalog_version() -> None:
+    global catalog_version
+    catalog_version += 1
+
+@event.listens_for(Stream, "after_insert")
+@event.listens_for(Stream, "after_update")
+@event.listens_for(Stream, "after_delete")
+def _on_stream_changed(mapper, connection, target) -> None:
+    bump_catalog_version()
+
+@event.listens_for(Stream, "before_insert")
+@event.listens_for(Stream, "before_update")
+def _stamp_stream_update(mapper, connection, target) -> None:
+    target.updated_at = time.time()
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-DB_PATH = os.path.join(BASE_DIR, '..', 'streams.db')
+# QUIET_STREAM_DB permite usar otra base de datos (benchmarks, pruebas manuales).
+DB_PATH = os.environ.get('QUIET_STREAM_DB') or os.path.join(BASE_DIR, '..', 'streams.db')
 sqlite_url = f"sqlite:///{DB_PATH}"
 
 engine = create_engine(
@@ -29,11 +125,87 @@ engine = create_engine(
     pool_pre_ping=True
 )
 
-def create_db_and_tables():
+# Versión del catálogo mantenida por SQLite: cualquier cambio en stream, venga
+# de la interfaz, del daemon, de la línea de comandos o de SQL directo, la
+# incrementa. Con ella se valida la instantánea binaria del catálogo. La
+# incrementan los triggers de SYNC_DDL; los que solo la incrementaban se
+# eliminan de las bases anteriores para no contar cada cambio varias veces.
+CATALOG_VERSION_DDL = [
+    "CREATE TABLE IF NOT EXISTS catalog_version (id INTEGER PRIMARY KEY CHECK (id = 1), version INTEGER NOT NULL)",
+    "INSERT OR IGNORE INTO catalog_version (id, version) VALUES (1, 0)",
+] + [
+    f"DROP TRIGGER IF EXISTS stream_catalog_version_{operation}"
+    for operation in ("insert", "update", "delete")
+]
+
+# Cada cambio en stream recibe un change_seq nuevo tomado del mismo contador,
+# y cada borrado deja una lápida con su uid para propagarlo al sincronizar.
+# Las filas insertadas sin uid (SQL directo, bases antiguas) reciben uno.
+_UNIX_NOW = "((julianday('now') - 2440587.5) * 86400.0)"
+SYNC_DDL = [
+    "CREATE TABLE IF NOT EXISTS sync_replica (id INTEGER PRIMARY KEY CHECK (id = 1), replica_id TEXT NOT NULL)",
+    "INSERT OR IGNORE INTO sync_replica (id, replica_id) VALUES (1, lower(hex(randomblob(16))))",
+    "CREATE TRIGGER IF NOT EXISTS stream_change_insert AFTER INSERT ON stream BEGIN "
+    "UPDATE catalog_version SET version = version + 1 WHERE id = 1; "
+    "UPDATE stream SET change_seq = (SELECT version FROM catalog_version WHERE id = 1), "
+    "uid = CASE WHEN NEW.uid = '' THEN lower(hex(randomblob(16))) ELSE NEW.uid END WHERE id = NEW.id; END",
+    "CREATE TRIGGER IF NOT EXISTS stream_change_update AFTER UPDATE ON stream WHEN NEW.change_seq IS OLD.change_seq BEGIN "
+    "UPDATE catalog_version SET version = version + 1 WHERE id = 1; "
+    "UPDATE stream SET change_seq = (SELECT version FROM catalog_version WHERE id = 1) WHERE id = NEW.id; END",
+    "CREATE TRIGGER IF NOT EXISTS stream_change_delete AFTER DELETE ON stream BEGIN "
+    "UPDATE catalog_version SET version = version + 1 WHERE id = 1; "
+    f"INSERT OR REPLACE INTO streamtombstone (uid, deleted_at, change_seq) VALUES (OLD.uid, {_UNIX_NOW}, "
+    "(SELECT version FROM catalog_version WHERE id = 1)); END",
+    "UPDATE stream SET uid = lower(hex(randomblob(16))) WHERE uid = ''",
+]
+
+def create_db_and_tables(db_engine=None):
+    # db_engine permite preparar otra base de datos, como la otra parte de
+    # una sincronización.
+    db_engine = db_engine or engine
     logger.info("Creando tablas...")
-    SQLModel.metadata.create_all(engine)
+    SQLModel.metadata.create_all(db_engine)
+    migrate_columns(db_engine)
+    with db_engine.begin() as conn:
+        for ddl in CATALOG_VERSION_DDL + SYNC_DDL:
+            conn.execute(text(ddl))
     logger.info("Tablas creadas correctamente")
 
+def migrate_columns(db_engine=None):
+    # create_all no modifica tablas existentes: las columnas nuevas de los
+    # modelos se agregan con ALTER TABLE y su valor por defecto, y luego
+    # se crean los índices que falten.
+    db_engine = db_engine or engine
+    inspector = inspect(db_engine)
+    with db_engine.begin() as conn:
+        for table in SQLModel.metadata.sorted_tables:
+            existing = {c["name"] for c in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                column_type = column.type.compile(dialect=db_engine.dialect)
+                default = column.default.arg if column.default is not None and column.default.is_scalar else None
+                if default is None and not column.nullable:
+                    default = 0 if column_type in ("INTEGER", "FLOAT", "BOOLEAN") else ""
+                ddl = f'ALTER TABLE "{table.name}" ADD COLUMN "{column.name}" {column_type}'
+                if default is not None:
+                    ddl += f" DEFAULT {default!r}" if isinstance(default, str) else f" DEFAULT {default}"
+                logger.info(f"Migración: agregando columna {table.name}.{column.name}")
+                conn.execute(text(ddl))
+            for index in table.indexes:
+                index.create(conn, checkfirst=True)
+
+def get_db_catalog_version() -> int:
+    with engine.connect() as conn:
+        return conn.execute(text("SELECT version FROM catalog_version WHERE id = 1")).scalar_one()
+
+def get_db_source() -> dict:
+    # Identifica el archivo de base de datos más allá de su versión: una copia
+    # restaurada o un streams.db recreado cambian de réplica o de inodo.
+    with engine.connect() as conn:
+        replica_id = conn.execute(text("SELECT replica_id FROM sync_replica WHERE id = 1")).scalar_one()
+    return {"replica": replica_id, "inode": os.stat(DB_PATH).st_ino}
+
 @contextmanager
 def get_session():
     session = Session(engine)
@@ -0,0 +1,162 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import atexit
+import logging
+import threading
+import time
+from collections import defaultdict
+
+from sqlalchemy import insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlmodel import Session, delete, select
+
+from database.models import PlayEvent, Stream, StreamPlayStats, engine, get_session
+from utils.config_manager import PLAY_HISTORY_ENABLED
+from utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+SORT_MOST_PLAYED = "most_played"
+SORT_RECENT = "recent"
+
+class PlayHistoryBuffer:
+    # Los eventos se acumulan en memoria y se escriben por lotes desde el
+    # hilo de la base de datos: la reproducción nunca espera a SQLite.
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending: list[dict] = []
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def append(self, event: dict) -> None:
+        with self._lock:
+            self._pending.append(event)
+        metrics.set_gauge("history.buffered", len(self._pending))
+
+    def flush(self) -> int:
+        with self._lock:
+            events, self._pending = self._pending, []
+        if not events:
+            return 0
+        try:
+            with metrics.timer("history.flush_ms"):
+                write_play_events(events)
+        except Exception as e:
+            logger.error(f"Error al guardar {len(events)} eventos de reproducción: {e}", exc_info=True)
+            with self._lock:
+                self._pending[:0] = events
+            return 0
+        metrics.increment("history.events_written", len(events))
+        metrics.set_gauge("history.buffered", len(self._pending))
+        logger.debug(f"Historial: {len(events)} eventos de reproducción guardados")
+        return len(events)
+
+_buffer = PlayHistoryBuffer()
+
+def get_play_history_buffer() -> PlayHistoryBuffer:
+    return _buffer
+
+class PlayHistoryRecorder:
+    # Sigue la reproducción en curso y la convierte en un evento al cambiar
+    # de stream o detenerse. Los avisos del motor (primer audio, error) llegan
+    # desde hilos de VLC, de ahí el lock.
+    def __init__(self, buffer: PlayHistoryBuffer | None = None):
+        self._buffer = buffer or _buffer
+        self._lock = threading.Lock()
+        self._current: dict | None = None
+
+    def started(self, stream_id: int) -> None:
+        with self._lock:
+            self._close()
+            self._current = {
+                "stream_id": stream_id,
+                "started_at": time.time(),
+                "started_monotonic": time.monotonic(),
+                "startup_ms": None,
+                "failed": False,
+            }
+
+    def on_playback_event(self, kind: str, stream_id: int, **data) -> None:
+        with self._lock:
+            current = self._current
+            if current is None or current["stream_id"] != stream_id:
+                return
+            if kind == "playing" and current["startup_ms"] is None:
+                current["startup_ms"] = data.get("startup_ms")
+            elif kind == "failed":
+                current["failed"] = True
+
+    def stopped(self) -> None:
+        with self._lock:
+            self._close()
+
+    def _close(self) -> None:
+        current, self._current = self._current, None
+        if current is None:
+            return
+        current["duration_seconds"] = round(time.monotonic() - current.pop("started_monotonic"), 3)
+        self._buffer.append(current)
+
+def write_play_events(events: list[dict]) -> None:
+    totals: dict[int, dict] = defaultdict(lambda: {
+        "play_count": 0, "failure_count": 0, "total_seconds": 0.0,
+        "total_startup_ms": 0.0, "startup_samples": 0, "last_played_at": 0.0,
+    })
+    for event in events:
+        total = totals[event["stream_id"]]
+        total["play_count"] += 1
+        total["failure_count"] += int(event["failed"])
+        total["total_seconds"] += event["duration_seconds"]
+        if event["startup_ms"] is not None:
+            total["total_startup_ms"] += event["startup_ms"]
+            total["startup_samples"] += 1
+        total["last_played_at"] = max(total["last_played_at"], event["started_at"])
+
+    with engine.begin() as conn:
+        # Los eventos de streams borrados mientras esperaban en el buffer se descartan.
+        existing = set(conn.execute(select(Stream.id).where(Stream.id.in_(list(totals)))).scalars())
+        rows = [
+            {key: event[key] for key in ("stream_id", "started_at", "duration_seconds", "startup_ms", "failed")}
+            for event in events if event["stream_id"] in existing
+        ]
+        if not rows:
+            return
+        conn.execute(insert(PlayEvent), rows)
+        stats = StreamPlayStats.__table__
+        statement = sqlite_insert(stats).values([
+            {"stream_id": stream_id, **total} for stream_id, total in totals.items() if stream_id in existing
+        ])
+        conn.execute(statement.on_conflict_do_update(
+            index_elements=[stats.c.stream_id],
+            set_={
+                "play_count": stats.c.play_count + statement.excluded.play_count,
+                "failure_count": stats.c.failure_count + statement.excluded.failure_count,
+                "total_seconds": stats.c.total_seconds + statement.excluded.total_seconds,
+                "total_startup_ms": stats.c.total_startup_ms + statement.excluded.total_startup_ms,
+                "startup_samples": stats.c.startup_samples + statement.excluded.startup_samples,
+                "last_played_at": statement.excluded.last_played_at,
+            },
+        ))
+
+def get_play_ranking(sort: str) -> list[int]:
+    # Ids de los streams reproducidos, del primero al último según el orden;
+    # la consulta recorre el índice de play_count o de last_played_at.
+    if sort == SORT_MOST_PLAYED:
+        order = (StreamPlayStats.play_count.desc(), StreamPlayStats.last_played_at.desc())
+    elif sort == SORT_RECENT:
+        order = (StreamPlayStats.last_played_at.desc(),)
+    else:
+        raise ValueError(f"Orden de historial desconocido: {sort}")
+    with get_session() as session:
+        return list(session.exec(select(StreamPlayStats.stream_id).order_by(*order)).all())
+
+def delete_play_history(session: Session, stream_ids: list[int]) -> None:
+    if stream_ids:
+        session.execute(delete(PlayEvent).where(PlayEvent.stream_id.in_(stream_ids)))
+        session.execute(delete(StreamPlayStats).where(StreamPlayStats.stream_id.in_(stream_ids)))
+
+if PLAY_HISTORY_ENABLED:
+    # Lo que quede en el buffer al salir se escribe antes de cerrar.
+    atexit.register(_buffer.flush)
@@ -0,0 +1,196 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import logging
+import time
+from collections import defaultdict
+from sqlmodel import Session, delete, select, update
+
+from database.models import Stream, StreamMirror, bump_catalog_version, get_session, stream_content_hash
+from database.mirrors import delete_mirrors, get_alternative_links, get_candidate_links, save_mirrors
+from database.play_history import delete_play_history
+from database.stream_stats import delete_stream_stats
+from utils.metrics import metrics
+from utils.profiling import profiled
+
+logger = logging.getLogger(__name__)
+
+SQL_IN_CHUNK = 500
+
+def get_playable_stream(stream_id: int) -> dict | None:
+    with get_session() as session:
+        stream_obj = session.get(Stream, stream_id)
+        if not stream_obj:
+            return None
+        stream_data = stream_obj.model_dump()
+        stream_data["mirrors"] = get_candidate_links(session, stream_obj)
+        return stream_data
+
+def get_stream_for_edit(stream_id: int) -> dict | None:
+    with get_session() as session:
+        stream_obj = session.get(Stream, stream_id)
+        if not stream_obj:
+            return None
+        stream_data = stream_obj.model_dump()
+        stream_data["mirrors"] = get_alternative_links(session, stream_obj)
+        return stream_data
+
+def save_stream(stream_id: int | None, data: dict, mirror_links: list[str]) -> dict | None:
+    with get_session() as session:
+        if stream_id is None:
+            stream_obj = Stream(**data)
+            session.add(stream_obj)
+            session.flush()
+        else:
+            stream_obj = session.get(Stream, stream_id)
+            if not stream_obj:
+                return None
+            for field, value in data.items():
+                setattr(stream_obj, field, value)
+        save_mirrors(session, stream_obj, mirror_links)
+        refresh_content_hashes(session, [stream_obj.id])
+        session.commit()
+        session.refresh(stream_obj)
+        return stream_obj.model_dump()
+
+def list_stream_ids() -> list[int]:
+    with get_session() as session:
+        return list(session.exec(select(Stream.id).order_by(Stream.id)).all())
+
+def list_stream_dicts() -> list[dict]:
+    with get_session() as session:
+        return [s.model_dump() for s in session.exec(select(Stream)).all()]
+
+@profiled("export")
+def export_stream_dicts() -> list[dict]:
+    with metrics.timer("catalog.export_ms"), get_session() as session:
+        streams_data = []
+        for s in session.exec(select(Stream)).all():
+            # El uid viaja con el stream; el resto del seguimiento es local.
+            stream_dict = s.model_dump(exclude={"updated_at", "content_hash", "change_seq"})
+            mirrors = get_alternative_links(session, s)
+            if mirrors:
+                stream_dict["mirrors"] = mirrors
+            streams_data.append(stream_dict)
+        metrics.increment("catalog.exported_streams", len(streams_data))
+        return streams_data
+
+@profiled("import")
+def import_stream_dicts(data: list) -> tuple[int, int]:
+    imported_count = 0
+    skipped_count = 0
+    required_fields = ["nombre", "link", "categorias", "tipo"]
+
+    with metrics.timer("catalog.import_ms"), get_session() as session:
+        for stream_data in data:
+            if not isinstance(stream_data, dict) or not all(field in stream_data for field in required_fields):
+                logger.warning(f"Stream con campos faltantes, saltando: {stream_data}")
+                skipped_count += 1
+                continue
+
+            if not all(isinstance(stream_data.get(field), str) and stream_data.get(field).strip() for field in required_fields):
+                logger.warning(f"Stream con datos inválidos (no string o vacío), saltando: {stream_data}")
+                skipped_count += 1
+                continue
+
+            existing_stream = session.exec(
+                select(Stream).where(
+                    (Stream.nombre == stream_data["nombre"].strip()) |
+                    (Stream.link == stream_data["link"].strip())
+                )
+            ).first()
+
+            if existing_stream:
+                logger.info(f"Stream '{stream_data['nombre']}' ya existe, saltando")
+                skipped_count += 1
+                continue
+
+            try:
+                new_stream = Stream(
+                    nombre=stream_data["nombre"].strip(),
+                    link=stream_data["link"].strip(),
+                    categorias=stream_data["categorias"].strip(),
+                    tipo=stream_data["tipo"].strip()
+                )
+                # Un uid exportado se conserva: el stream sigue siendo el mismo
+                # al sincronizar con el catálogo de origen.
+                if isinstance(stream_data.get("uid"), str) and stream_data["uid"].strip():
+                    new_stream.uid = stream_data["uid"].strip()
+                mirrors = stream_data.get("mirrors") or []
+                mirror_links = [m.strip() for m in mirrors if isinstance(m, str) and m.strip()] if isinstance(mirrors, list) else []
+                new_stream.content_hash = stream_content_hash(
+                    new_stream.nombre, new_stream.link, new_stream.categorias, new_stream.tipo,
+                    [link for link in mirror_links if link != new_stream.link]
+                )
+                session.add(new_stream)
+                session.flush()
+                save_mirrors(session, new_stream, mirror_links)
+                session.commit()
+                session.refresh(new_stream)
+                imported_count += 1
+                logger.info(f"Stream '{new_stream.nombre}' importado correctamente")
+            except Exception as db_e:
+                logger.error(f"Error al insertar stream '{stream_data.get('nombre', 'N/A')}': {db_e}", exc_info=True)
+                skipped_count += 1
+                session.rollback()
+
+    metrics.increment("catalog.imported_streams", imported_count)
+    return imported_count, skipped_count
+
+def refresh_content_hashes(session: Session, stream_ids: list[int]) -> None:
+    # El hash cubre los campos y los espejos alternativos, así que se calcula
+    # después de guardarlos; solo se escribe si cambió.
+    session.flush()
+    mirrors: dict[int, list[str]] = defaultdict(list)
+    for stream_id, link in session.exec(
+        select(StreamMirror.stream_id, StreamMirror.link)
+        .where(StreamMirror.stream_id.in_(stream_ids))
+        .order_by(StreamMirror.stream_id, StreamMirror.position)
+    ).all():
+        mirrors[stream_id].append(link)
+    for stream_obj in session.exec(select(Stream).where(Stream.id.in_(stream_ids))).all():
+        alternatives = [link for link in mirrors[stream_obj.id] if link != stream_obj.link]
+        content_hash = stream_content_hash(stream_obj.nombre, stream_obj.link, stream_obj.categorias, stream_obj.tipo, alternatives)
+        if stream_obj.content_hash != content_hash:
+            stream_obj.content_hash = content_hash
+            session.add(stream_obj)
+
+def _chunks(ids: list[int]):
+    # SQLite limita los parámetros por sentencia: los IN se parten en bloques,
+    # todos dentro de la misma transacción.
+    for start in range(0, len(ids), SQL_IN_CHUNK):
+        yield ids[start:start + SQL_IN_CHUNK]
+
+def delete_streams(stream_ids: list[int]) -> int:
+    ids = sorted(set(stream_ids))
+    if not ids:
+        return 0
+    deleted_count = 0
+    with get_session() as session:
+        for chunk in _chunks(ids):
+            delete_mirrors(session, chunk)
+            delete_stream_stats(session, chunk)
+            delete_play_history(session, chunk)
+            deleted_count += session.execute(delete(Stream).where(Stream.id.in_(chunk))).rowcount
+    bump_catalog_version()
+    logger.info(f"Eliminados {deleted_count} streams de {len(ids)} solicitados")
+    return deleted_count
+
+def update_streams(stream_ids: list[int], categorias: str | None = None, tipo: str | None = None) -> int:
+    values = {}
+    if categorias is not None:
+        values["categorias"] = categorias
+    if tipo is not None:
+        values["tipo"] = tipo
+    ids = sorted(set(stream_ids))
+    if not ids or not values:
+        return 0
+    updated_count = 0
+    values["updated_at"] = time.time()
+    with get_session() as session:
+        for chunk in _chunks(ids):
+            updated_count += session.execute(update(Stream).where(Stream.id.in_(chunk)).values(**values)).rowcount
+            refresh_content_hashes(session, chunk)
+    bump_catalog_version()
+    logger.info(f"Actualizados {updated_count} streams: {values}")
+    return updated_count
@@ -0,0 +1,50 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import time
+import logging
+from sqlmodel import Session, delete
+
+from database.models import StreamStats, get_session
+from playback.adaptive_caching import next_network_caching
+
+logger = logging.getLogger(__name__)
+
+def get_network_caching(stream_id: int, default_ms: int) -> int:
+    try:
+        with get_session() as session:
+            stats = session.get(StreamStats, stream_id)
+            if stats and stats.network_caching_ms:
+                return stats.network_caching_ms
+    except Exception as e:
+        logger.error(f"Error al leer estadísticas del stream {stream_id}: {e}", exc_info=True)
+    return default_ms
+
+def record_playback_session(stream_id: int, rebuffers: int, underruns: int,
+                            duration: float, caching_ms: int, read_bytes: int = 0,
+                            demux_bytes: int = 0, corrupted: int = 0, discontinuities: int = 0) -> None:
+    try:
+        with get_session() as session:
+            stats = session.get(StreamStats, stream_id) or StreamStats(stream_id=stream_id)
+            stats.sessions += 1
+            stats.rebuffer_events += rebuffers
+            stats.underruns += underruns
+            stats.total_play_seconds += duration
+            stats.total_read_bytes += read_bytes
+            stats.total_demux_bytes += demux_bytes
+            stats.demux_corrupted += corrupted
+            stats.demux_discontinuity += discontinuities
+            stats.network_caching_ms, stats.clean_sessions = next_network_caching(
+                caching_ms, rebuffers, underruns, stats.clean_sessions, duration
+            )
+            stats.updated_at = time.time()
+            session.add(stats)
+            if stats.network_caching_ms != caching_ms:
+                logger.info(f"Stream {stream_id}: network-caching {caching_ms} -> {stats.network_caching_ms} ms "
+                            f"({rebuffers} rebuffers, {underruns} underruns)")
+    except Exception as e:
+        logger.error(f"Error al guardar estadísticas del stream {stream_id}: {e}", exc_info=True)
+
+def delete_stream_stats(session: Session, stream_ids: list[int]) -> None:
+    if stream_ids:
+        session.execute(delete(StreamStats).where(StreamStats.stream_id.in_(stream_ids)))
@@ -0,0 +1,296 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import logging
+import os
+import time
+from collections import defaultdict
+
+from sqlalchemy import bindparam, create_engine, insert, text
+from sqlalchemy.engine import Connection, Engine
+from sqlmodel import delete, select, update
+
+from database.models import (
+    PlayEvent, Stream, StreamMirror, StreamPlayStats, StreamStats, StreamTombstone, SyncPeer,
+    create_db_and_tables, stream_content_hash,
+)
+from utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+SYNC_FORMAT = 1
+SQL_IN_CHUNK = 500
+STREAM_FIELDS = ("nombre", "link", "categorias", "tipo")
+
+class SyncError(Exception):
+    pass
+
+# Sincronización incremental entre catálogos. Cada base de datos es una
+# réplica con su propio id; un delta lleva los streams y lápidas con
+# change_seq posterior a lo que la otra réplica ya confirmó, y los conflictos
+# se resuelven igual en ambos lados: gana el updated_at mayor y, si empatan,
+# el content_hash mayor. Un borrado gana a una edición con la misma fecha.
+
+def open_database(path: str) -> Engine:
+    # create_engine crearía un archivo vacío y se le enviaría todo el catálogo.
+    if not os.path.isfile(path):
+        raise SyncError(f"La base de datos '{path}' no existe")
+    db_engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False})
+    create_db_and_tables(db_engine)
+    return db_engine
+
+def get_replica_id(conn: Connection) -> str:
+    return conn.execute(text("SELECT replica_id FROM sync_replica WHERE id = 1")).scalar_one()
+
+def reset_replica_id(db_engine: Engine) -> str:
+    # Para copias de streams.db hechas a mano: dos archivos con el mismo id
+    # se tomarían por la misma réplica.
+    with db_engine.begin() as conn:
+        conn.execute(text("UPDATE sync_replica SET replica_id = lower(hex(randomblob(16))) WHERE id = 1"))
+        conn.execute(delete(SyncPeer))
+        return get_replica_id(conn)
+
+def _chunks(values: list):
+    for start in range(0, len(values), SQL_IN_CHUNK):
+        yield values[start:start + SQL_IN_CHUNK]
+
+def _current_seq(conn: Connection) -> int:
+    return conn.execute(text("SELECT version FROM catalog_version WHERE id = 1")).scalar_one()
+
+def _alternative_links(conn: Connection, streams: dict[int, str]) -> dict[int, list[str]]:
+    mirrors: dict[int, list[str]] = defaultdict(list)
+    for chunk in _chunks(list(streams)):
+        for stream_id, link in conn.execute(
+            select(StreamMirror.stream_id, StreamMirror.link)
+            .where(StreamMirror.stream_id.in_(chunk))
+            .order_by(StreamMirror.stream_id, StreamMirror.position)
+        ):
+            if link != streams[stream_id]:
+                mirrors[stream_id].append(link)
+    return mirrors
+
+def _backfill_content_hashes(conn: Connection) -> None:
+    # Filas anteriores al seguimiento o insertadas con SQL directo: sin hash
+    # no se podrían comparar con las de la otra réplica.
+    rows = conn.execute(
+        select(Stream.id, Stream.nombre, Stream.link, Stream.categorias, Stream.tipo).where(Stream.content_hash == "")
+    ).all()
+    if not rows:
+        return
+    mirrors = _alternative_links(conn, {row.id: row.link for row in rows})
+    conn.execute(update(Stream).where(Stream.id == bindparam("row_id")).values(content_hash=bindparam("hash")), [
+        {"row_id": row.id, "hash": stream_content_hash(row.nombre, row.link, row.categorias, row.tipo, mirrors[row.id])}
+        for row in rows
+    ])
+    logger.info(f"Sincronización: hash de contenido calculado para {len(rows)} streams")
+
+def _get_peer(conn: Connection, peer_id: str | None):
+    if not peer_id:
+        return None
+    return conn.execute(select(SyncPeer.sent_seq, SyncPeer.received_seq).where(SyncPeer.peer_id == peer_id)).first()
+
+def export_delta(db_engine: Engine, peer_id: str | None = None) -> dict:
+    # Sin peer_id se exporta todo el catálogo (con lápidas incluidas).
+    with db_engine.begin() as conn:
+        _backfill_content_hashes(conn)
+        peer = _get_peer(conn, peer_id)
+        since = peer.sent_seq if peer else 0
+        seq = _current_seq(conn)
+        rows = conn.execute(
+            select(Stream.id, Stream.uid, Stream.nombre, Stream.link, Stream.categorias, Stream.tipo,
+                   Stream.updated_at, Stream.content_hash)
+            .where(Stream.change_seq > since).order_by(Stream.change_seq)
+        ).all()
+        mirrors = _alternative_links(conn, {row.id: row.link for row in rows})
+        streams = []
+        for row in rows:
+            stream = {field: getattr(row, field) for field in ("uid", *STREAM_FIELDS, "updated_at")}
+            stream["mirrors"] = mirrors[row.id]
+            stream["content_hash"] = row.content_hash
+            streams.append(stream)
+        tombstones = [
+            {"uid": uid, "deleted_at": deleted_at}
+            for uid, deleted_at in conn.execute(
+                select(StreamTombstone.uid, StreamTombstone.deleted_at)
+                .where(StreamTombstone.change_seq > since).order_by(StreamTombstone.change_seq)
+            )
+        ]
+        acks = dict(conn.execute(select(SyncPeer.peer_id, SyncPeer.received_seq)).all())
+        replica_id = get_replica_id(conn)
+    metrics.increment("sync.exported_streams", len(streams))
+    return {
+        "format": SYNC_FORMAT,
+        "replica": replica_id,
+        "since": since,
+        "seq": seq,
+        "acks": acks,
+        "streams": streams,
+        "tombstones": tombstones,
+    }
+
+def _validate_delta(delta) -> None:
+    if not isinstance(delta, dict) or delta.get("format") != SYNC_FORMAT:
+        raise SyncError("El archivo no es un delta de sincronización compatible")
+    if not isinstance(delta.get("replica"), str) or not isinstance(delta.get("seq"), int):
+        raise SyncError("El delta no indica su réplica de origen")
+    for stream in delta.get("streams", []):
+        if not isinstance(stream, dict) or not isinstance(stream.get("uid"), str) or \
+                not all(isinstance(stream.get(field), str) for field in STREAM_FIELDS) or \
+                not isinstance(stream.get("updated_at"), (int, float)):
+            raise SyncError(f"Stream inválido en el delta: {stream}")
+    for tombstone in delta.get("tombstones", []):
+        if not isinstance(tombstone, dict) or not isinstance(tombstone.get("uid"), str) or \
+                not isinstance(tombstone.get("deleted_at"), (int, float)):
+            raise SyncError(f"Lápida inválida en el delta: {tombstone}")
+
+def _replace_mirrors(conn: Connection, stream_id: int, link: str, mirrors: list[str]) -> None:
+    conn.execute(delete(StreamMirror).where(StreamMirror.stream_id == stream_id))
+    links = [link] + [m for m in dict.fromkeys(mirrors) if m != link]
+    if len(links) > 1:
+        conn.execute(insert(StreamMirror), [
+            {"stream_id": stream_id, "link": mirror, "position": position} for position, mirror in enumerate(links)
+        ])
+
+def _delete_stream_rows(conn: Connection, stream_id: int) -> None:
+    for model in (StreamMirror, StreamStats, PlayEvent, StreamPlayStats):
+        conn.execute(delete(model).where(model.stream_id == stream_id))
+    conn.execute(delete(Stream).where(Stream.id == stream_id))
+
+def _record_tombstone(conn: Connection, uid: str, deleted_at: float, replace: bool = False) -> None:
+    # Una lápida recibida se guarda con change_seq propio para que llegue a
+    # las demás réplicas. replace corrige la que deja el trigger al borrar,
+    # que lleva la hora local en lugar de la del borrado original.
+    condition = "" if replace else " WHERE excluded.deleted_at > streamtombstone.deleted_at"
+    conn.execute(text("UPDATE catalog_version SET version = version + 1 WHERE id = 1"))
+    conn.execute(text(
+        "INSERT INTO streamtombstone (uid, deleted_at, change_seq) "
+        "VALUES (:uid, :deleted_at, (SELECT version FROM catalog_version WHERE id = 1)) "
+        "ON CONFLICT(uid) DO UPDATE SET deleted_at = excluded.deleted_at, change_seq = excluded.change_seq" + condition
+    ), {"uid": uid, "deleted_at": deleted_at})
+
+def apply_delta(db_engine: Engine, delta: dict) -> dict:
+    return _apply_delta(db_engine, delta)[0]
+
+def _apply_delta(db_engine: Engine, delta: dict) -> tuple[dict, int, int]:
+    # Además del resumen devuelve la secuencia local antes y después de
+    # aplicar: lo que quede entre ambas vino de la réplica que envió el delta.
+    _validate_delta(delta)
+    summary = {"inserted": 0, "updated": 0, "deleted": 0, "unchanged": 0, "conflicts": 0, "rejected": 0}
+    streams = delta.get("streams", [])
+    tombstones = delta.get("tombstones", [])
+
+    with metrics.timer("sync.apply_ms"), db_engine.begin() as conn:
+        replica_id = get_replica_id(conn)
+        if delta["replica"] == replica_id:
+            raise SyncError("El delta proviene de esta misma réplica (¿es una copia de esta base de datos? usa --reset-replica)")
+        _backfill_content_hashes(conn)
+        seq_before = _current_seq(conn)
+        peer = _get_peer(conn, delta["replica"])
+        # Solo es conflicto si el stream también cambió aquí desde la última
+        # vez que la otra réplica confirmó nuestros cambios.
+        sent_seq = peer.sent_seq if peer else 0
+
+        uids = [s["uid"] for s in streams] + [t["uid"] for t in tombstones]
+        links = [s["link"] for s in streams]
+        local_by_uid, local_by_link, local_tombstones = {}, {}, {}
+        columns = (Stream.id, Stream.uid, Stream.link, Stream.updated_at, Stream.content_hash, Stream.change_seq)
+        for chunk in _chunks(uids):
+            local_by_uid.update((row.uid, row) for row in conn.execute(select(*columns).where(Stream.uid.in_(chunk))))
+            local_tombstones.update(conn.execute(
+                select(StreamTombstone.uid, StreamTombstone.deleted_at).where(StreamTombstone.uid.in_(chunk))
+            ).all())
+        for chunk in _chunks(links):
+            local_by_link.update((row.link, row) for row in conn.execute(select(*columns).where(Stream.link.in_(chunk))))
+
+        for stream in streams:
+            mirrors = [m for m in stream.get("mirrors") or [] if isinstance(m, str)]
+            content_hash = stream_content_hash(*(stream[f] for f in STREAM_FIELDS), mirrors)
+            values = {field: stream[field] for field in STREAM_FIELDS}
+            values.update(updated_at=float(stream["updated_at"]), content_hash=content_hash)
+            # El mismo stream importado por separado en dos máquinas tiene uids
+            # distintos pero el mismo link: ambas réplicas adoptan el menor.
+            local = local_by_uid.get(stream["uid"]) or local_by_link.get(stream["link"])
+            tombstone_at = local_tombstones.get(stream["uid"])
+
+            if local is None:
+                if tombstone_at is not None and tombstone_at >= values["updated_at"]:
+                    summary["rejected"] += 1
+                    continue
+                stream_id = conn.execute(insert(Stream).values(uid=stream["uid"], **values)).inserted_primary_key[0]
+                _replace_mirrors(conn, stream_id, stream["link"], mirrors)
+                conn.execute(delete(StreamTombstone).where(StreamTombstone.uid == stream["uid"]))
+                summary["inserted"] += 1
+                continue
+
+            uid = min(local.uid, stream["uid"])
+            local_hash = local.content_hash
+            if local_hash == content_hash:
+                if uid != local.uid:
+                    conn.execute(update(Stream).where(Stream.id == local.id).values(uid=uid))
+                summary["unchanged"] += 1
+                continue
+            if local.change_seq > sent_seq:
+                summary["conflicts"] += 1
+            if (values["updated_at"], content_hash) > (local.updated_at, local_hash):
+                conn.execute(update(Stream).where(Stream.id == local.id).values(uid=uid, **values))
+                _replace_mirrors(conn, local.id, stream["link"], mirrors)
+                summary["updated"] += 1
+            elif uid != local.uid:
+                conn.execute(update(Stream).where(Stream.id == local.id).values(uid=uid))
+            if local.uid != uid:
+                local_by_uid[uid] = local
+
+        for tombstone in tombstones:
+            local = local_by_uid.get(tombstone["uid"])
+            if local is None:
+                _record_tombstone(conn, tombstone["uid"], tombstone["deleted_at"])
+            elif local.updated_at <= tombstone["deleted_at"]:
+                _delete_stream_rows(conn, local.id)
+                _record_tombstone(conn, tombstone["uid"], tombstone["deleted_at"], replace=True)
+                local_by_uid.pop(tombstone["uid"], None)
+                summary["deleted"] += 1
+            else:
+                if local.change_seq > sent_seq:
+                    summary["conflicts"] += 1
+                summary["rejected"] += 1
+
+        acked = delta.get("acks", {}).get(replica_id, 0)
+        values = {
+            "received_seq": max(delta["seq"], peer.received_seq if peer else 0),
+            "sent_seq": max(acked, peer.sent_seq if peer else 0),
+            "synced_at": time.time(),
+        }
+        if peer:
+            conn.execute(update(SyncPeer).where(SyncPeer.peer_id == delta["replica"]).values(**values))
+        else:
+            conn.execute(insert(SyncPeer).values(peer_id=delta["replica"], **values))
+        seq_after = _current_seq(conn)
+
+    metrics.increment("sync.applied_streams", summary["inserted"] + summary["updated"])
+    logger.info(f"Sincronización desde la réplica {delta['replica']}: {summary}")
+    return summary, seq_before, seq_after
+
+def acknowledge(db_engine: Engine, peer_id: str, sent_seq: int) -> None:
+    with db_engine.begin() as conn:
+        conn.execute(update(SyncPeer).where(SyncPeer.peer_id == peer_id, SyncPeer.sent_seq < sent_seq).values(sent_seq=sent_seq))
+
+def sync_databases(local_engine: Engine, other_engine: Engine) -> dict:
+    # Intercambio en ambos sentidos: cada parte exporta lo que la otra no
+    # confirmó, aplica lo recibido y ambas confirman lo que acaban de enviar.
+    with local_engine.connect() as conn:
+        local_id = get_replica_id(conn)
+    with other_engine.connect() as conn:
+        other_id = get_replica_id(conn)
+    if local_id == other_id:
+        raise SyncError("Ambas bases de datos tienen el mismo id de réplica (¿una es copia de la otra? usa --reset-replica)")
+
+    local_delta = export_delta(local_engine, other_id)
+    other_delta = export_delta(other_engine, local_id)
+    received, local_before, local_after = _apply_delta(local_engine, other_delta)
+    sent, other_before, other_after = _apply_delta(other_engine, local_delta)
+    # Lo que cada parte acaba de aplicar ya lo tiene la otra: se confirma
+    # hasta la secuencia posterior para no devolvérselo en la próxima
+    # sincronización, salvo que hubiera otros cambios entre exportar y aplicar.
+    acknowledge(local_engine, other_id, local_after if local_before == local_delta["seq"] else local_delta["seq"])
+    acknowledge(other_engine, local_id, other_after if other_before == other_delta["seq"] else other_delta["seq"])
+    return {"local": local_id, "peer": other_id, "received": received, "sent": sent}
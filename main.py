@@ -5,32 +5,100 @@
 # pip install sqlmodel
 # Written by Ismael Heredia
 
+import time
+STARTUP_STARTED_AT = time.perf_counter()
+
+from textual import work
 from textual.app import App, ComposeResult
 from textual.containers import Container, Horizontal
 from textual.widgets import Header, Footer, Button, Static
-from views.admin_screen import AdminScreen
-from views.player_screen import PlayerScreen
-
-from database.models import create_db_and_tables
-from database.seed import seed_data
 
+import json
 import logging
-from utils.config_manager import ENABLE_DEBUG_LOGGING
+import sys
+from utils.config_manager import ENABLE_DEBUG_LOGGING, METRICS_DUMP_FILE, STARTUP_TIMING_FILE
+from utils.metrics import metrics
+
+IMPORTS_FINISHED_AT = time.perf_counter()
 
 logger = logging.getLogger(__name__)
 
 class StreamPlayerApp(App):
     CSS_PATH = "static/style.css"
     TITLE = "Quiet Stream"
+    BINDINGS = [
+        ("f2", "toggle_metrics", "Métricas"),
+    ]
+
+    database_ready = False
 
     def on_mount(self):
+        for button_id in ("#admin_btn", "#player_btn"):
+            self.query_one(button_id, Button).disabled = True
+        self.set_focus(None) 
+        self._bootstrap_database()
+
+    def on_ready(self) -> None:
+        self._report_startup_timing(time.perf_counter())
+
+    def on_unmount(self) -> None:
+        if METRICS_DUMP_FILE:
+            metrics.dump(METRICS_DUMP_FILE)
+
+    def action_toggle_metrics(self) -> None:
+        from modals.metrics_modal import MetricsModal
+        if isinstance(self.screen, MetricsModal):
+            self.screen.dismiss(None)
+        else:
+            self.push_screen(MetricsModal())
+
+    @work(thread=True, exclusive=True, group="bootstrap")
+    def _bootstrap_database(self) -> None:
+        # sqlmodel y la creación de tablas se cargan fuera del primer frame.
         try:
+            from database.models import create_db_and_tables
+            from database.seed import seed_data
             create_db_and_tables()
             seed_data()
         except Exception as e:
             logger.critical(f"Error inicial: {e}")
-            self.exit(message=f"Error crítico: {e}")
-        self.set_focus(None) 
+            self.call_from_thread(self.exit, message=f"Error crítico: {e}")
+            return
+        self.call_from_thread(self._on_database_ready)
+
+    def _on_database_ready(self) -> None:
+        self.database_ready = True
+        for button_id in ("#admin_btn", "#player_btn"):
+            self.query_one(button_id, Button).disabled = False
+        logger.info(f"Base de datos lista en {(time.perf_counter() - STARTUP_STARTED_AT) * 1000:.0f} ms desde el arranque")
+
+    def _report_startup_timing(self, first_frame_at: float) -> None:
+        timing = {
+            "timestamp": time.time(),
+            "imports_ms": round((IMPORTS_FINISHED_AT - STARTUP_STARTED_AT) * 1000, 1),
+            "first_frame_ms": round((first_frame_at - STARTUP_STARTED_AT) * 1000, 1),
+        }
+        metrics.observe("startup.imports_ms", timing["imports_ms"])
+        metrics.observe("startup.first_frame_ms", timing["first_frame_ms"])
+        logger.info(f"Arranque: imports {timing['imports_ms']} ms, primer frame {timing['first_frame_ms']} ms")
+        if STARTUP_TIMING_FILE:
+            try:
+                with open(STARTUP_TIMING_FILE, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps(timing) + "\n")
+            except OSError as e:
+                logger.warning(f"No se pudo guardar el tiempo de arranque en '{STARTUP_TIMING_FILE}': {e}")
+
+    def _show_screen(self, name: str) -> None:
+        # Cada pantalla se crea e instala una sola vez; al volver al menú se
+        # conserva con sus datos, su tabla y la reproducción en curso.
+        if not self.is_screen_installed(name):
+            if name == "admin":
+                from views.admin_screen import AdminScreen
+                self.install_screen(AdminScreen(), name=name)
+            else:
+                from views.player_screen import PlayerScreen
+                self.install_screen(PlayerScreen(), name=name)
+        self.push_screen(name)
 
     def compose(self) -> ComposeResult:
         yield Header()
@@ -49,12 +117,15 @@ class StreamPlayerApp(App):
     def on_button_pressed(self, event: Button.Pressed) -> None:
         button_id = event.button.id
         if button_id == "admin_btn":
-            self.push_screen(AdminScreen())
+            self._show_screen("admin")
         elif button_id == "player_btn":
-            self.push_screen(PlayerScreen())
+            self._show_screen("player")
         elif button_id == "exit_btn":
             self.exit()
 
 if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        from cli import main as cli_main
+        sys.exit(cli_main(sys.argv[1:]))
     app = StreamPlayerApp()
-    app.run()
\ No newline at end of file
+    app.run()
@@ -0,0 +1,76 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from textual.app import ComposeResult
+from textual.containers import Horizontal
+from textual.widgets import Static, Input, Button, Label, RadioSet, RadioButton
+from textual.screen import ModalScreen
+from textual import on
+
+class BulkEditModal(ModalScreen[dict | None]):
+    CSS = """
+    BulkEditModal {
+        background: $surface;
+        border: round $primary;
+        width: 60;
+        height: auto;
+        padding: 1;
+    }
+    BulkEditModal > Static {
+        width: 100%;
+        content-align: center middle;
+        text-style: bold;
+        margin-bottom: 1;
+    }
+    BulkEditModal Input {
+        width: 100%;
+        margin-bottom: 1;
+    }
+    BulkEditModal Horizontal {
+        height: auto;
+        margin-top: 1;
+        align: center middle;
+    }
+    BulkEditModal RadioSet {
+        width: 100%;
+        margin-bottom: 1;
+    }
+    BulkEditModal RadioButton {
+        margin-right: 2;
+    }
+    """
+
+    def __init__(self, count: int):
+        super().__init__()
+        self.count = count
+
+    def compose(self) -> ComposeResult:
+        yield Static(f"Editar {self.count} streams seleccionados")
+        yield Label("Categorías (vacío = sin cambios)")
+        yield Input(placeholder="Categorías separadas por coma", id="bulk_categorias")
+        yield Label("Tipo")
+        with RadioSet(id="bulk_tipo"):
+            yield RadioButton("Sin cambios", id="tipo_keep", value=True)
+            yield RadioButton("📡 Stream", id="tipo_stream")
+            yield RadioButton("🎬 Video", id="tipo_video")
+        yield Horizontal(
+            Button("💾 Aplicar", id="apply", variant="primary"),
+            Button("❌ Cancelar", id="cancel")
+        )
+
+    def on_mount(self) -> None:
+        self.query_one("#bulk_categorias", Input).focus()
+
+    @on(Button.Pressed)
+    def on_button_pressed(self, event: Button.Pressed) -> None:
+        if event.button.id == "apply":
+            categorias = self.query_one("#bulk_categorias", Input).value.strip()
+            pressed = self.query_one("#bulk_tipo", RadioSet).pressed_button
+            tipo = {"tipo_stream": "Stream", "tipo_video": "Video"}.get(pressed.id if pressed else "")
+            if not categorias and tipo is None:
+                self.app.bell()
+                self.notify("No hay cambios para aplicar", severity="warning")
+                return
+            self.dismiss({"categorias": categorias or None, "tipo": tipo})
+        elif event.button.id == "cancel":
+            self.dismiss(None)
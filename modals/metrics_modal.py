@@ -0,0 +1,68 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from textual.app import ComposeResult
+from textual.screen import ModalScreen
+from textual.widgets import Static, DataTable
+
+from utils.metrics import metrics
+
+class MetricsModal(ModalScreen[None]):
+    CSS = """
+    MetricsModal {
+        background: $surface;
+        border: round $primary;
+        width: 100;
+        height: 80%;
+        padding: 1;
+    }
+    MetricsModal > Static {
+        width: 100%;
+        content-align: center middle;
+        text-style: bold;
+        margin-bottom: 1;
+    }
+    MetricsModal DataTable {
+        width: 100%;
+        height: 1fr;
+    }
+    """
+
+    BINDINGS = [
+        ("escape", "dismiss", "Cerrar"),
+        ("f2", "dismiss", "Cerrar"),
+    ]
+
+    def compose(self) -> ComposeResult:
+        yield Static("Métricas de rendimiento", id="metrics_title")
+        yield DataTable(id="metrics_table", zebra_stripes=True, cursor_type="none")
+
+    def on_mount(self) -> None:
+        table = self.query_one("#metrics_table", DataTable)
+        for label in ("Métrica", "N", "Media", "p50", "p95", "Máx", "Total"):
+            table.add_column(label)
+        self._refresh_metrics()
+        self.set_interval(1, self._refresh_metrics)
+
+    def _refresh_metrics(self) -> None:
+        snapshot = metrics.snapshot()
+        table = self.query_one("#metrics_table", DataTable)
+        table.clear()
+        for name, summary in sorted(snapshot["histograms"].items()):
+            table.add_row(name, str(summary["count"]), _fmt(summary["mean"]), _fmt(summary["p50"]),
+                          _fmt(summary["p95"]), _fmt(summary["max"]), _fmt(summary["total"]))
+        for name, value in sorted(snapshot["counters"].items()):
+            table.add_row(name, "", "", "", "", "", _fmt(value))
+        for name, value in sorted(snapshot["gauges"].items()):
+            table.add_row(name, "", "", "", "", "", _fmt(value))
+        self.query_one("#metrics_title", Static).update(
+            f"Métricas de rendimiento · {snapshot['uptime_seconds']:.0f}s en ejecución (tiempos en ms)"
+        )
+
+    def action_dismiss(self) -> None:
+        self.dismiss(None)
+
+def _fmt(value) -> str:
+    if value is None:
+        return "-"
+    return f"{value:.0f}" if float(value).is_integer() else f"{value:.1f}"
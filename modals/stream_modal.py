@@ -7,10 +7,11 @@ from textual.containers import Horizontal
 from textual.widgets import Static, Input, Button, Label, RadioSet, RadioButton
 from textual.screen import ModalScreen
 from textual.reactive import reactive
-from textual import on
+from textual import on, work
 
-from database.models import Stream, get_session
-from sqlmodel import Session
+from database.async_db import run_db
+from database.mirrors import parse_mirror_links
+from database.repository import save_stream
 
 from utils.functions import clean_emoji_from_string
 
@@ -51,7 +52,7 @@ class StreamModal(ModalScreen[bool]):
 
     selected_tipo: reactive[str | None] = reactive(None)
 
-    def __init__(self, title: str, stream: Stream = None):
+    def __init__(self, title: str, stream: dict | None = None):
         super().__init__()
         self.stream = stream
         self.title_text = title
@@ -70,10 +71,17 @@ class StreamModal(ModalScreen[bool]):
             yield Label(label)
             input_field = Input(name=field)
             if self.stream:
-                input_field.value = getattr(self.stream, field) or ""
+                input_field.value = self.stream.get(field) or ""
             self.inputs[field] = input_field
             yield input_field
 
+        yield Label("Espejos: URLs alternativas (separadas por coma)")
+        mirrors_input = Input(name="mirrors")
+        if self.stream:
+            mirrors_input.value = ", ".join(self.stream.get("mirrors") or [])
+        self.mirrors_input = mirrors_input
+        yield mirrors_input
+
         yield Label("Tipo")
         with RadioSet(id="tipo_radio_set"):
             yield RadioButton("📡 Stream", id="radio_stream")
@@ -85,11 +93,11 @@ class StreamModal(ModalScreen[bool]):
         )
 
     def on_mount(self) -> None:
-        if self.stream and self.stream.tipo:
-            if self.stream.tipo == "Stream":
+        if self.stream and self.stream.get("tipo"):
+            if self.stream["tipo"] == "Stream":
                 self.query_one("#radio_stream", RadioButton).value = True
                 self.selected_tipo = "Stream"
-            elif self.stream.tipo == "Video":
+            elif self.stream["tipo"] == "Video":
                 self.query_one("#radio_video", RadioButton).value = True
                 self.selected_tipo = "Video"
             else:
@@ -113,6 +121,7 @@ class StreamModal(ModalScreen[bool]):
     def on_button_pressed(self, event: Button.Pressed) -> None:
         if event.button.id == "save":
             data = {k: (v.value or "").strip() for k, v in self.inputs.items()}
+            mirror_links = parse_mirror_links(self.mirrors_input.value or "")
             final_selected_tipo = self.selected_tipo
 
             if final_selected_tipo is None:
@@ -131,32 +140,28 @@ class StreamModal(ModalScreen[bool]):
                 self.notify("El link no puede estar vacío", severity="error")
                 return
 
-            try:
-                with get_session() as session:
-                    if self.stream:
-                        stream_to_update = session.get(Stream, self.stream.id)
-                        if stream_to_update:
-                            stream_to_update.nombre = data["nombre"]
-                            stream_to_update.link = data["link"]
-                            stream_to_update.categorias = data["categorias"]
-                            stream_to_update.tipo = data["tipo"]
-                            session.commit()
-                            session.refresh(stream_to_update)
-                            self.app.notify("Stream actualizado con éxito")
-                            self.dismiss(True)
-                        else:
-                            self.app.bell()
-                            self.notify("Error: Stream no encontrado para actualizar", severity="error")
-                    else:
-                        new_stream = Stream(**data)
-                        session.add(new_stream)
-                        session.commit()
-                        session.refresh(new_stream)
-                        self.app.notify("Stream creado con éxito")
-                        self.dismiss(True)
-            except Exception as e:
-                logger.error(f"Error al guardar/actualizar stream: {e}", exc_info=True)
-                self.app.bell()
-                self.notify(f"Error al guardar stream: {str(e)}", severity="error")
+            self._save(data, mirror_links)
         elif event.button.id == "cancel":
-            self.dismiss(False)
\ No newline at end of file
+            self.dismiss(False)
+
+    @work(exclusive=True, group="stream_save")
+    async def _save(self, data: dict, mirror_links: list[str]) -> None:
+        save_button = self.query_one("#save", Button)
+        save_button.disabled = True
+        try:
+            saved = await run_db(save_stream, self.stream["id"] if self.stream else None, data, mirror_links)
+        except Exception as e:
+            logger.error(f"Error al guardar/actualizar stream: {e}", exc_info=True)
+            self.app.bell()
+            self.notify(f"Error al guardar stream: {str(e)}", severity="error")
+            save_button.disabled = False
+            return
+
+        if saved is None:
+            self.app.bell()
+            self.notify("Error: Stream no encontrado para actualizar", severity="error")
+            save_button.disabled = False
+            return
+
+        self.app.notify("Stream actualizado con éxito" if self.stream else "Stream creado con éxito")
+        self.dismiss(True)
@@ -2,14 +2,15 @@
 # -*- coding: utf-8 -*-
 
 import logging
-import asyncio
-import httpx
 from textual.app import ComposeResult
 from textual.containers import Horizontal
 from textual.widgets import Static, Button, ProgressBar, Label
 from textual.screen import ModalScreen
 from textual import on, work
 
+from utils.config_manager import VALIDATION_CONCURRENCY
+from utils.stream_checker import validate_streams
+
 logger = logging.getLogger(__name__)
 
 class StreamValidationModal(ModalScreen[list[dict]]):
@@ -88,44 +89,20 @@ class StreamValidationModal(ModalScreen[list[dict]]):
             self.dismiss(self.broken_streams)
             return
 
-        for i, stream_data in enumerate(self.streams_to_validate):
-            stream_name = stream_data.get("nombre", "N/A")
-            stream_link = stream_data.get("link", "")
-
-            status_label.update(f"Validando: {stream_name} ({i + 1}/{total_streams})")
+        status_label.update(f"Validando {total_streams} streams...")
 
-            is_functional = await self.check_stream_link(stream_link)
+        def on_result(stream_data: dict, is_functional: bool, done: int) -> None:
             if not is_functional:
                 self.broken_streams.append(stream_data)
-                logger.warning(f"Stream no funcional: {stream_name} - {stream_link}")
-            else:
-                logger.info(f"Stream funcional: {stream_name} - {stream_link}")
+            status_label.update(f"Validado: {stream_data.get('nombre', 'N/A')} ({done}/{total_streams})")
 
-            await asyncio.sleep(0.01)
+        await validate_streams(self.streams_to_validate, VALIDATION_CONCURRENCY, on_result=on_result)
 
         status_label.update("Validación completada")
         results_label.update(f"Resultado: {len(self.broken_streams)} de {total_streams} streams no funcionales")
         close_button.disabled = False
         self.dismiss(self.broken_streams)
 
-    async def check_stream_link(self, url: str) -> bool:
-        if not url:
-            return False
-
-        try:
-            async with httpx.AsyncClient() as client:
-                response = await client.head(url, timeout=5)
-            return 200 <= response.status_code < 400
-        except httpx.TimeoutException:
-            logger.error(f"Timeout al validar URL: {url}")
-            return False
-        except httpx.RequestError as e:
-            logger.error(f"Error de conexión al validar URL {url}: {e}")
-            return False
-        except Exception as e:
-            logger.error(f"Error inesperado al validar URL {url}: {e}", exc_info=True)
-            return False
-
     async def on_button_pressed(self, event: Button.Pressed) -> None:
         if event.button.id == "close":
             if self.validation_task and not self.validation_task.is_finished:
@@ -0,0 +1,39 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+MIN_CACHING_MS = 300
+MAX_CACHING_MS = 10000
+DEFAULT_CACHING_MS = 1000
+
+# Una sesión corta no demuestra que el stream sea estable: solo cuentan para
+# reducir el buffer las que duran al menos este tiempo sin cortes.
+MIN_CLEAN_SESSION_SECONDS = 60
+CLEAN_SESSIONS_TO_SHRINK = 2
+
+GROW_FACTOR = 1.5
+SHRINK_FACTOR = 0.8
+
+
+def next_network_caching(current_ms: int, rebuffers: int, underruns: int,
+                         clean_sessions: int, duration: float) -> tuple[int, int]:
+    if rebuffers or underruns:
+        factor = GROW_FACTOR ** min(3, max(1, rebuffers))
+        return min(MAX_CACHING_MS, int(current_ms * factor)), 0
+
+    if duration < MIN_CLEAN_SESSION_SECONDS:
+        return current_ms, clean_sessions
+
+    clean_sessions += 1
+    if clean_sessions >= CLEAN_SESSIONS_TO_SHRINK:
+        return max(MIN_CACHING_MS, int(current_ms * SHRINK_FACTOR)), 0
+    return current_ms, clean_sessions
+
+
+def caching_from_args(args: list[str]) -> int:
+    for arg in args:
+        if arg.startswith("--network-caching="):
+            try:
+                return int(arg.split("=", 1)[1])
+            except ValueError:
+                break
+    return DEFAULT_CACHING_MS
@@ -0,0 +1,144 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import hashlib
+import logging
+import os
+import threading
+from pathlib import Path
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 10 * 1024 * 1024
+PART_SUFFIX = ".part"
+
+
+class AudioCache:
+    def __init__(self, directory: str | Path, max_bytes: int):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._downloads: dict[str, threading.Event] = {}
+        self._downloaded_bytes = 0
+        self._clean_partials()
+
+    def downloaded_bytes(self) -> int:
+        with self._lock:
+            return self._downloaded_bytes
+
+    @staticmethod
+    def key_for(link: str) -> str:
+        return hashlib.sha1(link.strip().encode('utf-8')).hexdigest()
+
+    def lookup(self, link: str) -> str | None:
+        key = self.key_for(link)
+        for path in self.directory.glob(f"{key}.*"):
+            if path.suffix == PART_SUFFIX:
+                continue
+            try:
+                os.utime(path)
+            except OSError:
+                continue
+            return str(path)
+        return None
+
+    def start_download(self, link: str, info: dict) -> None:
+        if info.get('is_live'):
+            return
+        expected_size = info.get('filesize') or info.get('filesize_approx')
+        if expected_size and expected_size > self.max_bytes:
+            logger.info(f"AudioCache: '{info.get('title', link)}' supera el tamaño de la caché, no se guarda")
+            return
+
+        key = self.key_for(link)
+        with self._lock:
+            if key in self._downloads:
+                return
+            cancel_event = threading.Event()
+            self._downloads[key] = cancel_event
+
+        threading.Thread(
+            target=self._download,
+            args=(key, info, cancel_event),
+            name=f"audio-cache-{key[:8]}",
+            daemon=True
+        ).start()
+
+    def cancel_download(self, link: str) -> None:
+        with self._lock:
+            cancel_event = self._downloads.get(self.key_for(link))
+        if cancel_event:
+            cancel_event.set()
+
+    def _download(self, key: str, info: dict, cancel_event: threading.Event) -> None:
+        final_path = self.directory / f"{key}.{info.get('ext') or 'audio'}"
+        part_path = self.directory / f"{key}{PART_SUFFIX}"
+        headers = dict(info.get('http_headers') or {})
+        downloaded = 0
+
+        try:
+            with httpx.Client(follow_redirects=True, timeout=30) as client, open(part_path, 'wb') as f:
+                while not cancel_event.is_set():
+                    # Descarga por rangos: YouTube limita la velocidad de las
+                    # peticiones sin Range a algo cercano al tiempo real.
+                    headers['Range'] = f"bytes={downloaded}-{downloaded + CHUNK_SIZE - 1}"
+                    with client.stream("GET", info['url'], headers=headers) as response:
+                        if response.status_code == 416 and downloaded:
+                            # El tamaño era múltiplo exacto de CHUNK_SIZE: el
+                            # rango siguiente ya empieza pasado el final.
+                            break
+                        response.raise_for_status()
+                        received = 0
+                        for chunk in response.iter_bytes():
+                            if cancel_event.is_set():
+                                break
+                            f.write(chunk)
+                            received += len(chunk)
+                            with self._lock:
+                                self._downloaded_bytes += len(chunk)
+                    downloaded += received
+                    if downloaded > self.max_bytes:
+                        raise ValueError("el audio supera el tamaño máximo de la caché")
+                    if received < CHUNK_SIZE or response.status_code != 206:
+                        break
+
+            if cancel_event.is_set():
+                logger.debug(f"AudioCache: Descarga de '{info.get('title', key)}' cancelada")
+                part_path.unlink(missing_ok=True)
+                return
+
+            os.replace(part_path, final_path)
+            logger.info(f"AudioCache: '{info.get('title', key)}' guardado en caché ({downloaded} bytes)")
+            self._evict()
+        except Exception as e:
+            logger.warning(f"AudioCache: Error al descargar '{info.get('title', key)}': {e}")
+            part_path.unlink(missing_ok=True)
+        finally:
+            with self._lock:
+                self._downloads.pop(key, None)
+
+    def _evict(self) -> None:
+        entries = []
+        for path in self.directory.iterdir():
+            if path.suffix == PART_SUFFIX or not path.is_file():
+                continue
+            stat = path.stat()
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                path.unlink()
+                total -= size
+                logger.info(f"AudioCache: Eliminado por LRU: {path.name}")
+            except OSError as e:
+                logger.warning(f"AudioCache: No se pudo eliminar {path}: {e}")
+
+    def _clean_partials(self) -> None:
+        for path in self.directory.glob(f"*{PART_SUFFIX}"):
+            path.unlink(missing_ok=True)
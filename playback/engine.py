@@ -0,0 +1,511 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import logging
+import os
+import time
+
+import vlc
+from vlc import EventType
+
+from database.async_db import submit_db
+from database.mirrors import record_mirror_failure, record_probe_results
+from database.stream_stats import get_network_caching, record_playback_session
+from playback.adaptive_caching import caching_from_args
+from playback.audio_cache import AudioCache
+from playback.mirrors import order_by_latency, probe_mirrors
+from playback.session import PlaybackSession
+from playback.resolver import QUALITY_FORMATS, ResolveCancelled, ResolveError, get_resolver_pool
+from playback.timeshift import TimeshiftRelay
+from playback.watchdog import StallWatchdog
+from playback.worker import PlaybackWorker
+from utils.metrics import metrics
+from utils.profiling import profiled
+from utils.config_manager import (
+    AUDIO_CACHE_ENABLED, AUDIO_CACHE_DIR, AUDIO_CACHE_MAX_MB,
+    TIMESHIFT_ENABLED, TIMESHIFT_DIR, TIMESHIFT_MINUTES, TIMESHIFT_MAX_MB,
+    VLC_STREAM_PROFILE, VLC_VIDEO_PROFILE, get_vlc_args,
+    YOUTUBE_QUALITY,
+    WATCHDOG_ENABLED, WATCHDOG_STALL_SECONDS, WATCHDOG_MAX_BACKOFF, WATCHDOG_MAX_ATTEMPTS,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class PlaybackEngine:
+    def __init__(self, on_status=None, on_event=None):
+        self._on_status = on_status
+        self._on_event = on_event
+        self._instances: dict[str, vlc.Instance] = {}
+        self._instance: vlc.Instance | None = None
+        self.player: vlc.MediaPlayer | None = None
+        self.current_stream: dict | None = None
+        self.current_mrl: str | None = None
+        self._relay: TimeshiftRelay | None = None
+        self.active_link: str | None = None
+        self._fallback_links: list[str] = []
+        self.quality = YOUTUBE_QUALITY if YOUTUBE_QUALITY in QUALITY_FORMATS else 'balanced'
+        self._transferred_bytes = 0
+        self.session: PlaybackSession | None = None
+        self._play_started: float | None = None
+        self._resolver = get_resolver_pool()
+        self._cache = AudioCache(AUDIO_CACHE_DIR, AUDIO_CACHE_MAX_MB * 1024 * 1024) if AUDIO_CACHE_ENABLED else None
+        self._watchdog = StallWatchdog(
+            self._on_stall, WATCHDOG_STALL_SECONDS, WATCHDOG_MAX_BACKOFF, WATCHDOG_MAX_ATTEMPTS
+        ) if WATCHDOG_ENABLED else None
+        self._worker = PlaybackWorker(self._dispatch)
+
+    def play(self, stream: dict) -> None:
+        self._worker.submit("play", dict(stream))
+
+    def stop(self) -> None:
+        self._worker.submit("stop")
+
+    def restart(self) -> None:
+        self._worker.submit("restart")
+
+    def toggle_volume(self) -> None:
+        self._worker.submit("volume")
+
+    def set_volume(self, level: int) -> None:
+        self._worker.submit("set_volume", max(0, min(100, int(level))))
+
+    def toggle_pause(self) -> None:
+        self._worker.submit("pause")
+
+    def rewind(self, seconds: int) -> None:
+        self._worker.submit("rewind", seconds)
+
+    def go_live(self) -> None:
+        self._worker.submit("live")
+
+    def set_quality(self, quality: str) -> None:
+        if quality in QUALITY_FORMATS:
+            self.quality = quality
+
+    def bytes_transferred(self) -> int:
+        total = self._transferred_bytes + self._current_media_bytes()
+        if self._cache:
+            total += self._cache.downloaded_bytes()
+        return total
+
+    def telemetry(self) -> dict | None:
+        stats = self._media_stats()
+        session = self.session
+        if stats is None or session is None:
+            return None
+        return {
+            'input_kbps': stats.input_bitrate * 8000,
+            'demux_kbps': stats.demux_bitrate * 8000,
+            'read_bytes': session.read_bytes + self._current_media_bytes(),
+            'demux_bytes': session.demux_bytes + stats.demux_read_bytes,
+            'lost_buffers': session.underruns + stats.lost_abuffers,
+            'corrupted': session.corrupted + stats.demux_corrupted,
+            'rebuffers': session.rebuffers,
+        }
+
+    def volume(self) -> int | None:
+        player = self.player
+        return player.audio_get_volume() if player else None
+
+    def shutdown(self) -> None:
+        if self._watchdog:
+            self._watchdog.stop()
+        self._worker.shutdown()
+        if self._cache and self.current_stream:
+            self._cache.cancel_download(self.current_stream['link'])
+        self._release_player()
+        self.current_stream = None
+        logger.info(f"PlaybackEngine: {self.bytes_transferred()} bytes transferidos en la sesión")
+
+    def _on_stall(self, give_up: bool) -> None:
+        self._worker.submit("reconnect", give_up)
+
+    def _on_player_error(self) -> None:
+        if self._watchdog:
+            self._watchdog.report_error()
+        else:
+            self._worker.submit("failover")
+
+    def _emit(self, generation: int, message: str) -> None:
+        if self._on_status and not self._worker.is_stale(generation):
+            self._on_status(message)
+
+    def _notify(self, kind: str, stream: dict | None, **data) -> None:
+        # Avisos para el historial: "playing" con el tiempo hasta el audio y
+        # "failed" cuando la reproducción no se pudo iniciar o recuperar.
+        if self._on_event and stream:
+            self._on_event(kind, stream['id'], **data)
+
+    def _dispatch(self, command: str, args: tuple, generation: int) -> None:
+        if command == "play":
+            self._play(args[0], generation)
+        elif command == "stop":
+            self._stop(generation)
+        elif command == "restart":
+            self._restart(generation)
+        elif command == "failover":
+            self._failover(generation)
+        elif command == "reconnect":
+            self._reconnect(args[0], generation)
+        elif command == "volume":
+            self._toggle_volume()
+        elif command == "set_volume":
+            self._set_volume(args[0])
+        elif command == "pause":
+            self._toggle_pause(generation)
+        elif command == "rewind":
+            self._rewind(args[0], generation)
+        elif command == "live":
+            self._go_live(generation)
+
+    @staticmethod
+    def _profile_for(stream_type: str) -> str:
+        return VLC_STREAM_PROFILE if stream_type.lower() == "stream" else VLC_VIDEO_PROFILE
+
+    def _get_instance(self, stream_type: str) -> vlc.Instance:
+        profile = self._profile_for(stream_type)
+        if profile not in self._instances:
+            args = get_vlc_args(profile)
+            logger.info(f"PlaybackEngine: Creando instancia de VLC con perfil '{profile}': {' '.join(args)}")
+            self._instances[profile] = vlc.Instance(args)
+        return self._instances[profile]
+
+    def _media_stats(self) -> vlc.MediaStats | None:
+        player = self.player
+        if not player:
+            return None
+        media = player.get_media()
+        stats = vlc.MediaStats()
+        if media is None or not media.get_stats(stats):
+            return None
+        return stats
+
+    def _is_remote_mrl(self) -> bool:
+        mrl = self.current_mrl
+        return bool(mrl) and "://" in mrl and not mrl.startswith("http://127.0.0.1")
+
+    def _current_media_bytes(self) -> int:
+        relay = self._relay
+        total = relay.ring.head if relay and relay.ring else 0
+        if self._is_remote_mrl():
+            stats = self._media_stats()
+            if stats:
+                total += stats.read_bytes
+        return total
+
+    def _account_media(self) -> None:
+        stats = self._media_stats()
+        if not stats:
+            return
+        if self._is_remote_mrl():
+            self._transferred_bytes += stats.read_bytes
+            if self.session:
+                self.session.read_bytes += stats.read_bytes
+        if self.session:
+            self.session.underruns += stats.lost_abuffers
+            self.session.demux_bytes += stats.demux_read_bytes
+            self.session.corrupted += stats.demux_corrupted
+            self.session.discontinuities += stats.demux_discontinuity
+
+    def _on_playing(self) -> None:
+        # Solo el primer Playing tras la orden: tiempo hasta escuchar audio.
+        play_started, self._play_started = self._play_started, None
+        if play_started is not None:
+            startup_ms = round((time.perf_counter() - play_started) * 1000, 3)
+            metrics.observe("playback.time_to_audio_ms", startup_ms)
+            self._notify("playing", self.current_stream, startup_ms=startup_ms)
+
+    def _on_buffering(self, cache_percent: float) -> None:
+        session = self.session
+        if session:
+            session.on_buffering(cache_percent)
+
+    def _finish_session(self) -> None:
+        session, self.session = self.session, None
+        if session is None:
+            return
+        logger.info(f"PlaybackEngine: Sesión de '{session.stream_name}' finalizada: {session.duration:.0f}s, "
+                    f"{session.rebuffers} rebuffers, {session.underruns} underruns")
+        if session.playing:
+            # Se guarda desde el hilo de la base de datos: cambiar de stream o
+            # cerrar la pantalla no espera a SQLite.
+            submit_db(record_playback_session, session.stream_id, session.rebuffers, session.underruns,
+                      session.duration, session.network_caching_ms, session.read_bytes,
+                      session.demux_bytes, session.corrupted, session.discontinuities)
+
+    def _release_player(self) -> None:
+        self._account_media()
+        if self._watchdog:
+            self._watchdog.watch(None)
+        if self.player:
+            event_manager = self.player.event_manager()
+            event_manager.event_detach(EventType.MediaPlayerEndReached)
+            event_manager.event_detach(EventType.MediaPlayerEncounteredError)
+            event_manager.event_detach(EventType.MediaPlayerBuffering)
+            event_manager.event_detach(EventType.MediaPlayerPlaying)
+            self.player.stop()
+            self.player = None
+        self._close_relay()
+        self._finish_session()
+        self.current_mrl = None
+        self.active_link = None
+        self._fallback_links = []
+
+    def _close_relay(self) -> None:
+        if self._relay:
+            if self._relay.ring:
+                self._transferred_bytes += self._relay.ring.head
+                if self.session:
+                    self.session.read_bytes += self._relay.ring.head
+            self._relay.close()
+            self._relay = None
+
+    def _new_media(self, mrl: str) -> vlc.Media:
+        media = self._instance.media_new(mrl)
+        if self.session and "://" in mrl:
+            media.add_option(f":network-caching={self.session.network_caching_ms}")
+        return media
+
+    def _set_mrl(self, mrl: str, start_seconds: float | None = None) -> None:
+        self._account_media()
+        media = self._new_media(mrl)
+        if start_seconds:
+            media.add_option(f":start-time={start_seconds:.1f}")
+        self.player.set_media(media)
+        self.current_mrl = mrl
+        self.player.play()
+
+    def _start_timeshift(self, stream_link: str) -> str:
+        if not TIMESHIFT_ENABLED:
+            return stream_link
+        relay = TimeshiftRelay(
+            stream_link,
+            # Un archivo por proceso: el daemon y cada interfaz tienen su propio buffer.
+            os.path.join(TIMESHIFT_DIR, f"live-{os.getpid()}.ring"),
+            TIMESHIFT_MINUTES * 60,
+            TIMESHIFT_MAX_MB * 1024 * 1024
+        )
+        try:
+            relay.start()
+        except Exception as e:
+            logger.info(f"PlaybackEngine: Diferido no disponible para {stream_link}, reproduciendo en directo: {e}")
+            return stream_link
+        self._relay = relay
+        return relay.local_url()
+
+    def _resolve_url(self, stream_link: str, generation: int) -> str:
+        if self._cache:
+            cached_path = self._cache.lookup(stream_link)
+            if cached_path:
+                logger.info(f"PlaybackEngine: Usando audio en caché para {stream_link}")
+                return cached_path
+
+        info = self._resolver.resolve(stream_link, QUALITY_FORMATS[self.quality], is_cancelled=lambda: self._worker.is_stale(generation))
+        logger.info(f"PlaybackEngine: Formato {info.get('format_id')} ({info.get('acodec')}, "
+                    f"{info.get('abr') or info.get('tbr')} kbps) con calidad '{self.quality}'")
+        if self._cache and not self._worker.is_stale(generation):
+            self._cache.start_download(stream_link, info)
+        return info['url']
+
+    def _select_mirror(self, stream: dict, generation: int) -> str:
+        candidates = stream.get('mirrors') or [stream['link']]
+        if len(candidates) > 1:
+            results = probe_mirrors(candidates)
+            if self._worker.is_stale(generation):
+                return candidates[0]
+            candidates = order_by_latency(candidates, results)
+            submit_db(record_probe_results, stream['id'], results)
+        self._fallback_links = candidates[1:]
+        self.active_link = candidates[0]
+        return self.active_link
+
+    @profiled("play")
+    def _play(self, stream: dict, generation: int) -> None:
+        stream_link = stream['link']
+        stream_name = stream['nombre']
+        self._play_started = time.perf_counter()
+        metrics.increment("playback.starts")
+
+        # La descarga a la caché solo se cancela si se cambia de stream:
+        # detener o volver a reproducir el mismo la deja terminar.
+        if self._cache and self.current_stream and self.current_stream['link'] != stream_link:
+            self._cache.cancel_download(self.current_stream['link'])
+        self._release_player()
+        self.current_stream = stream
+
+        try:
+            if stream['tipo'].lower() == "stream":
+                media_url = self._start_timeshift(self._select_mirror(stream, generation))
+            else:
+                self.active_link = stream_link
+                media_url = self._resolve_url(stream_link, generation)
+
+            if self._worker.is_stale(generation):
+                logger.info(f"PlaybackEngine: Resolución de '{stream_name}' descartada, el usuario ya cambió de stream")
+                return
+
+            vlc_started = time.perf_counter()
+            instance = self._instance = self._get_instance(stream['tipo'])
+            default_caching = caching_from_args(get_vlc_args(self._profile_for(stream['tipo'])))
+            self.session = PlaybackSession(stream, get_network_caching(stream['id'], default_caching))
+            self.player = instance.media_player_new()
+            self.player.set_media(self._new_media(media_url))
+            self.current_mrl = media_url
+
+            event_manager = self.player.event_manager()
+            event_manager.event_attach(EventType.MediaPlayerEndReached,
+                                       lambda event: self.restart())
+            event_manager.event_attach(EventType.MediaPlayerEncounteredError,
+                                       lambda event: self._on_player_error())
+            event_manager.event_attach(EventType.MediaPlayerBuffering,
+                                       lambda event: self._on_buffering(event.u.new_cache))
+            event_manager.event_attach(EventType.MediaPlayerPlaying,
+                                       lambda event: self._on_playing())
+            if self._watchdog:
+                self._watchdog.watch(self.player, is_live=stream['tipo'].lower() == "stream")
+
+            self.player.play()
+            metrics.observe("playback.vlc_setup_ms", round((time.perf_counter() - vlc_started) * 1000, 3))
+
+            self._emit(generation, f"▶ Reproduciendo: {stream_name}")
+            logger.info(f"Reproduciendo: {stream_name} desde {self.active_link}")
+
+        except ResolveCancelled:
+            logger.info(f"PlaybackEngine: Resolución de '{stream_name}' cancelada, el usuario ya cambió de stream")
+        except ResolveError as e:
+            logger.error(f"PlaybackEngine: Error de descarga con yt-dlp: {e}")
+            self._notify("failed", stream)
+            self._emit(generation, "Error: Problema al obtener audio")
+        except Exception as e:
+            logger.error(f"PlaybackEngine: Error general en la reproducción: {e}", exc_info=True)
+            self._notify("failed", stream)
+            self._emit(generation, "Error en la reproducción")
+
+    def _stop(self, generation: int) -> None:
+        self._release_player()
+        self.current_stream = None
+        self._emit(generation, "Seleccione un stream para reproducir")
+
+    def _restart(self, generation: int) -> None:
+        if self._worker.is_stale(generation):
+            return
+        if self.player and self.current_stream:
+            logger.info(f"Reiniciando reproducción de: {self.current_stream['nombre']}")
+            cached_path = None
+            if self._cache and self.current_stream['tipo'].lower() == "video":
+                cached_path = self._cache.lookup(self.current_stream['link'])
+
+            if self._relay:
+                self._set_mrl(self._relay.local_url())
+            elif cached_path and cached_path != self.current_mrl:
+                self._set_mrl(cached_path)
+            else:
+                self.player.set_time(0)
+                self.player.play()
+            self._emit(generation, f"▶ Reiniciando: {self.current_stream['nombre']}")
+        elif not self.current_stream:
+            logger.warning("No hay stream actual para reiniciar la reproducción.")
+            self._emit(generation, "Reproducción finalizada.")
+
+    def _failover(self, generation: int) -> None:
+        if self._worker.is_stale(generation) or not self.player or not self.current_stream:
+            return
+        stream = self.current_stream
+        failed_link = self.active_link
+        logger.warning(f"PlaybackEngine: Falló la reproducción de '{stream['nombre']}' desde {failed_link}")
+
+        if stream['tipo'].lower() != "stream":
+            self._reresolve(generation)
+            return
+        if len(stream.get('mirrors') or []) > 1:
+            submit_db(record_mirror_failure, stream['id'], failed_link)
+
+        if self._fallback_links:
+            self._fallback_links.append(failed_link)
+            self.active_link = self._fallback_links.pop(0)
+            message = f"↻ Cambiando de espejo: {stream['nombre']}"
+        else:
+            message = f"↻ Reconectando: {stream['nombre']}"
+
+        self._close_relay()
+        self._set_mrl(self._start_timeshift(self.active_link))
+        self._emit(generation, message)
+        logger.info(f"PlaybackEngine: Reconectando desde {self.active_link}")
+
+    def _reresolve(self, generation: int) -> None:
+        stream = self.current_stream
+        position = self.player.get_time()
+        try:
+            if self.current_mrl and "://" not in self.current_mrl:
+                media_url = self.current_mrl
+            else:
+                info = self._resolver.resolve(self.active_link, QUALITY_FORMATS[self.quality],
+                                              is_cancelled=lambda: self._worker.is_stale(generation))
+                media_url = info['url']
+        except ResolveCancelled:
+            return
+        except ResolveError as e:
+            logger.error(f"PlaybackEngine: No se pudo volver a resolver '{stream['nombre']}': {e}")
+            self._emit(generation, f"Error: Reintentando obtener audio de {stream['nombre']}...")
+            return
+
+        self._set_mrl(media_url, start_seconds=position / 1000 if position > 0 else None)
+        self._emit(generation, f"↻ Reconectando: {stream['nombre']}")
+        logger.info(f"PlaybackEngine: '{stream['nombre']}' resuelto de nuevo, continuando en {position} ms")
+
+    def _reconnect(self, give_up: bool, generation: int) -> None:
+        if self._worker.is_stale(generation) or not self.player or not self.current_stream:
+            return
+        if give_up:
+            self._notify("failed", self.current_stream)
+            self._emit(generation, f"Error: No se pudo recuperar la reproducción de {self.current_stream['nombre']}")
+            return
+        if self.session:
+            self.session.rebuffers += 1
+        self._failover(generation)
+        if self._watchdog:
+            self._watchdog.rearm()
+
+    def _toggle_volume(self) -> None:
+        if self.player:
+            vol = self.player.audio_get_volume()
+            new_vol = 100 if vol < 100 else 30
+            self.player.audio_set_volume(new_vol)
+        else:
+            logger.warning("No hay reproductor activo para cambiar el volumen")
+
+    def _set_volume(self, level: int) -> None:
+        if self.player:
+            self.player.audio_set_volume(level)
+        else:
+            logger.warning("No hay reproductor activo para cambiar el volumen")
+
+    def _toggle_pause(self, generation: int) -> None:
+        if not self.player or not self.current_stream:
+            logger.warning("No hay reproductor activo para pausar")
+            return
+        if self.player.get_state() == vlc.State.Paused:
+            self.player.set_pause(0)
+            self._emit(generation, f"▶ Reproduciendo: {self.current_stream['nombre']}")
+        else:
+            self.player.set_pause(1)
+            self._emit(generation, f"⏸ En pausa: {self.current_stream['nombre']}")
+
+    def _rewind(self, seconds: int, generation: int) -> None:
+        if not self.player or not self.current_stream:
+            logger.warning("No hay reproductor activo para retroceder")
+            return
+        if self._relay:
+            self._set_mrl(self._relay.local_url(self._relay.position_back(seconds)))
+            behind = int(self._relay.seconds_behind_live) + seconds
+            self._emit(generation, f"⏪ En diferido (-{behind // 60}:{behind % 60:02d}): {self.current_stream['nombre']}")
+        elif self.player.is_seekable():
+            self.player.set_time(max(0, self.player.get_time() - seconds * 1000))
+        else:
+            logger.info("El stream actual no admite retroceder sin diferido")
+
+    def _go_live(self, generation: int) -> None:
+        if self.player and self._relay:
+            self._set_mrl(self._relay.local_url())
+            self._emit(generation, f"▶ En vivo: {self.current_stream['nombre']}")
@@ -0,0 +1,44 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+PROBE_TIMEOUT = 5.0
+MAX_PROBE_WORKERS = 8
+
+
+def measure_ttfb(client: httpx.Client, link: str) -> float | None:
+    started = time.perf_counter()
+    try:
+        with client.stream("GET", link, headers={"Icy-MetaData": "0"}) as response:
+            if response.status_code >= 400:
+                return None
+            for chunk in response.iter_bytes():
+                if chunk:
+                    return (time.perf_counter() - started) * 1000
+    except httpx.HTTPError as e:
+        logger.debug(f"Espejo sin respuesta {link}: {e}")
+    return None
+
+
+def probe_mirrors(links: list[str], timeout: float = PROBE_TIMEOUT) -> dict[str, float | None]:
+    if len(links) < 2:
+        return {}
+    with httpx.Client(follow_redirects=True, timeout=timeout) as client, \
+            ThreadPoolExecutor(max_workers=min(MAX_PROBE_WORKERS, len(links))) as executor:
+        latencies = list(executor.map(lambda link: measure_ttfb(client, link), links))
+    results = dict(zip(links, latencies))
+    logger.info(f"Latencias de espejos: {results}")
+    return results
+
+
+def order_by_latency(links: list[str], results: dict[str, float | None]) -> list[str]:
+    # Los espejos sin medición conservan su orden previo, detrás de los que respondieron.
+    measured = sorted((link for link in links if results.get(link) is not None), key=lambda link: results[link])
+    return measured + [link for link in links if results.get(link) is None]
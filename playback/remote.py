@@ -0,0 +1,126 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import json
+import logging
+import queue
+import socket
+import threading
+
+logger = logging.getLogger(__name__)
+
+REQUEST_TIMEOUT = 2.0
+STATUS_POLL_INTERVAL = 1.0
+
+
+class DaemonUnavailable(Exception):
+    pass
+
+
+def send_command(socket_path: str, request: dict, timeout: float = REQUEST_TIMEOUT) -> dict:
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(timeout)
+            sock.connect(socket_path)
+            sock.sendall((json.dumps(request) + "\n").encode('utf-8'))
+            with sock.makefile('r', encoding='utf-8') as reader:
+                line = reader.readline()
+    except (OSError, socket.timeout) as e:
+        raise DaemonUnavailable(f"No se pudo contactar con el daemon en '{socket_path}': {e}") from e
+    if not line:
+        raise DaemonUnavailable(f"El daemon en '{socket_path}' cerró la conexión sin responder")
+    return json.loads(line)
+
+
+def daemon_is_running(socket_path: str) -> bool:
+    try:
+        return bool(send_command(socket_path, {"cmd": "status"}, timeout=0.5).get("ok"))
+    except (DaemonUnavailable, ValueError):
+        return False
+
+
+class RemoteEngine:
+    # Misma interfaz pública que PlaybackEngine, pero las órdenes se envían al
+    # daemon desde un hilo propio para no bloquear la interfaz. El historial
+    # de reproducción lo guarda el daemon, así que on_event no se usa.
+    def __init__(self, socket_path: str, on_status=None, on_event=None):
+        self.socket_path = socket_path
+        self._on_status = on_status
+        self._commands: queue.Queue = queue.Queue()
+        self._stop_event = threading.Event()
+        self._status: dict = {}
+        self.quality = "balanced"
+        threading.Thread(target=self._run, name="remote-engine", daemon=True).start()
+
+    def play(self, stream: dict) -> None:
+        self._commands.put({"cmd": "play", "id": stream["id"]})
+
+    def stop(self) -> None:
+        self._commands.put({"cmd": "stop"})
+
+    def restart(self) -> None:
+        self._commands.put({"cmd": "restart"})
+
+    def toggle_volume(self) -> None:
+        self._commands.put({"cmd": "volume"})
+
+    def set_volume(self, level: int) -> None:
+        self._commands.put({"cmd": "volume", "level": level})
+
+    def toggle_pause(self) -> None:
+        self._commands.put({"cmd": "pause"})
+
+    def rewind(self, seconds: int) -> None:
+        self._commands.put({"cmd": "rewind", "seconds": seconds})
+
+    def go_live(self) -> None:
+        self._commands.put({"cmd": "live"})
+
+    def set_quality(self, quality: str) -> None:
+        self.quality = quality
+        self._commands.put({"cmd": "quality", "quality": quality})
+
+    def bytes_transferred(self) -> int:
+        return self._status.get("bytes_transferred", 0)
+
+    def telemetry(self) -> dict | None:
+        return self._status.get("telemetry")
+
+    def volume(self) -> int | None:
+        return self._status.get("volume")
+
+    def shutdown(self) -> None:
+        self._stop_event.set()
+        self._commands.put(None)
+
+    def _run(self) -> None:
+        last_text = None
+        while not self._stop_event.is_set():
+            try:
+                request = self._commands.get(timeout=STATUS_POLL_INTERVAL)
+            except queue.Empty:
+                request = {"cmd": "status"}
+            if request is None:
+                return
+            try:
+                # La respuesta de la orden se revisa antes de pedir el estado,
+                # que la reemplaza.
+                response = send_command(self.socket_path, request)
+                error = None if response.get("ok") else response.get("error", "Error desconocido")
+                if request["cmd"] != "status":
+                    response = send_command(self.socket_path, {"cmd": "status"})
+            except (DaemonUnavailable, ValueError) as e:
+                logger.warning(f"RemoteEngine: {e}")
+                text = "Error: Daemon de reproducción no disponible"
+            else:
+                if response.get("ok"):
+                    self._status = response
+                    self.quality = response.get("quality", self.quality)
+                text = response.get("status_text")
+                if error:
+                    logger.warning(f"RemoteEngine: El daemon rechazó '{request['cmd']}': {error}")
+                    text = f"Error: {error}"
+
+            if text and text != last_text and self._on_status:
+                self._on_status(text)
+            last_text = text
@@ -0,0 +1,286 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import atexit
+import itertools
+import json
+import logging
+import os
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+
+from utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_FORMAT = 'bestaudio/best'
+
+# Políticas de calidad: de mayor a menor consumo. "saver" prefiere pistas de
+# solo audio Opus/AAC de bajo bitrate y solo cae a un stream con vídeo en último caso.
+QUALITY_FORMATS = {
+    'best': DEFAULT_FORMAT,
+    'balanced': 'bestaudio[abr<=160][acodec=opus]/bestaudio[abr<=160]/bestaudio/best[height<=360]/best',
+    'saver': ('bestaudio[abr<=64][acodec=opus]/bestaudio[abr<=64][acodec^=mp4a]/'
+              'worstaudio[acodec=opus]/worstaudio/worst[height<=240]/worst'),
+}
+
+INFO_FIELDS = (
+    'url', 'id', 'ext', 'title', 'duration', 'abr', 'tbr', 'acodec',
+    'format_id', 'filesize', 'filesize_approx', 'http_headers', 'is_live',
+)
+
+
+class ResolveError(Exception):
+    pass
+
+
+class ResolveCancelled(ResolveError):
+    pass
+
+
+class _ResolverProcess:
+    def __init__(self, index: int):
+        self.index = index
+        self._process: subprocess.Popen | None = None
+        self._pending: dict[int, Future] = {}
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+
+    @property
+    def alive(self) -> bool:
+        return self._process is not None and self._process.poll() is None
+
+    @property
+    def load(self) -> int:
+        return len(self._pending)
+
+    @property
+    def abandoned(self) -> bool:
+        # Ocupado solo con peticiones que ya nadie espera.
+        with self._lock:
+            return bool(self._pending) and all(future.cancelled() for future in self._pending.values())
+
+    def abandon(self, future: Future) -> None:
+        # El hijo sigue con la petición, pero su respuesta se descarta al llegar.
+        # Cancelar y resolver ocurren bajo el mismo lock: si no, la respuesta
+        # podría llegar entre la comprobación y set_result.
+        with self._lock:
+            future.cancel()
+
+    def start(self) -> None:
+        with self._lock:
+            if self.alive:
+                return
+            logger.info(f"Resolver {self.index}: iniciando proceso de yt-dlp")
+            self._process = subprocess.Popen(
+                [sys.executable, "-m", "playback.resolver"],
+                cwd=BASE_DIR,
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+                text=True,
+                encoding='utf-8',
+                bufsize=1,
+            )
+            self._pending = {}
+            threading.Thread(
+                target=self._read_responses,
+                args=(self._process, self._pending),
+                name=f"resolver-reader-{self.index}",
+                daemon=True
+            ).start()
+
+    def submit(self, url: str, ydl_format: str) -> Future:
+        self.start()
+        future: Future = Future()
+        with self._lock:
+            request_id = next(self._ids)
+            self._pending[request_id] = future
+            try:
+                self._process.stdin.write(json.dumps({"id": request_id, "url": url, "format": ydl_format}) + "\n")
+                self._process.stdin.flush()
+            except (BrokenPipeError, OSError) as e:
+                self._pending.pop(request_id, None)
+                future.set_exception(ResolveError(f"El proceso de resolución no responde: {e}"))
+        return future
+
+    def close(self, wait: bool = True) -> None:
+        with self._lock:
+            process = self._process
+            self._process = None
+        if process is None:
+            return
+        if not wait:
+            process.kill()
+            return
+        try:
+            process.stdin.close()
+            process.wait(timeout=2)
+        except Exception:
+            process.kill()
+
+    def restart(self) -> None:
+        logger.info(f"Resolver {self.index}: reiniciando, estaba ocupado con peticiones canceladas")
+        self.close(wait=False)
+        self.start()
+
+    def _read_responses(self, process: subprocess.Popen, pending: dict[int, Future]) -> None:
+        for line in process.stdout:
+            try:
+                response = json.loads(line)
+            except json.JSONDecodeError:
+                logger.warning(f"Resolver {self.index}: respuesta no válida: {line!r}")
+                continue
+            with self._lock:
+                future = pending.pop(response.get("id"), None)
+                if future is None or future.cancelled():
+                    continue
+                if response.get("ok"):
+                    future.set_result(response["info"])
+                else:
+                    future.set_exception(ResolveError(response.get("error", "Error desconocido")))
+
+        if self._process is process:
+            logger.warning(f"Resolver {self.index}: el proceso terminó inesperadamente (código {process.poll()})")
+        with self._lock:
+            orphans = list(pending.values())
+            pending.clear()
+            for future in orphans:
+                if not future.cancelled():
+                    future.set_exception(ResolveError("El proceso de resolución terminó inesperadamente"))
+
+
+class ResolverPool:
+    def __init__(self, size: int = 1, timeout: float = 60.0):
+        self.timeout = timeout
+        self._processes = [_ResolverProcess(i) for i in range(max(1, size))]
+
+    def start(self) -> None:
+        for process in self._processes:
+            process.start()
+
+    def resolve(self, url: str, ydl_format: str = DEFAULT_FORMAT, is_cancelled=None) -> dict:
+        process = min(self._processes, key=lambda p: p.load)
+        if process.abandoned:
+            # Todos los procesos están ocupados y el menos cargado trabaja para
+            # nadie: reiniciarlo es más rápido que esperar a que termine.
+            process.restart()
+        started = time.perf_counter()
+        future = process.submit(url, ydl_format)
+        remaining = self.timeout
+        while True:
+            try:
+                info = future.result(timeout=min(0.1, remaining))
+                metrics.observe("resolver.resolve_ms", round((time.perf_counter() - started) * 1000, 3))
+                return info
+            except FutureTimeoutError:
+                remaining -= 0.1
+                if is_cancelled and is_cancelled():
+                    process.abandon(future)
+                    metrics.increment("resolver.cancelled")
+                    raise ResolveCancelled(url)
+                if remaining <= 0:
+                    process.abandon(future)
+                    metrics.increment("resolver.errors")
+                    raise ResolveError(f"Tiempo de espera agotado al resolver {url}")
+            except ResolveError:
+                metrics.increment("resolver.errors")
+                raise
+
+    def close(self) -> None:
+        for process in self._processes:
+            process.close()
+
+
+_pool: ResolverPool | None = None
+_pool_lock = threading.Lock()
+
+
+def get_resolver_pool() -> ResolverPool:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # Import diferido: el proceso hijo importa este módulo y no debe
+            # inicializar la configuración ni el logging de la aplicación.
+            from utils.config_manager import RESOLVER_PROCESSES, RESOLVER_TIMEOUT
+            _pool = ResolverPool(RESOLVER_PROCESSES, RESOLVER_TIMEOUT)
+            _pool.start()
+            atexit.register(close_resolver_pool)
+        return _pool
+
+
+def close_resolver_pool() -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+            _pool = None
+
+
+class _SilentLogger:
+    def debug(self, msg):
+        pass
+
+    def info(self, msg):
+        pass
+
+    def warning(self, msg):
+        pass
+
+    def error(self, msg):
+        pass
+
+
+def _serve() -> None:
+    # El canal de respuestas es una copia del stdout original; el descriptor 1
+    # queda apuntando a /dev/null para que nada de yt-dlp se cuele en él.
+    channel = os.fdopen(os.dup(1), 'w', encoding='utf-8', buffering=1)
+    devnull = os.open(os.devnull, os.O_WRONLY)
+    os.dup2(devnull, 1)
+    sys.stdout = open(os.devnull, 'w')
+
+    import yt_dlp
+
+    instances: dict[str, yt_dlp.YoutubeDL] = {}
+
+    def get_instance(ydl_format: str) -> yt_dlp.YoutubeDL:
+        if ydl_format not in instances:
+            instances[ydl_format] = yt_dlp.YoutubeDL({
+                'format': ydl_format,
+                'quiet': True,
+                'noplaylist': True,
+                'no_warnings': True,
+                'noprogress': True,
+                'logger': _SilentLogger(),
+            })
+        return instances[ydl_format]
+
+    get_instance(DEFAULT_FORMAT)
+
+    for line in sys.stdin:
+        try:
+            request = json.loads(line)
+        except json.JSONDecodeError:
+            continue
+        response = {"id": request.get("id")}
+        try:
+            ydl = get_instance(request.get("format") or DEFAULT_FORMAT)
+            info = ydl.extract_info(request["url"], download=False)
+            response["ok"] = True
+            response["info"] = {key: info.get(key) for key in INFO_FIELDS}
+        except yt_dlp.utils.DownloadError as e:
+            response["ok"] = False
+            response["error"] = str(e)
+        except Exception as e:
+            response["ok"] = False
+            response["error"] = f"{type(e).__name__}: {e}"
+        channel.write(json.dumps(response) + "\n")
+
+
+if __name__ == "__main__":
+    _serve()
@@ -0,0 +1,34 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import time
+
+
+class PlaybackSession:
+    def __init__(self, stream: dict, network_caching_ms: int):
+        self.stream_id = stream['id']
+        self.stream_name = stream['nombre']
+        self.started_at = time.time()
+        self.started_monotonic = time.monotonic()
+        self.network_caching_ms = network_caching_ms
+        self.rebuffers = 0
+        self.underruns = 0
+        self.read_bytes = 0
+        self.demux_bytes = 0
+        self.corrupted = 0
+        self.discontinuities = 0
+        self.playing = False
+        self.buffering = False
+
+    @property
+    def duration(self) -> float:
+        return time.monotonic() - self.started_monotonic
+
+    def on_buffering(self, cache_percent: float) -> None:
+        if cache_percent >= 100:
+            if self.buffering:
+                self.rebuffers += 1
+            self.buffering = False
+            self.playing = True
+        elif self.playing:
+            self.buffering = True
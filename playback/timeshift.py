@@ -0,0 +1,239 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import logging
+import mmap
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+READ_CHUNK = 64 * 1024
+DEFAULT_BYTES_PER_SECOND = 16000
+LIVE_PREROLL_SECONDS = 3
+RATE_WARMUP_SECONDS = 10
+UNSUPPORTED_CONTENT_TYPES = ("mpegurl", "text/", "application/json")
+
+
+class TimeshiftUnsupported(Exception):
+    pass
+
+
+class RingBuffer:
+    def __init__(self, path: str | Path, size: int):
+        self.size = size
+        self.head = 0
+        self.closed = False
+        self._cond = threading.Condition()
+        self._file = open(path, 'w+b')
+        self._file.truncate(size)
+        self._map = mmap.mmap(self._file.fileno(), size)
+
+    @property
+    def oldest(self) -> int:
+        return max(0, self.head - self.size)
+
+    def write(self, data: bytes) -> None:
+        # Si el bloque no cabe entero solo se guarda su final, que empieza
+        # donde habría caído tras escribir los bytes descartados.
+        view = memoryview(data)[-self.size:]
+        with self._cond:
+            offset = (self.head + len(data) - len(view)) % self.size
+            first = min(len(view), self.size - offset)
+            self._map[offset:offset + first] = view[:first]
+            if first < len(view):
+                self._map[0:len(view) - first] = view[first:]
+            self.head += len(data)
+            self._cond.notify_all()
+
+    def read(self, position: int, max_bytes: int, timeout: float = 1.0) -> tuple[int, bytes]:
+        with self._cond:
+            if position >= self.head and not self.closed:
+                self._cond.wait(timeout)
+            position = max(position, self.oldest)
+            count = min(max_bytes, self.head - position)
+            if count <= 0 or self.closed:
+                return position, b""
+            offset = position % self.size
+            first = min(count, self.size - offset)
+            data = self._map[offset:offset + first]
+            if first < count:
+                data += self._map[0:count - first]
+            return position, data
+
+    def close(self) -> None:
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+            self._map.close()
+            self._file.close()
+
+
+class _RelayRequestHandler(BaseHTTPRequestHandler):
+    def do_GET(self) -> None:
+        relay: TimeshiftRelay = self.server.relay
+        query = parse_qs(urlparse(self.path).query)
+        position = relay.resolve_position(query.get("pos", ["live"])[0])
+
+        self.send_response(200)
+        self.send_header("Content-Type", relay.content_type)
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+
+        try:
+            while not relay.ring.closed:
+                position, data = relay.ring.read(position, READ_CHUNK)
+                if not data:
+                    continue
+                self.wfile.write(data)
+                position += len(data)
+                relay.read_position = position
+        except (BrokenPipeError, ConnectionResetError, ValueError):
+            pass
+
+    def log_message(self, format, *args) -> None:
+        pass
+
+
+class TimeshiftRelay:
+    def __init__(self, url: str, ring_path: str | Path, max_seconds: int, max_bytes: int):
+        self.url = url
+        self.ring_path = Path(ring_path)
+        self.max_seconds = max_seconds
+        self.max_bytes = max_bytes
+        self.content_type = "application/octet-stream"
+        self.ring: RingBuffer | None = None
+        self.read_position = 0
+        self._declared_rate: int | None = None
+        self._started_at = 0.0
+        self._client: httpx.Client | None = None
+        self._server: ThreadingHTTPServer | None = None
+        self._closed = threading.Event()
+
+    @property
+    def bytes_per_second(self) -> float:
+        elapsed = time.monotonic() - self._started_at
+        if self.ring and elapsed >= RATE_WARMUP_SECONDS:
+            return max(1.0, self.ring.head / elapsed)
+        return float(self._declared_rate or DEFAULT_BYTES_PER_SECOND)
+
+    @property
+    def seconds_behind_live(self) -> float:
+        if not self.ring:
+            return 0.0
+        return max(0.0, (self.ring.head - self.read_position) / self.bytes_per_second)
+
+    def start(self) -> None:
+        self._client = httpx.Client(follow_redirects=True, timeout=httpx.Timeout(10, read=30))
+        response = None
+        try:
+            response = self._open_upstream()
+
+            content_type = response.headers.get("content-type", "").lower()
+            if any(marker in content_type for marker in UNSUPPORTED_CONTENT_TYPES):
+                raise TimeshiftUnsupported(f"Tipo de contenido no compatible con diferido: {content_type}")
+            self.content_type = content_type or self.content_type
+
+            declared_kbps = response.headers.get("icy-br", "").split(",")[0].strip()
+            if declared_kbps.isdigit():
+                self._declared_rate = int(declared_kbps) * 125
+
+            ring_size = min(self.max_bytes, self.max_seconds * (self._declared_rate or 40000))
+            self.ring_path.parent.mkdir(parents=True, exist_ok=True)
+            self.ring = RingBuffer(self.ring_path, ring_size)
+            self._started_at = time.monotonic()
+
+            self._server = ThreadingHTTPServer(("127.0.0.1", 0), _RelayRequestHandler)
+            self._server.daemon_threads = True
+            self._server.relay = self
+            threading.Thread(target=self._server.serve_forever, name="timeshift-server", daemon=True).start()
+        except BaseException:
+            # Si el relé no llega a arrancar no debe quedar nada abierto:
+            # respuesta, cliente, servidor ni archivo del buffer.
+            if response is not None:
+                response.close()
+            self.close()
+            raise
+        threading.Thread(target=self._relay_upstream, args=(response,), name="timeshift-relay", daemon=True).start()
+        logger.info(f"Timeshift: relé iniciado para {self.url} ({ring_size} bytes de buffer)")
+
+    def local_url(self, position: int | str = "live") -> str:
+        host, port = self._server.server_address
+        return f"http://{host}:{port}/live?pos={position}"
+
+    def resolve_position(self, value: str) -> int:
+        if value == "live":
+            position = self.ring.head - int(self.bytes_per_second * LIVE_PREROLL_SECONDS)
+        else:
+            try:
+                position = int(value)
+            except ValueError:
+                position = self.ring.head
+        return min(max(position, self.ring.oldest), self.ring.head)
+
+    def position_back(self, seconds: float) -> int:
+        return max(self.ring.oldest, self.read_position - int(seconds * self.bytes_per_second))
+
+    def close(self) -> None:
+        self._closed.set()
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+        if self.ring:
+            self.ring.close()
+            self.ring_path.unlink(missing_ok=True)
+        if self._client:
+            self._client.close()
+            self._client = None
+
+    def _open_upstream(self) -> httpx.Response:
+        request = self._client.build_request("GET", self.url, headers={"Icy-MetaData": "0"})
+        response = self._client.send(request, stream=True)
+        try:
+            response.raise_for_status()
+        except httpx.HTTPStatusError:
+            response.close()
+            raise
+        return response
+
+    def _relay_upstream(self, response: httpx.Response) -> None:
+        backoff = 1
+        while not self._closed.is_set():
+            try:
+                for chunk in response.iter_bytes():
+                    if self._closed.is_set():
+                        break
+                    self.ring.write(chunk)
+                    backoff = 1
+            except Exception as e:
+                if self._closed.is_set():
+                    break
+                logger.warning(f"Timeshift: conexión con {self.url} interrumpida: {e}")
+            finally:
+                response.close()
+
+            if self._closed.wait(backoff):
+                break
+            backoff = min(backoff * 2, 30)
+            try:
+                response = self._open_upstream()
+            except Exception as e:
+                logger.warning(f"Timeshift: no se pudo reconectar con {self.url}: {e}")
+                response = _EMPTY_RESPONSE
+
+
+class _EmptyResponse:
+    def iter_bytes(self):
+        return iter(())
+
+    def close(self) -> None:
+        pass
+
+
+_EMPTY_RESPONSE = _EmptyResponse()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import logging
+import threading
+import time
+
+import vlc
+
+logger = logging.getLogger(__name__)
+
+IDLE_STATES = (vlc.State.Paused, vlc.State.Stopped, vlc.State.NothingSpecial)
+
+
+class StallWatchdog:
+    def __init__(self, on_stall, stall_seconds: float = 8.0, max_backoff: float = 60.0,
+                 max_attempts: int = 8, interval: float = 1.0):
+        self._on_stall = on_stall
+        self.stall_seconds = stall_seconds
+        self.max_backoff = max_backoff
+        self.max_attempts = max_attempts
+        self.interval = interval
+        self._player: vlc.MediaPlayer | None = None
+        self._is_live = False
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stall-watchdog", daemon=True)
+        self._reset_counters()
+        self._thread.start()
+
+    def watch(self, player: vlc.MediaPlayer | None, is_live: bool = False) -> None:
+        with self._lock:
+            self._player = player
+            self._is_live = is_live
+            self._reset_counters()
+
+    def rearm(self) -> None:
+        # Tras una reconexión se concede de nuevo el margen de arranque, pero
+        # se conservan los intentos para que el backoff siga creciendo.
+        with self._lock:
+            self._last_progress = time.monotonic() + self.stall_seconds
+            self._last_time = -1
+            self._error_reported = False
+
+    def report_error(self) -> None:
+        self._error_reported = True
+
+    def stop(self) -> None:
+        self._stop_event.set()
+
+    def _reset_counters(self) -> None:
+        self._attempts = 0
+        self._next_attempt_at = 0.0
+        self._last_progress = time.monotonic() + self.stall_seconds
+        self._last_time = -1
+        self._stable_since = None
+        self._error_reported = False
+
+    def _run(self) -> None:
+        while not self._stop_event.wait(self.interval):
+            try:
+                self._check()
+            except Exception as e:
+                logger.error(f"StallWatchdog: Error al comprobar la reproducción: {e}", exc_info=True)
+
+    def _check(self) -> None:
+        with self._lock:
+            player = self._player
+            if player is None:
+                return
+            now = time.monotonic()
+            state = player.get_state()
+
+            if state in IDLE_STATES:
+                self._last_progress = now
+                return
+
+            current_time = player.get_time()
+            if state == vlc.State.Playing and current_time > self._last_time:
+                self._last_time = current_time
+                self._last_progress = now
+                if self._stable_since is None:
+                    self._stable_since = now
+                elif self._attempts and now - self._stable_since > self.stall_seconds * 3:
+                    logger.info("StallWatchdog: Reproducción estable, reiniciando el contador de reconexiones")
+                    self._attempts = 0
+                return
+
+            self._stable_since = None
+            ended_live = state == vlc.State.Ended and self._is_live
+            stalled = now - self._last_progress > self.stall_seconds
+            if not (self._error_reported or state == vlc.State.Error or ended_live or stalled):
+                return
+            if now < self._next_attempt_at:
+                return
+            if self._attempts >= self.max_attempts:
+                if self._attempts == self.max_attempts:
+                    logger.error("StallWatchdog: Se agotaron los intentos de reconexión")
+                    self._attempts += 1
+                    self._on_stall(give_up=True)
+                return
+
+            backoff = min(self.max_backoff, 2 ** self._attempts)
+            self._attempts += 1
+            self._next_attempt_at = now + backoff
+            self._error_reported = False
+            self._last_progress = now + backoff
+            logger.warning(f"StallWatchdog: Reproducción detenida (estado {state}), intento {self._attempts}, "
+                           f"siguiente espera {backoff}s")
+
+        self._on_stall(give_up=False)
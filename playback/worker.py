@@ -0,0 +1,95 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import logging
+import queue
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Comandos que reemplazan a cualquier otro pendiente del mismo tipo: solo el
+# último cuenta, y lanzar uno invalida la resolución que esté en curso.
+SUPERSEDING_COMMANDS = {"play", "stop"}
+
+_SHUTDOWN = object()
+
+
+class PlaybackWorker:
+    def __init__(self, handler, debounce: float = 0.3, name: str = "playback-worker"):
+        self._handler = handler
+        self._debounce = debounce
+        self._queue: queue.Queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    @property
+    def generation(self) -> int:
+        return self._generation
+
+    def submit(self, command: str, *args) -> int:
+        with self._lock:
+            if command in SUPERSEDING_COMMANDS:
+                self._generation += 1
+            generation = self._generation
+        self._queue.put((command, args, generation))
+        return generation
+
+    def is_stale(self, generation: int) -> bool:
+        return generation != self._generation
+
+    def shutdown(self, timeout: float = 2.0) -> None:
+        with self._lock:
+            self._generation += 1
+        self._queue.put(_SHUTDOWN)
+        if threading.current_thread() is not self._thread:
+            self._thread.join(timeout)
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is _SHUTDOWN:
+                return
+
+            batch = [item]
+            if item[0] == "play":
+                if not self._collect(batch):
+                    return
+
+            for command, args, generation in self._coalesce(batch):
+                if command in SUPERSEDING_COMMANDS and self.is_stale(generation):
+                    logger.debug(f"PlaybackWorker: comando '{command}' descartado por obsoleto")
+                    continue
+                try:
+                    self._handler(command, args, generation)
+                except Exception as e:
+                    logger.error(f"PlaybackWorker: Error al procesar '{command}': {e}", exc_info=True)
+
+    def _collect(self, batch: list) -> bool:
+        deadline = time.monotonic() + self._debounce
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return True
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                return True
+            if item is _SHUTDOWN:
+                return False
+            batch.append(item)
+            if item[0] == "play":
+                deadline = time.monotonic() + self._debounce
+
+    @staticmethod
+    def _coalesce(batch: list) -> list:
+        last_superseding = max(
+            (i for i, (command, _, _) in enumerate(batch) if command in SUPERSEDING_COMMANDS),
+            default=-1
+        )
+        return [
+            item for i, item in enumerate(batch)
+            if item[0] not in SUPERSEDING_COMMANDS or i == last_superseding
+        ]
@@ -0,0 +1,50 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import json
+from pathlib import Path
+
+class CatalogFileError(Exception):
+    pass
+
+def read_streams_file(file_path: str) -> list:
+    path = Path(file_path)
+    if not path.exists():
+        raise CatalogFileError(f"El archivo '{file_path}' no existe")
+    if not path.is_file():
+        raise CatalogFileError(f"La ruta '{file_path}' no es un archivo")
+    if path.suffix.lower() != '.json':
+        raise CatalogFileError(f"El archivo '{file_path}' no es un archivo JSON válido")
+
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        raise CatalogFileError(f"Archivo no encontrado en la ruta '{file_path}'")
+    except json.JSONDecodeError:
+        raise CatalogFileError(f"El archivo '{file_path}' no es un JSON válido")
+
+    if not isinstance(data, list):
+        raise CatalogFileError("El archivo JSON debe contener una lista de streams")
+    return data
+
+def write_streams_file(file_name: str, streams_data: list[dict]) -> None:
+    with open(Path(file_name), 'w', encoding='utf-8') as f:
+        json.dump(streams_data, f, indent=4, ensure_ascii=False)
+
+def read_sync_file(file_path: str) -> dict:
+    path = Path(file_path)
+    if not path.is_file():
+        raise CatalogFileError(f"El archivo '{file_path}' no existe")
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except json.JSONDecodeError:
+        raise CatalogFileError(f"El archivo '{file_path}' no es un JSON válido")
+    if not isinstance(data, dict):
+        raise CatalogFileError("El archivo de sincronización debe contener un objeto JSON")
+    return data
+
+def write_sync_file(file_name: str, delta: dict) -> None:
+    with open(Path(file_name), 'w', encoding='utf-8') as f:
+        json.dump(delta, f, ensure_ascii=False)
@@ -3,7 +3,10 @@
 
 import configparser
 from pathlib import Path
+import atexit
 import logging
+import logging.handlers
+import queue
 import sys
 
 CONFIG_FILE = Path("config.ini")
@@ -27,8 +30,97 @@ def load_config():
 
 app_config = load_config()
 ENABLE_DEBUG_LOGGING = app_config.getboolean('DEBUGGING', 'ENABLE_DEBUG_LOGGING', fallback=True)
+STARTUP_TIMING_FILE = app_config.get('DEBUGGING', 'STARTUP_TIMING_FILE', fallback='').strip()
+
+RESOLVER_PROCESSES = app_config.getint('RESOLVER', 'PROCESSES', fallback=1)
+RESOLVER_TIMEOUT = app_config.getfloat('RESOLVER', 'TIMEOUT', fallback=60.0)
+
+YOUTUBE_QUALITY = app_config.get('YOUTUBE', 'QUALITY', fallback='balanced').strip().lower()
+
+AUDIO_CACHE_ENABLED = app_config.getboolean('AUDIO_CACHE', 'ENABLED', fallback=False)
+AUDIO_CACHE_DIR = app_config.get('AUDIO_CACHE', 'DIRECTORY', fallback='cache/audio')
+AUDIO_CACHE_MAX_MB = app_config.getint('AUDIO_CACHE', 'MAX_SIZE_MB', fallback=1024)
+
+TIMESHIFT_ENABLED = app_config.getboolean('TIMESHIFT', 'ENABLED', fallback=False)
+TIMESHIFT_DIR = app_config.get('TIMESHIFT', 'DIRECTORY', fallback='cache/timeshift')
+TIMESHIFT_MINUTES = app_config.getint('TIMESHIFT', 'MINUTES', fallback=30)
+TIMESHIFT_MAX_MB = app_config.getint('TIMESHIFT', 'MAX_SIZE_MB', fallback=128)
+REWIND_SECONDS = app_config.getint('TIMESHIFT', 'REWIND_SECONDS', fallback=30)
+
+WATCHDOG_ENABLED = app_config.getboolean('WATCHDOG', 'ENABLED', fallback=True)
+WATCHDOG_STALL_SECONDS = app_config.getfloat('WATCHDOG', 'STALL_SECONDS', fallback=8.0)
+WATCHDOG_MAX_BACKOFF = app_config.getfloat('WATCHDOG', 'MAX_BACKOFF', fallback=60.0)
+WATCHDOG_MAX_ATTEMPTS = app_config.getint('WATCHDOG', 'MAX_ATTEMPTS', fallback=8)
+
+VALIDATION_CONCURRENCY = app_config.getint('VALIDATION', 'CONCURRENCY', fallback=8)
+
+PROFILING_ENABLED = app_config.getboolean('PROFILING', 'ENABLED', fallback=False)
+PROFILING_ACTIONS = {a.strip().lower() for a in app_config.get('PROFILING', 'ACTIONS', fallback='all').split(',') if a.strip()}
+PROFILING_CPROFILE = app_config.getboolean('PROFILING', 'CPROFILE', fallback=True)
+PROFILING_TRACEMALLOC = app_config.getboolean('PROFILING', 'TRACEMALLOC', fallback=False)
+PROFILING_DIR = app_config.get('PROFILING', 'DIR', fallback='profiles').strip() or 'profiles'
+PROFILING_TOP_ALLOCATIONS = app_config.getint('PROFILING', 'TOP_ALLOCATIONS', fallback=25)
+
+METRICS_DUMP_FILE = app_config.get('METRICS', 'DUMP_FILE', fallback='').strip()
+
+SEARCH_DEBOUNCE_MS = app_config.getint('SEARCH', 'DEBOUNCE_MS', fallback=150)
+SEARCH_FUZZY = app_config.getboolean('SEARCH', 'FUZZY', fallback=True)
+MAX_TABLE_ROWS = app_config.getint('SEARCH', 'MAX_TABLE_ROWS', fallback=1000)
+
+PLAY_HISTORY_ENABLED = app_config.getboolean('PLAY_HISTORY', 'ENABLED', fallback=True)
+PLAY_HISTORY_FLUSH_SECONDS = app_config.getfloat('PLAY_HISTORY', 'FLUSH_SECONDS', fallback=30)
+
+CATALOG_SNAPSHOT_ENABLED = app_config.getboolean('CATALOG_SNAPSHOT', 'ENABLED', fallback=True)
+CATALOG_REFRESH_SECONDS = app_config.getfloat('CATALOG_SNAPSHOT', 'REFRESH_SECONDS', fallback=5)
+
+DAEMON_SOCKET_PATH = app_config.get('DAEMON', 'SOCKET_PATH', fallback='quiet_stream.sock')
+DAEMON_ATTACH = app_config.getboolean('DAEMON', 'ATTACH', fallback=True)
+
+VLC_STREAM_PROFILE = app_config.get('VLC', 'STREAM_PROFILE', fallback='radio')
+VLC_VIDEO_PROFILE = app_config.get('VLC', 'VIDEO_PROFILE', fallback='audio')
+
+VLC_PROFILE_PREFIX = 'VLC_PROFILE:'
+AUDIO_ONLY_VLC_ARGS = '--no-video --vout=dummy --no-spu --no-osd --no-video-title-show --no-xlib --quiet'
+
+def get_vlc_args(profile: str) -> list[str]:
+    section = f"{VLC_PROFILE_PREFIX}{profile}"
+    if not app_config.has_section(section):
+        if profile:
+            logging.getLogger(__name__).warning(f"Perfil de VLC '{profile}' no definido, usando perfil de solo audio")
+        return AUDIO_ONLY_VLC_ARGS.split()
+
+    args = app_config.get(section, 'ARGS', fallback='').split()
+    for option, flag in (('NETWORK_CACHING', '--network-caching'),
+                         ('LIVE_CACHING', '--live-caching'),
+                         ('FILE_CACHING', '--file-caching')):
+        value = app_config.get(section, option, fallback='').strip()
+        if value:
+            args.append(f"{flag}={int(value)}")
+    return args
+
+LOG_FILE = app_config.get('LOGGING', 'FILE', fallback='debug.log').strip() or 'debug.log'
+LOG_MAX_MB = app_config.getint('LOGGING', 'MAX_MB', fallback=5)
+LOG_BACKUP_COUNT = app_config.getint('LOGGING', 'BACKUP_COUNT', fallback=3)
+
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+_log_listener: logging.handlers.QueueListener | None = None
+_console_handler: logging.Handler | None = None
+
+def get_module_log_levels() -> dict[str, int]:
+    levels = {}
+    if app_config.has_section('LOGGING_LEVELS'):
+        for module, level_name in app_config.items('LOGGING_LEVELS'):
+            level = logging.getLevelName(level_name.strip().upper())
+            if isinstance(level, int):
+                levels[module] = level
+    return levels
 
 def setup_logging():
+    # Los módulos solo encolan registros; un hilo de fondo los escribe en un
+    # archivo rotativo. La consola queda apagada mientras corre la interfaz.
+    global _log_listener, _console_handler
+
     if ENABLE_DEBUG_LOGGING:
         effective_log_level = logging.DEBUG
     else:
@@ -36,6 +128,8 @@ def setup_logging():
 
     root_logger = logging.getLogger()
 
+    if _log_listener:
+        _log_listener.stop()
     if root_logger.handlers:
         for handler in root_logger.handlers[:]:
             root_logger.removeHandler(handler)
@@ -43,20 +137,44 @@ def setup_logging():
                 handler.close()
 
     root_logger.setLevel(effective_log_level)
+    # Los niveles por módulo afinan el registro de depuración; con él apagado
+    # no deben volver a activar mensajes informativos.
+    if ENABLE_DEBUG_LOGGING:
+        for module, level in get_module_log_levels().items():
+            logging.getLogger(module).setLevel(level)
 
-    formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
+    formatter = logging.Formatter(LOG_FORMAT)
 
-    file_handler = logging.FileHandler('debug.log', encoding='utf-8')
-    file_handler.setLevel(effective_log_level)
+    file_handler = logging.handlers.RotatingFileHandler(
+        LOG_FILE,
+        maxBytes=LOG_MAX_MB * 1024 * 1024,
+        backupCount=LOG_BACKUP_COUNT,
+        encoding='utf-8',
+        delay=True
+    )
     file_handler.setFormatter(formatter)
-    root_logger.addHandler(file_handler)
 
-    stream_handler = logging.StreamHandler(sys.stdout)
-    stream_handler.setLevel(effective_log_level)
-    stream_handler.setFormatter(formatter)
-    root_logger.addHandler(stream_handler)
+    _console_handler = logging.StreamHandler(sys.stderr)
+    _console_handler.setFormatter(formatter)
+    _console_handler.setLevel(logging.CRITICAL + 1)
+
+    log_queue = queue.SimpleQueue()
+    root_logger.addHandler(logging.handlers.QueueHandler(log_queue))
+    _log_listener = logging.handlers.QueueListener(log_queue, file_handler, _console_handler, respect_handler_level=True)
+    _log_listener.start()
 
     return logging.getLogger(__name__)
 
+def set_console_logging(enabled: bool) -> None:
+    # Solo para los modos sin interfaz (daemon y línea de comandos); usa stderr
+    # para no mezclarse con la salida JSON en stdout.
+    if _console_handler:
+        _console_handler.setLevel(logging.NOTSET if enabled else logging.CRITICAL + 1)
+
+def stop_logging() -> None:
+    if _log_listener:
+        _log_listener.stop()
+
 initial_logger = setup_logging()
+atexit.register(stop_logging)
 initial_logger.info("Sistema de logging inicializado.")
\ No newline at end of file
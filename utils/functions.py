@@ -19,4 +19,10 @@ def clean_emoji_from_string(text: str) -> str:
         "]+", flags=re.UNICODE
     )
     cleaned_text = emoji_pattern.sub(r'', text).strip()
-    return cleaned_text
\ No newline at end of file
+    return cleaned_text
+
+def format_bytes(size: float) -> str:
+    for unit in ("B", "KB", "MB", "GB"):
+        if abs(size) < 1024 or unit == "GB":
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
@@ -0,0 +1,102 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import json
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+HISTOGRAM_SAMPLES = 512
+
+class Histogram:
+    # Totales exactos y una ventana de las últimas muestras para percentiles.
+    __slots__ = ("count", "total", "min", "max", "samples")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+        self.samples = deque(maxlen=HISTOGRAM_SAMPLES)
+
+    def observe(self, value: float) -> None:
+        self.count += 1
+        self.total += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+        self.samples.append(value)
+
+    def percentile(self, fraction: float) -> float | None:
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+    def summary(self) -> dict:
+        return {
+            "count": self.count,
+            "total": round(self.total, 3),
+            "mean": round(self.total / self.count, 3) if self.count else None,
+            "min": self.min,
+            "max": self.max,
+            "p50": self.percentile(0.5),
+            "p95": self.percentile(0.95),
+        }
+
+class MetricsRegistry:
+    # Contadores, valores instantáneos e histogramas; los tiempos se guardan
+    # en milisegundos en histogramas con sufijo _ms. Seguro entre hilos: lo
+    # usan la interfaz, el hilo de la base de datos y el de reproducción.
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: dict[str, float] = {}
+        self._gauges: dict[str, float] = {}
+        self._histograms: dict[str, Histogram] = {}
+        self.started_at = time.time()
+
+    def increment(self, name: str, value: float = 1) -> None:
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def set_gauge(self, name: str, value: float) -> None:
+        with self._lock:
+            self._gauges[name] = value
+
+    def observe(self, name: str, value: float) -> None:
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = Histogram()
+            histogram.observe(value)
+
+    @contextmanager
+    def timer(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, round((time.perf_counter() - started) * 1000, 3))
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "started_at": self.started_at,
+                "uptime_seconds": round(time.time() - self.started_at, 1),
+                "counters": dict(self._counters),
+                "gauges": dict(self._gauges),
+                "histograms": {name: h.summary() for name, h in self._histograms.items()},
+            }
+
+    def dump(self, path: str) -> None:
+        try:
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(self.snapshot(), f, indent=2, ensure_ascii=False)
+            logger.info(f"Métricas guardadas en '{path}'")
+        except OSError as e:
+            logger.warning(f"No se pudieron guardar las métricas en '{path}': {e}")
+
+metrics = MetricsRegistry()
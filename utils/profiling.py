@@ -0,0 +1,112 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import cProfile
+import functools
+import inspect
+import logging
+import os
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+from utils.config_manager import (
+    PROFILING_ACTIONS, PROFILING_CPROFILE, PROFILING_DIR, PROFILING_ENABLED,
+    PROFILING_TOP_ALLOCATIONS, PROFILING_TRACEMALLOC
+)
+
+logger = logging.getLogger(__name__)
+
+# cProfile no admite dos perfiles activos a la vez: una acción anidada dentro
+# de otra perfilada se ejecuta sin perfil propio.
+_active_lock = threading.Lock()
+_active = False
+
+def is_profiled(action: str) -> bool:
+    return PROFILING_ENABLED and ("all" in PROFILING_ACTIONS or action in PROFILING_ACTIONS)
+
+_own_frames = (
+    tracemalloc.Filter(False, cProfile.__file__),
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, __file__),
+)
+
+def _report_base(action: str) -> str:
+    now = time.time()
+    stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(now)) + f"-{int(now * 1000) % 1000:03d}"
+    return os.path.join(PROFILING_DIR, f"{action}-{stamp}")
+
+@contextmanager
+def profile_action(action: str):
+    global _active
+    with _active_lock:
+        nested, _active = _active, True
+    if nested:
+        yield
+        return
+
+    profiler = cProfile.Profile() if PROFILING_CPROFILE else None
+    started_tracing = False
+    memory_before = None
+    if PROFILING_TRACEMALLOC:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            started_tracing = True
+        memory_before = tracemalloc.take_snapshot()
+
+    started = time.perf_counter()
+    if profiler:
+        profiler.enable()
+    try:
+        yield
+    finally:
+        if profiler:
+            profiler.disable()
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        try:
+            os.makedirs(PROFILING_DIR, exist_ok=True)
+            report_base = _report_base(action)
+            if profiler:
+                path = f"{report_base}.pstats"
+                profiler.dump_stats(path)
+                logger.info(f"Perfil de '{action}' ({elapsed_ms:.0f} ms) guardado en '{path}'")
+            if memory_before is not None:
+                memory_after = tracemalloc.take_snapshot().filter_traces(_own_frames)
+                memory_before = memory_before.filter_traces(_own_frames)
+                path = f"{report_base}.memory.txt"
+                with open(path, 'w', encoding='utf-8') as f:
+                    f.write(f"# {action}: {elapsed_ms:.0f} ms\n")
+                    for stat in memory_after.compare_to(memory_before, "lineno")[:PROFILING_TOP_ALLOCATIONS]:
+                        f.write(f"{stat}\n")
+                logger.info(f"Diferencia de memoria de '{action}' guardada en '{path}'")
+        except OSError as e:
+            logger.warning(f"No se pudo guardar el perfil de '{action}': {e}")
+        finally:
+            if started_tracing:
+                tracemalloc.stop()
+            with _active_lock:
+                _active = False
+
+def profiled(action: str):
+    # Si la acción no está habilitada en [PROFILING] se devuelve la función
+    # original: desactivado no añade ni una llamada extra.
+    def decorator(func):
+        if not is_profiled(action):
+            return func
+
+        if inspect.iscoroutinefunction(func):
+            # En funciones async el perfil abarca también lo que el bucle de
+            # eventos ejecute mientras la acción espera.
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with profile_action(action):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with profile_action(action):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,137 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import difflib
+import re
+import unicodedata
+from array import array
+from bisect import bisect_left
+from collections import defaultdict
+
+NGRAM_SIZE = 3
+FUZZY_CUTOFF = 0.75
+FUZZY_MATCHES_PER_TOKEN = 5
+
+_token_pattern = re.compile(r"\w+")
+
+def fold_text(text: str) -> str:
+    # Minúsculas y sin acentos: "Canción" y "cancion" se buscan igual.
+    decomposed = unicodedata.normalize("NFKD", text)
+    return "".join(c for c in decomposed if not unicodedata.combining(c)).casefold()
+
+def _ngrams(text: str) -> set[str]:
+    return {text[i:i + NGRAM_SIZE] for i in range(len(text) - NGRAM_SIZE + 1)}
+
+class Postings:
+    # Claves ordenadas y, para cada una, un tramo de un único array de filas.
+    # La búsqueda es binaria, así que funciona igual sobre listas en memoria
+    # que sobre columnas mapeadas desde la instantánea del catálogo.
+    __slots__ = ("keys", "offsets", "rows")
+
+    def __init__(self, keys, offsets, rows):
+        self.keys = keys
+        self.offsets = offsets
+        self.rows = rows
+
+    @classmethod
+    def from_dict(cls, mapping: dict[str, array]) -> "Postings":
+        keys = sorted(mapping)
+        offsets = array("q", [0])
+        rows = array("i")
+        for key in keys:
+            rows.extend(mapping[key])
+            offsets.append(len(rows))
+        return cls(keys, offsets, memoryview(rows))
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def get(self, key: str):
+        position = bisect_left(self.keys, key)
+        if position < len(self.keys) and self.keys[position] == key:
+            return self.rows[self.offsets[position]:self.offsets[position + 1]]
+        return None
+
+class SearchIndex:
+    # Índice de un catálogo para un conjunto de columnas. Cada fila guarda su
+    # texto normalizado; los trigramas apuntan a las filas que los contienen
+    # y los tokens completos alimentan la búsqueda aproximada.
+    def __init__(self, texts, ngram_rows: Postings, token_rows: Postings, version: int):
+        self.version = version
+        self._texts = texts
+        self._ngram_rows = ngram_rows
+        self._token_rows = token_rows
+        self._vocabulary: list[str] | None = None
+
+    @classmethod
+    def build(cls, columns: list, version: int) -> "SearchIndex":
+        texts: list[str] = []
+        ngram_rows: dict[str, array] = defaultdict(lambda: array("i"))
+        token_rows: dict[str, array] = defaultdict(lambda: array("i"))
+
+        for row, values in enumerate(zip(*columns)):
+            text = "\x00".join(fold_text(value) for value in values)
+            texts.append(text)
+            for ngram in _ngrams(text):
+                ngram_rows[ngram].append(row)
+            for token in set(_token_pattern.findall(text)):
+                token_rows[token].append(row)
+
+        return cls(texts, Postings.from_dict(ngram_rows), Postings.from_dict(token_rows), version)
+
+    @property
+    def texts(self):
+        return self._texts
+
+    @property
+    def ngram_rows(self) -> Postings:
+        return self._ngram_rows
+
+    @property
+    def token_rows(self) -> Postings:
+        return self._token_rows
+
+    @property
+    def vocabulary(self) -> list[str]:
+        # Los números no se corrigen: "Radio 7" no debe coincidir con "Radio 1".
+        if self._vocabulary is None:
+            self._vocabulary = [token for token in self._token_rows.keys if not token.isdigit()]
+        return self._vocabulary
+
+    def __len__(self) -> int:
+        return len(self._texts)
+
+    def search(self, query: str, within: array | None = None) -> array:
+        # within es el resultado de una consulta que la actual extiende: basta
+        # con filtrarlo en lugar de recorrer todo el catálogo.
+        needle = fold_text(query).strip()
+        if not needle:
+            return array("l", range(len(self._texts))) if within is None else within
+
+        candidates = within
+        if len(needle) >= NGRAM_SIZE:
+            ngram_rows = [self._ngram_rows.get(ngram) for ngram in _ngrams(needle)]
+            if any(rows is None for rows in ngram_rows):
+                return array("l")
+            rarest = min(ngram_rows, key=len)
+            if candidates is None or len(rarest) < len(candidates):
+                candidates = rarest
+        if candidates is None:
+            candidates = range(len(self._texts))
+
+        texts = self._texts
+        return array("l", (row for row in candidates if needle in texts[row]))
+
+    def fuzzy_search(self, query: str, limit: int) -> array:
+        # Tolera errores de tipeo: cada palabra de la consulta se compara con
+        # el vocabulario y las filas se ordenan por similitud acumulada.
+        scores: dict[int, float] = defaultdict(float)
+        for token in _token_pattern.findall(fold_text(query)):
+            matcher = difflib.SequenceMatcher(b=token)
+            for candidate in difflib.get_close_matches(token, self.vocabulary, n=FUZZY_MATCHES_PER_TOKEN, cutoff=FUZZY_CUTOFF):
+                matcher.set_seq1(candidate)
+                similarity = matcher.ratio()
+                for row in self._token_rows.get(candidate):
+                    scores[row] += similarity
+        ranked = sorted(scores, key=lambda row: (-scores[row], row))
+        return array("l", ranked[:limit])
@@ -0,0 +1,63 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import asyncio
+import logging
+import time
+
+from utils.metrics import metrics
+from utils.profiling import profiled
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CONCURRENCY = 8
+CHECK_TIMEOUT = 5
+
+async def check_stream_link(client, url: str) -> bool:
+    import httpx
+
+    if not url:
+        return False
+
+    started = time.perf_counter()
+    try:
+        response = await client.head(url, timeout=CHECK_TIMEOUT)
+        metrics.observe("validation.check_ms", round((time.perf_counter() - started) * 1000, 3))
+        return 200 <= response.status_code < 400
+    except httpx.TimeoutException:
+        logger.error(f"Timeout al validar URL: {url}")
+        return False
+    except httpx.RequestError as e:
+        logger.error(f"Error de conexión al validar URL {url}: {e}")
+        return False
+    except Exception as e:
+        logger.error(f"Error inesperado al validar URL {url}: {e}", exc_info=True)
+        return False
+
+@profiled("validation")
+async def validate_streams(streams: list[dict], concurrency: int = DEFAULT_CONCURRENCY, on_result=None) -> list[dict]:
+    # httpx se importa aquí para no cargarlo al abrir el gestor de streams.
+    import httpx
+
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    broken_streams: list[dict] = []
+    done = 0
+
+    async with httpx.AsyncClient() as client:
+        async def check(stream_data: dict) -> None:
+            nonlocal done
+            async with semaphore:
+                is_functional = await check_stream_link(client, stream_data.get("link", ""))
+            done += 1
+            metrics.increment("validation.functional" if is_functional else "validation.broken")
+            if is_functional:
+                logger.info(f"Stream funcional: {stream_data.get('nombre', 'N/A')} - {stream_data.get('link', '')}")
+            else:
+                broken_streams.append(stream_data)
+                logger.warning(f"Stream no funcional: {stream_data.get('nombre', 'N/A')} - {stream_data.get('link', '')}")
+            if on_result:
+                on_result(stream_data, is_functional, done)
+
+        await asyncio.gather(*(check(stream_data) for stream_data in streams))
+
+    return broken_streams
@@ -2,31 +2,34 @@
 # -*- coding: utf-8 -*-
 
 import logging
-import json
-from pathlib import Path
 from textual.app import ComposeResult
 from textual.containers import Container, Horizontal, Vertical, Center
 from textual.widgets import Header, Footer, Static, DataTable, Input, Button
 from textual.screen import Screen
 from textual.reactive import reactive
 from textual import work, on
-from sqlmodel import select, Session
-
-from database.models import Stream, get_session
-from utils.config_manager import ENABLE_DEBUG_LOGGING
-
+import asyncio
+import time
+from array import array
+
+from database.async_db import run_db
+from database.catalog_store import CatalogSearch, CatalogStore, catalog_is_stale, get_catalog, load_catalog, search_status_parts
+from database.repository import delete_streams, export_stream_dicts, get_stream_for_edit, import_stream_dicts, update_streams
+from utils.catalog_io import CatalogFileError, read_streams_file, write_streams_file
+from utils.config_manager import CATALOG_REFRESH_SECONDS, MAX_TABLE_ROWS, SEARCH_DEBOUNCE_MS
+from utils.metrics import metrics
+from utils.profiling import profiled
+
+from modals.bulk_edit_modal import BulkEditModal
 from modals.confirmation_modal import ConfirmationModal
 from modals.stream_modal import StreamModal
 from modals.import_json_modal import ImportJsonModal
 from modals.export_json_modal import ExportJsonModal
 from modals.stream_validation_modal import StreamValidationModal
 
-if ENABLE_DEBUG_LOGGING:
-    logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-else:
-    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+SEARCH_FIELDS = ("nombres", "categorias", "tipos")
 
 class AdminScreen(Screen):
     CSS_PATH = "../static/style.css"
@@ -34,6 +37,9 @@ class AdminScreen(Screen):
         ("a", "add_stream", "Agregar"),
         ("e", "edit_stream", "Editar"),
         ("d", "delete_stream", "Eliminar"),
+        ("space", "toggle_mark", "Marcar"),
+        ("t", "mark_all", "Marcar todos"),
+        ("m", "bulk_edit", "Editar marcados"),
         ("i", "import_streams", "Importar JSON"),
         ("x", "export_streams", "Exportar JSON"),
         ("v", "validate_streams", "Validar Streams"),
@@ -41,8 +47,17 @@ class AdminScreen(Screen):
     ]
 
     selected_stream_id: reactive[int | None] = reactive(None)
-    all_streams: list[dict] = []
-    filtered_streams: reactive[list[dict]] = reactive([])
+    catalog: CatalogStore = get_catalog()
+    filtered_rows: reactive[array] = reactive(array("l"), always_update=True)
+    search_fuzzy: bool = False
+    catalog_search: CatalogSearch | None = None
+    search_timer = None
+    loaded_catalog_version: int = -1
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        # Por instancia: un set a nivel de clase se compartiría entre pantallas.
+        self.marked_ids: set[int] = set()
 
     def compose(self) -> ComposeResult:
         yield Static("Gestor de Streams", id="screen_title")
@@ -52,6 +67,8 @@ class AdminScreen(Screen):
                     yield Static("Buscar por nombre:", classes="search-label")
                     yield Input(placeholder="Escribe para buscar...", id="search_input", classes="search-input")
                     yield Button("🔍 Buscar", id="perform_search", classes="search-button")
+            with Center():
+                yield Static("", id="search_status")
             
             with Center(id="table_section"):
                 yield Static("Cargando streams...", id="placeholder")
@@ -59,32 +76,38 @@ class AdminScreen(Screen):
         yield Footer()
 
     def on_mount(self) -> None:
+        self.catalog_search = CatalogSearch(SEARCH_FIELDS)
         table = self.query_one("#stream_table", DataTable)
         table.cursor_type = "row"
         
+        table.add_column("", width=1, key="marked")
         table.add_column("ID", width=4) 
         table.add_column("Nombre", width=40)
         table.add_column("Categorías", width=28)
         table.add_column("Tipo", width=14) 
         
         self._load_all_streams()
-        self.query_one("#stream_table", DataTable).focus()
+        self.set_interval(CATALOG_REFRESH_SECONDS, self._refresh_if_stale)
 
-    def watch_filtered_streams(self, old_streams: list[dict], new_streams: list[dict]) -> None:
+    def watch_filtered_rows(self, old_rows: array, new_rows: array) -> None:
         table = self.query_one("#stream_table", DataTable)
         placeholder = self.query_one("#placeholder", Static)
+        catalog = self.catalog
         
+        started = time.perf_counter()
         table.clear()
-        if new_streams:
+        if new_rows:
             placeholder.visible = False
             table.visible = True
-            for s_dict in new_streams:
+            for row in new_rows[:MAX_TABLE_ROWS]:
+                stream_id = str(catalog.ids[row])
                 table.add_row(
-                    str(s_dict["id"]),
-                    s_dict["nombre"],
-                    s_dict["categorias"],
-                    "🎬 Video" if s_dict["tipo"].lower() == "video" else "📡 Stream",
-                    key=str(s_dict["id"])
+                    "✓" if catalog.ids[row] in self.marked_ids else "",
+                    stream_id,
+                    catalog.nombres[row],
+                    catalog.categorias[row],
+                    "🎬 Video" if catalog.is_video(row) else "📡 Stream",
+                    key=stream_id
                 )
             if table.row_count > 0 and self.screen.focused != self.query_one("#search_input"):
                 table.move_cursor(row=0)
@@ -96,6 +119,7 @@ class AdminScreen(Screen):
                 placeholder.update("No se encontraron resultados para la búsqueda")
             else:
                 placeholder.update("No hay streams en la base de datos")
+        metrics.observe("table.rebuild_ms", round((time.perf_counter() - started) * 1000, 3))
 
     @on(DataTable.RowSelected)
     def on_row_selected(self, event: DataTable.RowSelected) -> None:
@@ -106,35 +130,101 @@ class AdminScreen(Screen):
             self.selected_stream_id = None
             logger.error(f"Error al convertir row_key a int: {event.row_key}")
 
+    def action_toggle_mark(self) -> None:
+        table = self.query_one("#stream_table", DataTable)
+        if table.row_count == 0:
+            return
+        row_key = table.coordinate_to_cell_key(table.cursor_coordinate).row_key
+        stream_id = int(row_key.value)
+        if stream_id in self.marked_ids:
+            self.marked_ids.discard(stream_id)
+            table.update_cell(row_key, "marked", "")
+        else:
+            self.marked_ids.add(stream_id)
+            table.update_cell(row_key, "marked", "✓")
+        if table.cursor_row < table.row_count - 1:
+            table.move_cursor(row=table.cursor_row + 1)
+        self._update_search_status(len(self.filtered_rows), self.search_fuzzy)
+
+    def action_mark_all(self) -> None:
+        # Opera sobre todo el resultado de la búsqueda, no solo sobre las
+        # MAX_TABLE_ROWS filas dibujadas; si ya estaban todos marcados, los
+        # desmarca.
+        ids = self.catalog.ids
+        stream_ids = {ids[row] for row in self.filtered_rows}
+        if not stream_ids:
+            return
+        if stream_ids <= self.marked_ids:
+            self.marked_ids -= stream_ids
+            mark = ""
+        else:
+            self.marked_ids |= stream_ids
+            mark = "✓"
+        table = self.query_one("#stream_table", DataTable)
+        for row in self.filtered_rows[:MAX_TABLE_ROWS]:
+            table.update_cell(str(ids[row]), "marked", mark)
+        self._update_search_status(len(self.filtered_rows), self.search_fuzzy)
+
     @on(Button.Pressed, "#perform_search")
     def perform_search_button(self) -> None:
         search_input = self.query_one("#search_input", Input)
-        self._apply_search_filter(search_input.value)
+        self._search_now(search_input.value)
 
     @on(Input.Submitted, "#search_input")
     def search_input_submitted(self, event: Input.Submitted) -> None:
-        self._apply_search_filter(event.value)
-
-    def _apply_search_filter(self, search_value: str) -> None:
-        search_text = search_value.strip().lower()
-        
-        if search_text:
-            self.filtered_streams = [
-                s for s in self.all_streams 
-                if search_text in s.get("nombre", "").lower() or
-                   search_text in s.get("categorias", "").lower() or
-                   search_text in s.get("tipo", "").lower()
-            ]
-        else:
-            self.filtered_streams = list(self.all_streams)
-
-    def _load_all_streams(self) -> None:
+        self._search_now(event.value)
+
+    @on(Input.Changed, "#search_input")
+    def search_input_changed(self, event: Input.Changed) -> None:
+        if self.search_timer:
+            self.search_timer.stop()
+        self.search_timer = self.set_timer(SEARCH_DEBOUNCE_MS / 1000, lambda: self._apply_search_filter(event.value))
+
+    def _search_now(self, search_value: str) -> None:
+        if self.search_timer:
+            self.search_timer.stop()
+        self._apply_search_filter(search_value)
+
+    @work(exclusive=True, group="search")
+    async def _apply_search_filter(self, search_value: str) -> None:
+        await self._run_search(search_value)
+
+    @profiled("search")
+    async def _run_search(self, search_value: str) -> None:
+        rows, fuzzy, _ = await self.catalog_search.run(search_value, self.filtered_rows)
+        self.search_fuzzy = fuzzy
+        self.filtered_rows = rows
+        self._update_search_status(len(rows), fuzzy)
+
+    def _update_search_status(self, total: int, fuzzy: bool) -> None:
+        parts = search_status_parts(total, fuzzy)
+        if self.marked_ids:
+            parts.append(f"{len(self.marked_ids)} marcados")
+        self.query_one("#search_status", Static).update(" · ".join(parts))
+
+    def on_screen_resume(self) -> None:
+        self._refresh_if_stale()
+
+    @work(exclusive=True, group="catalog_check")
+    async def _refresh_if_stale(self) -> None:
+        # También detecta cambios de otros procesos (daemon, línea de comandos).
+        if self.is_current and self.loaded_catalog_version >= 0 and await catalog_is_stale(self.loaded_catalog_version):
+            self._load_all_streams()
+
+    @work(exclusive=True, group="catalog_load")
+    @profiled("mount")
+    async def _load_all_streams(self) -> None:
+        # El perfil de montaje cubre la carga del catálogo y la primera
+        # búsqueda, que corren aquí y no en on_mount.
+        first_load = self.loaded_catalog_version < 0
         try:
-            with get_session() as session:
-                streams_from_db = session.exec(select(Stream)).all()
-                self.all_streams = [s.model_dump() for s in streams_from_db]
-            self.filtered_streams = list(self.all_streams)
-            logger.debug(f"Todos los streams cargados: {len(self.all_streams)}.")
+            self.catalog = await load_catalog()
+            self.loaded_catalog_version = self.catalog.version
+            self.marked_ids = {stream_id for stream_id in self.marked_ids if self.catalog.row_of(stream_id) is not None}
+            await self._run_search(self.query_one("#search_input", Input).value)
+            if first_load and self.filtered_rows:
+                self.query_one("#stream_table", DataTable).focus()
+            logger.debug(f"Todos los streams cargados: {len(self.catalog)}.")
         except Exception as e:
             logger.error(f"Error al cargar todos los streams: {e}", exc_info=True)
             self.query_one("#placeholder", Static).update("Error al cargar streams")
@@ -160,34 +250,43 @@ class AdminScreen(Screen):
             self.notify("Selecciona un stream primero", severity="warning")
             return
 
-        with get_session() as session:
-            stream = session.get(Stream, self.selected_stream_id)
-            if stream:
-                modal = StreamModal("Editar stream", stream=stream)
-                result = await self.app.push_screen_wait(modal)
-                if result:
-                    self.refresh_table()
-            else:
-                self.notify("Stream no encontrado", severity="error")
-                self.selected_stream_id = None
+        # La sesión se cierra antes de abrir el modal: el stream viaja como dict.
+        try:
+            stream = await run_db(get_stream_for_edit, self.selected_stream_id)
+        except Exception as e:
+            logger.error(f"Error al obtener stream para edición: {e}", exc_info=True)
+            self.notify(f"Error al cargar stream: {e}", severity="error")
+            return
+
+        if stream:
+            modal = StreamModal("Editar stream", stream=stream)
+            result = await self.app.push_screen_wait(modal)
+            if result:
+                self.refresh_table()
+        else:
+            self.notify("Stream no encontrado", severity="error")
+            self.selected_stream_id = None
 
 
     @work
     async def action_delete_stream(self):
+        if self.marked_ids:
+            await self._delete_marked()
+            return
+
         if self.selected_stream_id is None:
             self.notify("Selecciona un stream primero", severity="warning")
             return
 
         stream_name = ""
         try:
-            with get_session() as session:
-                stream_to_delete = session.get(Stream, self.selected_stream_id)
-                if stream_to_delete:
-                    stream_name = stream_to_delete.nombre
-                else:
-                    self.notify("Stream no encontrado", severity="error")
-                    self.selected_stream_id = None
-                    return
+            stream_to_delete = await run_db(get_stream_for_edit, self.selected_stream_id)
+            if stream_to_delete:
+                stream_name = stream_to_delete["nombre"]
+            else:
+                self.notify("Stream no encontrado", severity="error")
+                self.selected_stream_id = None
+                return
         except Exception as e:
             logger.error(f"Error al obtener stream para confirmación: {e}", exc_info=True)
             self.notify(f"Error al preparar eliminación: {e}", severity="error")
@@ -198,15 +297,11 @@ class AdminScreen(Screen):
 
         if result:
             try:
-                with get_session() as session:
-                    stream = session.get(Stream, self.selected_stream_id)
-                    if stream:
-                        session.delete(stream)
-                        session.commit()
-                        self.notify(f"Stream '{stream.nombre}' eliminado")
-                        self.refresh_table()
-                    else:
-                        self.notify("Stream no encontrado", severity="error")
+                if await run_db(delete_streams, [self.selected_stream_id]):
+                    self.notify(f"Stream '{stream_name}' eliminado")
+                    self.refresh_table()
+                else:
+                    self.notify("Stream no encontrado", severity="error")
             except Exception as e:
                 logger.error(f"Error al eliminar stream: {e}", exc_info=True)
                 self.notify(f"Error al eliminar: {e}", severity="error")
@@ -215,86 +310,58 @@ class AdminScreen(Screen):
         else:
             self.selected_stream_id = None
 
+    async def _delete_marked(self) -> None:
+        stream_ids = sorted(self.marked_ids)
+        confirm_modal = ConfirmationModal(f"¿Estás seguro de que quieres eliminar los {len(stream_ids)} streams marcados?")
+        if not await self.app.push_screen_wait(confirm_modal):
+            return
+        try:
+            deleted_count = await run_db(delete_streams, stream_ids)
+            self.marked_ids = set()
+            self.selected_stream_id = None
+            self.notify(f"{deleted_count} streams eliminados")
+            self.refresh_table()
+        except Exception as e:
+            logger.error(f"Error al eliminar streams marcados: {e}", exc_info=True)
+            self.notify(f"Error al eliminar: {e}", severity="error")
+
+    @work
+    async def action_bulk_edit(self):
+        if not self.marked_ids:
+            self.notify("Marca streams con la barra espaciadora primero", severity="warning")
+            return
+
+        changes = await self.app.push_screen_wait(BulkEditModal(len(self.marked_ids)))
+        if not changes:
+            return
+        try:
+            updated_count = await run_db(update_streams, sorted(self.marked_ids), **changes)
+            self.marked_ids = set()
+            self.notify(f"{updated_count} streams actualizados")
+            self.refresh_table()
+        except Exception as e:
+            logger.error(f"Error al actualizar streams marcados: {e}", exc_info=True)
+            self.notify(f"Error al actualizar: {e}", severity="error")
+
     @work
     async def action_import_streams(self):
         modal = ImportJsonModal()
         file_path = await self.app.push_screen_wait(modal)
 
         if file_path:
-            path = Path(file_path)
-            if not path.exists():
-                self.notify(f"El archivo '{file_path}' no existe", severity="error")
-                return
-            if not path.is_file():
-                self.notify(f"La ruta '{file_path}' no es un archivo", severity="error")
-                return
-            if path.suffix.lower() != '.json':
-                self.notify(f"El archivo '{file_path}' no es un archivo JSON válido", severity="error")
+            try:
+                data = await asyncio.to_thread(read_streams_file, file_path)
+            except CatalogFileError as e:
+                self.notify(str(e), severity="error")
                 return
 
-            imported_count = 0
-            skipped_count = 0
-            total_in_file = 0
+            total_in_file = len(data)
+            self.notify(f"Procesando {total_in_file} streams desde '{file_path}'...", timeout=3)
 
             try:
-                with open(path, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-
-                if not isinstance(data, list):
-                    self.notify("El archivo JSON debe contener una lista de streams", severity="error")
-                    return
-
-                total_in_file = len(data)
-                self.notify(f"Procesando {total_in_file} streams desde '{file_path}'...", timeout=3)
-
-                with get_session() as session:
-                    for stream_data in data:
-                        required_fields = ["nombre", "link", "categorias", "tipo"]
-                        if not all(field in stream_data for field in required_fields):
-                            logger.warning(f"Stream con campos faltantes, saltando: {stream_data}")
-                            skipped_count += 1
-                            continue
-
-                        if not all(isinstance(stream_data.get(field), str) and stream_data.get(field).strip() for field in required_fields):
-                             logger.warning(f"Stream con datos inválidos (no string o vacío), saltando: {stream_data}")
-                             skipped_count += 1
-                             continue
-
-                        existing_stream = session.exec(
-                            select(Stream).where(
-                                (Stream.nombre == stream_data["nombre"].strip()) |
-                                (Stream.link == stream_data["link"].strip())
-                            )
-                        ).first()
-
-                        if existing_stream:
-                            logger.info(f"Stream '{stream_data['nombre']}' ya existe, saltando")
-                            skipped_count += 1
-                        else:
-                            try:
-                                new_stream = Stream(
-                                    nombre=stream_data["nombre"].strip(),
-                                    link=stream_data["link"].strip(),
-                                    categorias=stream_data["categorias"].strip(),
-                                    tipo=stream_data["tipo"].strip()
-                                )
-                                session.add(new_stream)
-                                session.commit()
-                                session.refresh(new_stream)
-                                imported_count += 1
-                                logger.info(f"Stream '{new_stream.nombre}' importado correctamente")
-                            except Exception as db_e:
-                                logger.error(f"Error al insertar stream '{stream_data.get('nombre', 'N/A')}': {db_e}", exc_info=True)
-                                skipped_count += 1
-                                session.rollback()
-
+                imported_count, skipped_count = await run_db(import_stream_dicts, data)
                 self.notify(f"Importación completada: {imported_count} streams agregados, {skipped_count} saltados de {total_in_file} en el archivo", severity="info", timeout=5)
                 self.refresh_table()
-
-            except FileNotFoundError:
-                self.notify(f"Archivo no encontrado en la ruta '{file_path}'", severity="error")
-            except json.JSONDecodeError:
-                self.notify(f"El archivo '{file_path}' no es un JSON válido", severity="error")
             except Exception as e:
                 logger.error(f"Error inesperado durante la importación: {e}", exc_info=True)
                 self.notify(f"Error inesperado durante la importación: {str(e)}", severity="error")
@@ -305,19 +372,9 @@ class AdminScreen(Screen):
         file_name = await self.app.push_screen_wait(modal)
 
         if file_name:
-            path = Path(file_name)
-
             try:
-                with get_session() as session:
-                    streams = session.exec(select(Stream)).all()
-
-                    streams_data = [
-                        s.model_dump() for s in streams
-                    ]
-
-                with open(path, 'w', encoding='utf-8') as f:
-                    json.dump(streams_data, f, indent=4, ensure_ascii=False)
-
+                streams_data = await run_db(export_stream_dicts)
+                await asyncio.to_thread(write_streams_file, file_name, streams_data)
                 self.notify(f"Exportación completada: {len(streams_data)} streams exportados a '{file_name}'", severity="info", timeout=5)
 
             except Exception as e:
@@ -328,9 +385,8 @@ class AdminScreen(Screen):
     async def action_validate_streams(self):
         all_streams_data = []
         try:
-            with get_session() as session:
-                streams_from_db = session.exec(select(Stream)).all()
-                all_streams_data = [s.model_dump() for s in streams_from_db]
+            catalog = await load_catalog()
+            all_streams_data = [catalog.row_dict(row) for row in catalog.all_rows()]
         except Exception as e:
             logger.error(f"Error al obtener streams para validación: {e}", exc_info=True)
             self.notify(f"Error al cargar streams para validar: {e}", severity="error")
@@ -365,22 +421,9 @@ class AdminScreen(Screen):
             confirm_delete_result = await self.app.push_screen_wait(confirm_delete_modal)
 
             if confirm_delete_result:
-                deleted_count = 0
                 try:
-                    with get_session() as session:
-                        for stream_data in broken_streams_data:
-                            stream_id = stream_data.get("id")
-                            if stream_id is not None:
-                                db_stream = session.get(Stream, stream_id)
-                                if db_stream:
-                                    session.delete(db_stream)
-                                    deleted_count += 1
-                                    logger.info(f"Eliminado stream no funcional: {db_stream.nombre}")
-                                else:
-                                    logger.warning(f"Stream con ID {stream_id} no encontrado para eliminación")
-                            else:
-                                logger.warning(f"Stream sin ID, no se puede eliminar: {stream_data}")
-                        session.commit()
+                    stream_ids = [stream_data["id"] for stream_data in broken_streams_data if stream_data.get("id") is not None]
+                    deleted_count = await run_db(delete_streams, stream_ids)
                     self.notify(f"{deleted_count} streams no funcionales eliminados", severity="info", timeout=3)
                     self.refresh_table()
                 except Exception as e:
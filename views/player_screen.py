@@ -1,7 +1,7 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
-from textual import on
+from textual import on, work
 from textual.app import ComposeResult
 from textual.containers import Horizontal, Vertical, Center
 from textual.widgets import Static, DataTable, Button, Footer, Input
@@ -9,19 +9,32 @@ from textual.reactive import reactive
 from textual.screen import Screen
 from textual.message import Message
 
-from database.models import Stream, get_session
-
-import threading
+from database.async_db import run_db
+from database.catalog_store import CatalogSearch, CatalogStore, catalog_is_stale, get_catalog, load_catalog
+from database.play_history import SORT_MOST_PLAYED, SORT_RECENT, PlayHistoryRecorder, get_play_history_buffer, get_play_ranking
+from database.repository import get_playable_stream
+from playback.engine import PlaybackEngine
+from playback.remote import RemoteEngine, daemon_is_running
+from playback.resolver import QUALITY_FORMATS
+from utils.functions import format_bytes
+from utils.config_manager import (
+    CATALOG_REFRESH_SECONDS, DAEMON_ATTACH, DAEMON_SOCKET_PATH, MAX_TABLE_ROWS, PLAY_HISTORY_ENABLED, PLAY_HISTORY_FLUSH_SECONDS,
+    REWIND_SECONDS, SEARCH_DEBOUNCE_MS,
+)
+from utils.metrics import metrics
+from utils.profiling import profiled
+
+import asyncio
 import time
-import vlc
-from vlc import EventType
-import yt_dlp
 import logging
-import os
-import sys
+from array import array
 
 logger = logging.getLogger(__name__)
 
+SEARCH_FIELDS = ("nombres",)
+SORT_ORDERS = (None, SORT_MOST_PLAYED, SORT_RECENT)
+SORT_LABELS = {SORT_MOST_PLAYED: "más reproducidos", SORT_RECENT: "reproducidos recientemente"}
+
 class PlayerScreen(Screen):
     BINDINGS = [
         ("q", "app.pop_screen", "Volver"),
@@ -29,14 +42,31 @@ class PlayerScreen(Screen):
         ("s", "stop_playback", "Detener"),
         ("d", "next_stream", "Siguiente"),
         ("v", "toggle_volume", "Volumen"),
+        ("p", "toggle_pause", "Pausa"),
+        ("r", "rewind", f"-{REWIND_SECONDS}s"),
+        ("l", "go_live", "En vivo"),
+        ("b", "cycle_quality", "Calidad"),
+        ("o", "cycle_sort", "Orden"),
     ] 
     
     current_stream: reactive[dict | None] = reactive(None) 
-    player: vlc.MediaPlayer | None = reactive(None)
+    engine: PlaybackEngine | RemoteEngine | None = None
+    history: PlayHistoryRecorder | None = None
     stream_index = 0
-    all_streams: list[dict] = [] 
-    streams: list[dict] = [] 
+    catalog: CatalogStore = get_catalog()
+    rows: array = array("l")
+    highlighted_position: int | None = None
+    catalog_search: CatalogSearch | None = None
+    search_timer = None
     last_click_time: float = 0
+    loaded_catalog_version: int = -1
+    play_sort: str | None = None
+    play_rank: dict[int, int] = {}
+
+    class PlaybackStatus(Message):
+        def __init__(self, text: str) -> None:
+            super().__init__()
+            self.text = text
 
     def compose(self) -> ComposeResult:
         yield Static("Reproductor de Streams", id="screen_title")
@@ -47,8 +77,14 @@ class PlayerScreen(Screen):
                     yield Input(placeholder="Escribe para buscar...", id="search_input", classes="search-input")
                     yield Button("🔍 Buscar", id="perform_search", classes="search-button")
 
+            with Center():
+                yield Static("", id="search_status")
+
             with Center():
                 yield Static("Seleccione un stream para reproducir", id="placeholder")
+
+            with Center():
+                yield Static("", id="session_info")
             
             with Center():
                 yield DataTable(id="stream_table", zebra_stripes=True)
@@ -56,6 +92,9 @@ class PlayerScreen(Screen):
         yield Footer()
 
     def on_mount(self) -> None:
+        self.catalog_search = CatalogSearch(SEARCH_FIELDS)
+        self._start_engine()
+
         table = self.query_one("#stream_table", DataTable)
         table.cursor_type = "row"
         
@@ -64,28 +103,18 @@ class PlayerScreen(Screen):
         table.add_column("Categorías", width=28)
         table.add_column("Tipo", width=14) 
         
-        try:
-            with get_session() as session:
-                all_streams_from_db = session.query(Stream).all()
-                self.all_streams = [s.model_dump() for s in all_streams_from_db] 
-                self.streams = list(self.all_streams)
-            self.update_table_rows() 
-        except Exception as e:
-            logger.error(f"PlayerScreen: Error al cargar streams en on_mount: {e}", exc_info=True)
-            placeholder = self.query_one("#placeholder", Static)
-            placeholder.update("Error al cargar streams") 
-            placeholder.visible = True
-            table.visible = False 
-            
-        if self.streams:
-            table.focus()
-        else:
-            self.query_one("#search_input", Input).focus()
+        self.query_one("#search_input", Input).focus()
+        self._load_streams()
+        self.set_interval(CATALOG_REFRESH_SECONDS, self._refresh_if_stale)
+
+        self._update_session_info()
+        self.set_interval(2, self._update_session_info)
 
         footer = self.query_one(Footer)
         footer.mount(
             Horizontal(
                 Button("◀ Anterior", id="prev", classes="control-button"),
+                Button("⏸ Pausa", id="pause", classes="control-button"),
                 Button("■ Detener", id="stop", classes="control-button"),
                 Button("Siguiente ▶", id="next", classes="control-button"),
                 Button("🔊", id="volume", classes="volume-button"),
@@ -93,28 +122,125 @@ class PlayerScreen(Screen):
             )
         )
     
+    def on_screen_resume(self) -> None:
+        # La pantalla se instala una sola vez: al volver solo se recarga si
+        # el catálogo cambió mientras estaba oculta.
+        if self.play_sort:
+            self._load_streams()
+        else:
+            self._refresh_if_stale()
+
+    @work(exclusive=True, group="catalog_check")
+    async def _refresh_if_stale(self) -> None:
+        # También detecta cambios de otros procesos (daemon, línea de comandos).
+        if self.is_current and self.loaded_catalog_version >= 0 and await catalog_is_stale(self.loaded_catalog_version):
+            self._load_streams()
+
+    @work(exclusive=True, group="catalog_load")
+    @profiled("mount")
+    async def _load_streams(self) -> None:
+        first_load = self.loaded_catalog_version < 0
+        try:
+            self.catalog = await load_catalog()
+            self.loaded_catalog_version = self.catalog.version
+            if self.play_sort:
+                await self._load_play_rank()
+            await self._filter_streams(self.query_one("#search_input", Input).value)
+            if self.current_stream:
+                position = self._position_of(self.current_stream["id"])
+                self.stream_index = position if position is not None else min(self.stream_index, max(len(self.rows) - 1, 0))
+            self.update_table_rows()
+            if first_load and self.rows:
+                self.query_one("#stream_table", DataTable).focus()
+        except Exception as e:
+            logger.error(f"PlayerScreen: Error al cargar streams: {e}", exc_info=True)
+            placeholder = self.query_one("#placeholder", Static)
+            placeholder.update("Error al cargar streams") 
+            placeholder.visible = True
+            self.query_one("#stream_table", DataTable).visible = False 
+
+    @work(exclusive=True, group="engine")
+    async def _start_engine(self) -> None:
+        # Comprobar el daemon abre un socket con espera: se hace fuera del
+        # hilo de la interfaz para no retrasar el montaje.
+        if DAEMON_ATTACH and await asyncio.to_thread(daemon_is_running, DAEMON_SOCKET_PATH):
+            logger.info(f"PlayerScreen: Conectado al daemon en '{DAEMON_SOCKET_PATH}'")
+            # Conectado al daemon, es el daemon quien guarda el historial.
+            self.engine = RemoteEngine(DAEMON_SOCKET_PATH, on_status=self._on_engine_status)
+        else:
+            if PLAY_HISTORY_ENABLED:
+                self.history = PlayHistoryRecorder()
+                self.set_interval(PLAY_HISTORY_FLUSH_SECONDS, self._flush_play_history)
+            self.engine = PlaybackEngine(on_status=self._on_engine_status,
+                                         on_event=self.history.on_playback_event if self.history else None)
+        self._update_session_info()
+
     def on_unmount(self) -> None:
-        if self.player:
-            event_manager = self.player.event_manager()
-            event_manager.event_detach(EventType.MediaPlayerEndReached)
-            self.player.stop()
-            self.player = None
+        if self.engine:
+            self.engine.shutdown()
+            self.engine = None
+        if self.history:
+            self.history.stopped()
+            get_play_history_buffer().flush()
+
+    @work(exclusive=True, group="play_history")
+    async def _flush_play_history(self) -> None:
+        await run_db(get_play_history_buffer().flush)
+
+    async def _load_play_rank(self) -> None:
+        # Se escribe lo pendiente antes de leer, para que el orden incluya
+        # las últimas reproducciones.
+        if self.history:
+            await run_db(get_play_history_buffer().flush)
+        ranking = await run_db(get_play_ranking, self.play_sort)
+        self.play_rank = {stream_id: position for position, stream_id in enumerate(ranking)}
+
+    def _sort_rows(self, rows: array) -> array:
+        # Orden estable: los streams sin reproducciones quedan al final en su
+        # orden original.
+        if not self.play_sort or not self.play_rank:
+            return rows
+        ids, play_rank, unranked = self.catalog.ids, self.play_rank, len(self.play_rank)
+        return array("l", sorted(rows, key=lambda row: play_rank.get(ids[row], unranked)))
+
+    def _on_engine_status(self, text: str) -> None:
+        self.post_message(self.PlaybackStatus(text))
+
+    def on_player_screen_playback_status(self, message: PlaybackStatus) -> None:
+        self.query_one("#placeholder", Static).update(message.text)
+
+    def _update_session_info(self) -> None:
+        if not self.engine:
+            return
+        info = f"Calidad: {self.engine.quality} · Transferido en la sesión: {format_bytes(self.engine.bytes_transferred())}"
+        telemetry = self.engine.telemetry()
+        if telemetry:
+            info += (
+                f"\n{telemetry['input_kbps']:.0f} kb/s · {format_bytes(telemetry['read_bytes'])} leídos"
+                f" · {format_bytes(telemetry['demux_bytes'])} demux · {telemetry['lost_buffers']} buffers perdidos"
+                f" · {telemetry['rebuffers']} cortes"
+            )
+        self.query_one("#session_info", Static).update(info)
 
     def update_table_rows(self) -> None:
         table = self.query_one("#stream_table", DataTable)
         placeholder = self.query_one("#placeholder", Static)
 
+        catalog = self.catalog
+        started = time.perf_counter()
+
         table.clear() 
-        if self.streams:
+        self.highlighted_position = None
+        if self.rows:
             placeholder.visible = False
             table.visible = True
             
-            for s_dict in self.streams:
+            for row in self.rows[:MAX_TABLE_ROWS]:
                 table.add_row(
-                    str(s_dict["id"]), 
-                    s_dict["nombre"], 
-                    s_dict["categorias"], 
-                    "🎬 Video" if s_dict["tipo"].lower() == "video" else "📡 Stream",
+                    str(catalog.ids[row]), 
+                    catalog.nombres[row], 
+                    catalog.categorias[row], 
+                    "🎬 Video" if catalog.is_video(row) else "📡 Stream",
                 )
             self.update_table_highlight() 
         else:
@@ -124,45 +250,64 @@ class PlayerScreen(Screen):
                 placeholder.update("No se encontraron resultados")
             else:
                 placeholder.update("Seleccione un stream para reproducir")
+        metrics.observe("table.rebuild_ms", round((time.perf_counter() - started) * 1000, 3))
 
     def update_table_highlight(self) -> None:
         table = self.query_one("#stream_table", DataTable)
-        for row_index, stream_dict_in_list in enumerate(self.streams):
-            is_current = self.current_stream and stream_dict_in_list["id"] == self.current_stream["id"]
-            prefix = "▶ " if is_current else ""
-            table.update_cell_at((row_index, 1), f"{prefix}{stream_dict_in_list['nombre']}")
-        
-        if self.current_stream:
-            try:
-                current_stream_index_in_filtered_list = next(
-                    i for i, s in enumerate(self.streams) 
-                    if s["id"] == self.current_stream["id"]
-                )
-                table.move_cursor(row=current_stream_index_in_filtered_list)
-                table.focus()
-            except StopIteration:
-                pass
+        current_position = self._position_of(self.current_stream["id"]) if self.current_stream else None
+
+        # Solo cambian la fila que estaba marcada y la actual.
+        if current_position is not None and current_position >= table.row_count:
+            current_position = None
+
+        if self.highlighted_position is not None and self.highlighted_position < table.row_count:
+            table.update_cell_at((self.highlighted_position, 1), self.catalog.nombres[self.rows[self.highlighted_position]])
+        if current_position is not None:
+            table.update_cell_at((current_position, 1), f"▶ {self.catalog.nombres[self.rows[current_position]]}")
+            table.move_cursor(row=current_position)
+            table.focus()
+        self.highlighted_position = current_position
+
+    def _position_of(self, stream_id: int) -> int | None:
+        row = self.catalog.row_of(stream_id)
+        if row is None:
+            return None
+        try:
+            return self.rows.index(row)
+        except ValueError:
+            return None
 
     @on(Button.Pressed, "#perform_search")
     def perform_search_button(self) -> None:
         search_input = self.query_one("#search_input", Input)
-        self._apply_search_filter(search_input.value)
+        self._search_now(search_input.value)
 
     @on(Input.Submitted, "#search_input")
     def search_input_submitted(self, event: Input.Submitted) -> None:
-        self._apply_search_filter(event.value)
-
-    def _apply_search_filter(self, search_value: str) -> None:
-        search_text = search_value.strip().lower()
-        
-        if search_text:
-            self.streams = [
-                s for s in self.all_streams 
-                if search_text in s.get("nombre", "").lower()
-            ]
-        else:
-            self.streams = list(self.all_streams)
-
+        self._search_now(event.value)
+
+    @on(Input.Changed, "#search_input")
+    def search_input_changed(self, event: Input.Changed) -> None:
+        if self.search_timer:
+            self.search_timer.stop()
+        self.search_timer = self.set_timer(SEARCH_DEBOUNCE_MS / 1000, lambda: self._apply_search_filter(event.value))
+
+    def _search_now(self, search_value: str) -> None:
+        if self.search_timer:
+            self.search_timer.stop()
+        self._apply_search_filter(search_value)
+
+    @profiled("search")
+    async def _filter_streams(self, search_value: str) -> None:
+        rows, fuzzy, parts = await self.catalog_search.run(search_value, self.rows)
+        self.rows = rows if fuzzy else self._sort_rows(rows)
+        if self.play_sort:
+            parts.append(f"Orden: {SORT_LABELS[self.play_sort]}")
+        self.query_one("#search_status", Static).update(" · ".join(parts))
+
+    @work(exclusive=True, group="search")
+    async def _apply_search_filter(self, search_value: str) -> None:
+        await self._filter_streams(search_value)
         self.update_table_rows()
         table = self.query_one("#stream_table", DataTable)
         
@@ -170,87 +315,21 @@ class PlayerScreen(Screen):
             table.move_cursor(row=0)
             table.focus()
 
-    def _playback_thread(self, stream_link: str, stream_name: str, stream_type: str) -> None:
-        placeholder = self.query_one("#placeholder", Static) 
-        
-        original_stdout = sys.stdout
-        original_stderr = sys.stderr
-
-        try:
-            with open(os.devnull, 'w') as fnull:
-                sys.stdout = fnull
-                sys.stderr = fnull
-                
-                if self.player:
-                    self.player.stop()
-
-                instance = vlc.Instance()
-                self.player = instance.media_player_new() 
-                
-                if stream_type.lower() == "stream":
-                    media = instance.media_new(stream_link)
-                    self.player.set_media(media)
-                else: 
-                    ydl_opts = {
-                        'format': 'bestaudio/best',
-                        'quiet': True,
-                        'noplaylist': True,
-                        'no_warnings': True,
-                        'logtostderr': False, 
-                    }
-                    with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                        info = ydl.extract_info(stream_link, download=False)
-                        url = info['url']
-                    media = instance.media_new(url)
-                    self.player.set_media(media)
-
-                event_manager = self.player.event_manager()
-                event_manager.event_attach(EventType.MediaPlayerEndReached, 
-                                           lambda event: self.app.call_from_thread(self._restart_current_playback))
-
-                self.player.play()
-
-                time.sleep(0.5) 
-                
-                self.app.call_from_thread(placeholder.update, f"▶ Reproduciendo: {stream_name}")
-                
-                logger.info(f"Reproduciendo: {stream_name} desde {stream_link}")
-
-        except yt_dlp.utils.DownloadError as e:
-            logger.error(f"Playback Thread: Error de descarga con yt-dlp: {e}", exc_info=True)
-            self.app.call_from_thread(placeholder.update, "Error: Problema al obtener audio")
-        except Exception as e:
-            logger.error(f"Playback Thread: Error general en la reproducción: {e}", exc_info=True)
-            self.app.call_from_thread(placeholder.update, "Error en la reproducción")
-        finally:
-            sys.stdout = original_stdout
-            sys.stderr = original_stderr
-
-    def _restart_current_playback(self) -> None:
-        if self.player and self.current_stream:
-            logger.info(f"Reiniciando reproducción de: {self.current_stream['nombre']}")
-            self.player.set_time(0) 
-            self.player.play()
-            self.query_one("#placeholder", Static).update(f"▶ Reiniciando: {self.current_stream['nombre']}")
-            self.update_table_highlight()
-        elif not self.current_stream:
-            logger.warning("No hay stream actual para reiniciar la reproducción.")
-            self.query_one("#placeholder", Static).update("Reproducción finalizada.")
-
-
-    def play_selected(self, row_index: int):
-        if row_index < 0 or row_index >= len(self.streams):
+    @work(exclusive=True, group="play_selected")
+    async def play_selected(self, row_index: int):
+        if not self.engine:
+            # El motor se crea en segundo plano al montar la pantalla.
+            self.notify("El reproductor aún se está iniciando", timeout=2)
+            return
+        if row_index < 0 or row_index >= len(self.rows):
             logger.warning(f"play_selected: Índice de stream fuera de rango: {row_index}.")
             return
 
-        selected_stream_id = self.streams[row_index]["id"]
+        selected_stream_id = self.catalog.ids[self.rows[row_index]]
 
         stream_data: dict | None = None
         try:
-            with get_session() as session:
-                stream_obj = session.get(Stream, selected_stream_id) 
-                if stream_obj:
-                    stream_data = stream_obj.model_dump() 
+            stream_data = await run_db(get_playable_stream, selected_stream_id)
         except Exception as e:
             logger.error(f"play_selected: Error al recargar el stream {selected_stream_id}: {e}", exc_info=True)
             placeholder = self.query_one("#placeholder", Static)
@@ -269,13 +348,8 @@ class PlayerScreen(Screen):
             self.query_one("#stream_table", DataTable).visible = False
             return
 
-        try:
-            self.stream_index = next(
-                i for i, s in enumerate(self.streams) 
-                if s["id"] == self.current_stream["id"]
-            )
-        except StopIteration:
-            self.stream_index = 0 
+        position = self._position_of(self.current_stream["id"])
+        self.stream_index = position if position is not None else 0
 
         placeholder = self.query_one("#placeholder", Static)
         placeholder.update(f"Cargando: {self.current_stream['nombre']}...")
@@ -283,22 +357,9 @@ class PlayerScreen(Screen):
         self.query_one("#stream_table", DataTable).visible = True 
         self.update_table_highlight()
 
-        if self.player:
-            event_manager = self.player.event_manager()
-            event_manager.event_detach(EventType.MediaPlayerEndReached)
-            self.player.stop()
-            self.player = None
-
-        playback_thread = threading.Thread(
-            target=self._playback_thread,
-            args=(
-                self.current_stream['link'],
-                self.current_stream['nombre'],
-                self.current_stream['tipo']
-            ),
-            daemon=True
-        )
-        playback_thread.start()
+        if self.history:
+            self.history.started(self.current_stream["id"])
+        self.engine.play(self.current_stream)
 
 
     def on_data_table_row_selected(self, event: DataTable.RowSelected) -> None:
@@ -319,39 +380,75 @@ class PlayerScreen(Screen):
     def action_toggle_volume(self) -> None:
         self._handle_toggle_volume()
 
+    def action_toggle_pause(self) -> None:
+        self._handle_toggle_pause()
+
+    def action_rewind(self) -> None:
+        if self.engine:
+            self.engine.rewind(REWIND_SECONDS)
+
+    def action_go_live(self) -> None:
+        if self.engine:
+            self.engine.go_live()
+
+    def action_cycle_sort(self) -> None:
+        self.play_sort = SORT_ORDERS[(SORT_ORDERS.index(self.play_sort) + 1) % len(SORT_ORDERS)]
+        self._apply_sort_order()
+
+    @work(exclusive=True, group="search")
+    async def _apply_sort_order(self) -> None:
+        if self.play_sort:
+            await self._load_play_rank()
+        # La búsqueda vuelve a partir del catálogo completo para recuperar el
+        # orden original cuando se quita el orden por historial.
+        self.catalog_search.reset()
+        await self._filter_streams(self.query_one("#search_input", Input).value)
+        self.update_table_rows()
+        self.notify(f"Orden: {SORT_LABELS.get(self.play_sort, 'por ID')}", timeout=2)
+
+    def action_cycle_quality(self) -> None:
+        if not self.engine:
+            return
+        qualities = list(QUALITY_FORMATS)
+        next_quality = qualities[(qualities.index(self.engine.quality) + 1) % len(qualities)]
+        self.engine.set_quality(next_quality)
+        self._update_session_info()
+        self.notify(f"Calidad de audio: {next_quality} (se aplica al siguiente video)", timeout=3)
+
     def _handle_stop_playback(self) -> None:
-        if self.player:
-            event_manager = self.player.event_manager()
-            event_manager.event_detach(EventType.MediaPlayerEndReached)
-            self.player.stop()
-            self.player = None
+        if self.current_stream and self.engine:
+            self.engine.stop()
+            if self.history:
+                self.history.stopped()
             self.query_one("#placeholder", Static).update("Seleccione un stream para reproducir")
             self.current_stream = None
             self.update_table_highlight()
 
     def _handle_next_stream(self) -> None:
-        if self.streams: 
-            self.stream_index = (self.stream_index + 1) % len(self.streams)
+        if self.rows: 
+            self.stream_index = (self.stream_index + 1) % len(self.rows)
             self.play_selected(self.stream_index)
             self.query_one("#stream_table", DataTable).focus()
         else:
             logger.warning("No hay streams para pasar al siguiente")
 
     def _handle_prev_stream(self) -> None:
-        if self.streams: 
-            self.stream_index = (self.stream_index - 1 + len(self.streams)) % len(self.streams)
+        if self.rows: 
+            self.stream_index = (self.stream_index - 1 + len(self.rows)) % len(self.rows)
             self.play_selected(self.stream_index)
             self.query_one("#stream_table", DataTable).focus()
         else:
             logger.warning("No hay streams para retroceder")
 
     def _handle_toggle_volume(self) -> None:
-        if self.player:
-            vol = self.player.audio_get_volume()
-            new_vol = 100 if vol < 100 else 30 
-            self.player.audio_set_volume(new_vol)
+        if self.engine:
+            self.engine.toggle_volume()
+
+    def _handle_toggle_pause(self) -> None:
+        if self.current_stream and self.engine:
+            self.engine.toggle_pause()
         else:
-            logger.warning("No hay reproductor activo para cambiar el volumen")
+            logger.warning("No hay stream actual para pausar")
 
     @on(Button.Pressed)
     def on_button_pressed(self, event: Button.Pressed) -> None:
@@ -362,4 +459,6 @@ class PlayerScreen(Screen):
         elif event.button.id == "prev":
             self._handle_prev_stream()
         elif event.button.id == "volume":
-            self._handle_toggle_volume()
\ No newline at end of file
+            self._handle_toggle_volume()
+        elif event.button.id == "pause":
+            self._handle_toggle_pause()
\ No newline at end of file